@@ -2,10 +2,15 @@ import streamlit as st
 import requests
 import time
 
+from sse import iter_sse
+
 # --- CONFIGURATION DES PORTS ---
 # Mettez ici les URLs de vos microservices
-API_INGEST_URL = "http://127.0.0.1:8000/ingest/"
+API_INGEST_BASE = "http://127.0.0.1:8000"
+API_INGEST_URL = f"{API_INGEST_BASE}/ingest/"
+API_INGEST_BATCH_URL = f"{API_INGEST_BASE}/ingest/batch"
 API_LLM_URL = "http://127.0.0.1:8001/ask/"
+API_LLM_STREAM_URL = "http://127.0.0.1:8001/ask/stream"
 
 # Configuration de la page
 # Simple status checks for services
@@ -48,21 +53,53 @@ with st.sidebar:
                     # Appel API Service 1
                     response = requests.post(API_INGEST_URL, files=files, data=data)
                     
-                    if response.status_code == 200:
+                    if response.ok:
                         st.success("✅ Document transmis !")
-                        st.info("Le pipeline asynchrone (DeID -> Indexer) est en cours...")
-                        # Petit délai pour laisser le temps aux services de fond de bosser
+                        # Suivi de l'extraction / publication côté ingestor
+                        status_url = f"{API_INGEST_BASE}/documents/{response.json()['doc_id']}"
                         progress_bar = st.progress(0)
-                        for i in range(100):
-                            time.sleep(0.05) # Simulation d'attente 5s
-                            progress_bar.progress(i + 1)
-                        st.success("Document prêt pour interrogation !")
+                        status = {}
+                        for _ in range(120):
+                            status = requests.get(status_url).json()
+                            progress_bar.progress(status["progress"])
+                            if status["done"]:
+                                break
+                            time.sleep(0.5)
+                        if status.get("status") == "PROCESSED":
+                            # PROCESSED = publié par l'ingestor ; l'API de recherche ne voit les
+                            # nouveaux chunks qu'après la compaction suivante de l'indexeur
+                            st.info(
+                                "Texte extrait et transmis : anonymisation et indexation en cours. "
+                                "Le document sera interrogeable après la prochaine mise à jour de l'index "
+                                "(quelques minutes)."
+                            )
+                        else:
+                            st.error(f"Erreur Ingestion : {status.get('status')}")
                     else:
                         st.error(f"Erreur Ingestion : {response.text}")
                         
                 except Exception as e:
                     st.error(f"Impossible de joindre le Service 1 : {e}")
 
+    # Import en masse : plusieurs fichiers ou archives zip / tar
+    batch_files = st.file_uploader(
+        "Import en masse (fichiers ou archive)",
+        type=["pdf", "txt", "docx", "zip", "tar", "gz", "tgz"],
+        accept_multiple_files=True
+    )
+    if batch_files and st.button("Ingérer le lot"):
+        with st.spinner("Envoi du lot au Service 1 (Ingestor)..."):
+            try:
+                files = [("files", (f.name, f, f.type)) for f in batch_files]
+                response = requests.post(API_INGEST_BATCH_URL, files=files, data={"doc_type": "compte-rendu"})
+                if response.ok:
+                    st.success(f"✅ {response.json()['message']}")
+                    st.dataframe(response.json()["documents"])
+                else:
+                    st.error(f"Erreur Ingestion : {response.text}")
+            except Exception as e:
+                st.error(f"Impossible de joindre le Service 1 : {e}")
+
     st.divider()
     st.caption("Statut des Services :")
     st.caption("🟢 Ingestor (8000)")
@@ -93,22 +130,33 @@ if prompt := st.chat_input("Posez votre question sur le dossier patient..."):
         message_placeholder.markdown("⏳ *Analyse du dossier en cours...*")
         
         try:
-            # Appel API Service 4
+            # Appel API Service 4 (streaming : les tokens s'affichent au fil de l'eau)
             payload = {"question": prompt}
-            response = requests.post(API_LLM_URL, json=payload)
+            response = requests.post(API_LLM_STREAM_URL, json=payload, stream=True, timeout=(5, 300))
             
             if response.status_code == 200:
-                data = response.json()
-                answer = data.get("answer", "Pas de réponse.")
-                sources = data.get("sources", [])
+                answer = ""
+                sources = []
+                error = None
+                for event, data in iter_sse(response):
+                    if event == "sources":
+                        sources = data.get("sources", [])
+                    elif event == "token":
+                        answer += data.get("text", "")
+                        message_placeholder.markdown(answer + "▌")
+                    elif event == "error":
+                        error = data.get("detail")
                 
-                # Formatage de la réponse avec les sources
-                full_response = f"{answer}\n\n"
-                if sources:
-                    full_response += "---\n**Sources :** " + ", ".join(sources)
-                
-                message_placeholder.markdown(full_response)
-                st.session_state.messages.append({"role": "assistant", "content": full_response})
+                if error and not answer:
+                    message_placeholder.error(f"Erreur LLM : {error}")
+                else:
+                    # Formatage de la réponse avec les sources
+                    full_response = f"{answer or 'Pas de réponse.'}\n\n"
+                    if sources:
+                        full_response += "---\n**Sources :** " + ", ".join(sources)
+                    
+                    message_placeholder.markdown(full_response)
+                    st.session_state.messages.append({"role": "assistant", "content": full_response})
             else:
                 error_msg = f"Erreur LLM ({response.status_code}) : {response.text}"
                 message_placeholder.error(error_msg)
@@ -0,0 +1,33 @@
+"""Lecture des flux Server-Sent Events de llm-qa (POST /ask/stream)."""
+import json
+
+
+def parse_sse(lines):
+    """Produit des couples (event, data) à partir des lignes d'un flux SSE.
+
+    Un événement se termine par une ligne vide ; plusieurs lignes `data:` sont
+    jointes par des sauts de ligne avant le décodage JSON. Les commentaires
+    (`:`) sont ignorés et un dernier événement sans ligne vide finale est
+    tout de même rendu.
+    """
+    event, data = "message", []
+    for line in lines:
+        if line is None or line.startswith(":"):
+            continue
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            value = line[len("data:"):]
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield event, json.loads("\n".join(data))
+
+
+def iter_sse(response):
+    """Lit un flux Server-Sent Events (réponse `requests` en stream=True)"""
+    # iter_lines recolle les lignes coupées entre deux paquets réseau
+    return parse_sse(response.iter_lines(decode_unicode=True))
@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sse import iter_sse, parse_sse
+
+class ChunkedRaw:
+    """Corps HTTP livré par paquets arbitraires, comme un flux réseau"""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, amt=None, **kwargs):
+        return self.chunks.pop(0) if self.chunks else b""
+
+def make_response(chunks):
+    response = requests.Response()
+    response.status_code = 200
+    response.encoding = "utf-8"
+    response.raw = ChunkedRaw(chunks)
+    return response
+
+STREAM = (
+    'event: sources\ndata: {"sources": ["kb.csv"]}\n\n'
+    'event: token\ndata: {"text": "Ren Shen, plante empereur"}\n\n'
+    'event: token\ndata: {"text": " (score 10)"}\n\n'
+    'event: done\ndata: {"ttft_ms": 120.5, "total_ms": 900.0}\n\n'
+)
+
+class TestParseSSE(unittest.TestCase):
+
+    def test_events_in_order(self):
+        events = list(parse_sse(STREAM.split("\n")))
+
+        self.assertEqual([e for e, _ in events], ["sources", "token", "token", "done"])
+        self.assertEqual(events[1][1], {"text": "Ren Shen, plante empereur"})
+
+    def test_multi_line_data(self):
+        lines = ["event: error", 'data: {"detail":', 'data:  "Ollama injoignable"}', ""]
+
+        self.assertEqual(list(parse_sse(lines)), [("error", {"detail": "Ollama injoignable"})])
+
+    def test_comments_and_default_event(self):
+        lines = [": ping", 'data: {"a": 1}', ""]
+
+        self.assertEqual(list(parse_sse(lines)), [("message", {"a": 1})])
+
+    def test_last_event_without_blank_line(self):
+        lines = ["event: done", 'data: {"total_ms": 1.0}']
+
+        self.assertEqual(list(parse_sse(lines)), [("done", {"total_ms": 1.0})])
+
+class TestIterSSE(unittest.TestCase):
+
+    def test_partial_chunks(self):
+        body = STREAM.encode("utf-8")
+        # Paquets de 7 octets : lignes et caractères multi-octets coupés en deux
+        chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+        events = list(iter_sse(make_response(chunks)))
+
+        self.assertEqual(events, list(parse_sse(STREAM.split("\n"))))
+
+    def test_multibyte_character_split(self):
+        body = 'event: token\ndata: {"text": "Syndrome de chaleur-humidité"}\n\n'.encode("utf-8")
+        cut = body.index("é".encode("utf-8")) + 1
+
+        events = list(iter_sse(make_response([body[:cut], body[cut:]])))
+
+        self.assertEqual(events, [("token", {"text": "Syndrome de chaleur-humidité"})])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,6 @@
+"""Modules partagés par les microservices DocQA.
+
+À installer dans l'environnement de chaque service (depuis la racine du dépôt) :
+
+    pip install -e common
+"""
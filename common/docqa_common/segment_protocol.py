@@ -0,0 +1,124 @@
+"""Protocole de messages segmentés entre ingestor, DeID et indexeur.
+
+Un document n'est plus envoyé en un seul message JSON contenant tout son
+texte. Il est publié sous forme de :
+
+    {"kind": "header",  "doc_id", "metadata", "total_chars"}
+    {"kind": "segment", "doc_id", "seq", "blob", "char_offset", "length", "metadata"}  (x N, dans l'ordre)
+    {"kind": "end",     "doc_id", "segments"}
+
+Le texte de chaque segment est écrit dans un blob store local partagé par
+les services (répertoire BLOB_STORE_DIR, obligatoire et identique pour
+l'ingestor, DeID et l'indexeur) ; la queue ne transporte que la référence
+(`blob`). Chaque
+segment est autonome (il porte doc_id et metadata) : un consommateur peut le
+traiter dès réception, sans attendre la fin du document.
+
+Les messages sans champ "kind" sont au format historique (texte complet).
+"""
+import os
+import re
+import threading
+
+# Taille cible d'un segment (caractères), coupé de préférence entre paragraphes
+SEGMENT_CHARS = int(os.getenv("SEGMENT_CHARS", "20000"))
+
+_SAFE_REF = re.compile(r"^[A-Za-z0-9_\-]+(/[A-Za-z0-9_\-.]+)*$")
+
+
+class BlobStore:
+    """Stockage fichier des segments de texte : une référence = un chemin relatif"""
+
+    def __init__(self, directory=None):
+        self._directory = directory
+
+    @property
+    def directory(self):
+        """Répertoire donné au constructeur, sinon BLOB_STORE_DIR (aucune valeur par défaut)"""
+        directory = self._directory or os.getenv("BLOB_STORE_DIR")
+        if not directory:
+            raise RuntimeError("BLOB_STORE_DIR non défini : répertoire du blob store partagé par les services")
+        return directory
+
+    def _path(self, ref):
+        if not _SAFE_REF.match(ref) or ".." in ref.split("/"):
+            raise ValueError(f"Référence de blob invalide : {ref!r}")
+        return os.path.join(self.directory, *ref.split("/"))
+
+    def put(self, ref, text):
+        path = self._path(ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Écriture atomique : un consommateur ne lit jamais un segment partiel
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        return ref
+
+    def get(self, ref):
+        with open(self._path(ref), encoding="utf-8") as f:
+            return f.read()
+
+    def delete(self, ref):
+        try:
+            os.remove(self._path(ref))
+        except FileNotFoundError:
+            pass
+
+
+def blob_ref(stage, doc_id, seq):
+    return f"{stage}/{doc_id}/{seq:06d}.txt"
+
+
+def split_segments(text, max_chars=SEGMENT_CHARS):
+    """Découpe le texte en (char_offset, segment) d'au plus max_chars caractères.
+
+    La coupure se fait au dernier saut de paragraphe de la fenêtre, sinon au
+    dernier saut de ligne, sinon à la limite exacte. La concaténation des
+    segments redonne le texte original.
+    """
+    start = 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            cut = text.rfind("\n\n", start, end)
+            if cut <= start:
+                cut = text.rfind("\n", start, end)
+            if cut > start:
+                end = cut + 1
+        yield start, text[start:end]
+        start = end
+
+
+def header_message(doc_id, metadata, total_chars):
+    return {"kind": "header", "doc_id": doc_id, "metadata": metadata, "total_chars": total_chars}
+
+
+def segment_message(doc_id, seq, ref, char_offset, length, metadata):
+    return {
+        "kind": "segment",
+        "doc_id": doc_id,
+        "seq": seq,
+        "blob": ref,
+        "char_offset": char_offset,
+        "length": length,
+        "metadata": metadata
+    }
+
+
+def end_message(doc_id, segments):
+    return {"kind": "end", "doc_id": doc_id, "segments": segments}
+
+
+def document_messages(blob_store, doc_id, text, metadata, stage="raw", max_chars=SEGMENT_CHARS):
+    """Écrit les segments du document dans le blob store et retourne la suite de messages"""
+    messages = [header_message(doc_id, metadata, len(text))]
+    for seq, (offset, segment) in enumerate(split_segments(text, max_chars)):
+        ref = blob_store.put(blob_ref(stage, doc_id, seq), segment)
+        messages.append(segment_message(doc_id, seq, ref, offset, len(segment), metadata))
+    messages.append(end_message(doc_id, len(messages) - 1))
+    return messages
+
+
+def message_kind(message):
+    return message.get("kind", "legacy")
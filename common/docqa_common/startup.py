@@ -0,0 +1,129 @@
+"""Démarrage en deux temps des services à modèles (DeID, indexeur, llm-qa).
+
+Les sondes sont servies avant le chargement des modèles :
+
+    GET /health  vivacité : 200 dès que le processus répond (503 si le chargement a échoué)
+    GET /ready   disponibilité : 503 tant que les modèles ne sont pas chargés, puis 200
+
+Chaque phase du démarrage est chronométrée ; le profil (ms par phase) est
+renvoyé par /ready et affiché dans les logs.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Inférence factice après chargement (premier appel réel sans surcoût d'initialisation)
+WARMUP = os.getenv("WARMUP", "false").lower() in ("1", "true", "yes")
+
+
+class StartupState:
+    """État de démarrage d'un service : phases chronométrées, prêt / en échec"""
+
+    def __init__(self, service):
+        self.service = service
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.current_phase = None
+        self.ready = False
+        self.time_to_ready_ms = None
+        self.error = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        self.current_phase = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = 1000 * (time.perf_counter() - start)
+            with self._lock:
+                self.phases[name] = round(elapsed_ms, 1)
+            self.current_phase = None
+            print(f"⏱️ [{self.service}] {name} : {elapsed_ms:.0f} ms")
+
+    def mark_ready(self):
+        self.time_to_ready_ms = round(1000 * (time.perf_counter() - self.started), 1)
+        self.ready = True
+        print(f"✅ [{self.service}] prêt en {self.time_to_ready_ms:.0f} ms {self.profile()}")
+
+    def mark_failed(self, error):
+        self.error = str(error)
+        self.ready = False
+        print(f"❌ [{self.service}] échec du démarrage ({self.current_phase}) : {error}")
+
+    def profile(self):
+        with self._lock:
+            return dict(self.phases)
+
+    def liveness(self):
+        return {
+            "status": "failed" if self.error else "ok",
+            "service": self.service,
+            "uptime_s": round(time.perf_counter() - self.started, 1)
+        }
+
+    def readiness(self):
+        return {
+            "ready": self.ready,
+            "service": self.service,
+            "loading_phase": self.current_phase,
+            "startup_profile_ms": self.profile(),
+            "time_to_ready_ms": self.time_to_ready_ms,
+            "error": self.error
+        }
+
+    def run(self, loader):
+        """Exécute `loader()` puis marque le service prêt (l'échec est enregistré et relancé)"""
+        try:
+            loader()
+        except BaseException as e:
+            self.mark_failed(e)
+            raise
+        self.mark_ready()
+
+    def load_in_background(self, loader):
+        """Lance `run(loader)` dans un thread : le serveur répond pendant le chargement"""
+        def target():
+            try:
+                self.run(loader)
+            except BaseException:
+                pass  # déjà enregistré : /health et /ready le signalent
+
+        thread = threading.Thread(target=target, name=f"{self.service}-startup", daemon=True)
+        thread.start()
+        return thread
+
+
+def start_health_server(state, port, host="0.0.0.0"):
+    """Sert /health et /ready (stdlib, thread dédié) pour les services sans API HTTP"""
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/health":
+                body = state.liveness()
+                status = 503 if state.error else 200
+            elif path == "/ready":
+                body = state.readiness()
+                status = 200 if state.ready else 503
+            else:
+                body, status = {"detail": "Not Found"}, 404
+
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # pas une ligne de log par sonde
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from docqa_common.segment_protocol import BlobStore, document_messages, message_kind, split_segments
+
+class TestSegmentProtocol(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = BlobStore(self.tmp.name)
+
+    def test_split_segments_on_paragraphs(self):
+        text = "Motif.\n\nAntécédents : HTA.\n\nTraitement : amlodipine.\n\nConclusion."
+        segments = list(split_segments(text, max_chars=30))
+
+        self.assertEqual("".join(segment for _, segment in segments), text)
+        self.assertTrue(all(len(segment) <= 30 for _, segment in segments))
+        self.assertTrue(all(text[offset:offset + len(segment)] == segment for offset, segment in segments))
+        self.assertTrue(segments[0][1].endswith("\n"))
+
+    def test_split_segments_without_breaks(self):
+        segments = list(split_segments("x" * 25, max_chars=10))
+        self.assertEqual([len(segment) for _, segment in segments], [10, 10, 5])
+
+    def test_document_messages(self):
+        text = "a" * 15 + "\n" + "b" * 10
+        messages = document_messages(self.store, 7, text, {"type": "CR"}, max_chars=20)
+
+        self.assertEqual([message_kind(m) for m in messages], ["header", "segment", "segment", "end"])
+        self.assertEqual(messages[0]["total_chars"], len(text))
+        self.assertEqual(messages[-1]["segments"], 2)
+        rebuilt = "".join(self.store.get(m["blob"]) for m in messages[1:-1])
+        self.assertEqual(rebuilt, text)
+        self.assertEqual([m["seq"] for m in messages[1:-1]], [0, 1])
+
+    def test_legacy_message(self):
+        self.assertEqual(message_kind({"doc_id": 1, "text": "..."}), "legacy")
+
+    def test_blob_store_rejects_traversal(self):
+        with self.assertRaises(ValueError):
+            self.store.get("../secret.txt")
+        with self.assertRaises(ValueError):
+            self.store.put("raw/../../x", "texte")
+
+    def test_blob_store_delete(self):
+        self.store.put("raw/1/000000.txt", "texte")
+        self.store.delete("raw/1/000000.txt")
+        self.store.delete("raw/1/000000.txt")
+        with self.assertRaises(FileNotFoundError):
+            self.store.get("raw/1/000000.txt")
+
+    def test_blob_store_dir_is_required(self):
+        with patch.dict(os.environ, clear=True):
+            with self.assertRaises(RuntimeError):
+                BlobStore().put("raw/1/000000.txt", "texte")
+
+    def test_blob_store_reads_dir_from_env(self):
+        with patch.dict(os.environ, {"BLOB_STORE_DIR": self.tmp.name}):
+            BlobStore().put("raw/1/000000.txt", "texte")
+        self.assertEqual(self.store.get("raw/1/000000.txt"), "texte")
+
+if __name__ == '__main__':
+    unittest.main()
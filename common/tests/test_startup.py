@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import json
+import threading
+import urllib.error
+import urllib.request
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from docqa_common.startup import StartupState, start_health_server
+
+class TestStartupState(unittest.TestCase):
+
+    def test_phases_are_profiled(self):
+        state = StartupState("test")
+        with state.phase("model"):
+            self.assertEqual(state.readiness()["loading_phase"], "model")
+        with state.phase("index"):
+            pass
+
+        self.assertEqual(list(state.profile()), ["model", "index"])
+        self.assertIsNone(state.readiness()["loading_phase"])
+        self.assertFalse(state.ready)
+
+    def test_run_marks_ready(self):
+        state = StartupState("test")
+        state.run(lambda: None)
+
+        self.assertTrue(state.ready)
+        self.assertIsNotNone(state.readiness()["time_to_ready_ms"])
+
+    def test_run_records_failure(self):
+        state = StartupState("test")
+
+        def loader():
+            with state.phase("model"):
+                raise RuntimeError("modèle introuvable")
+
+        with self.assertRaises(RuntimeError):
+            state.run(loader)
+        self.assertFalse(state.ready)
+        self.assertEqual(state.liveness()["status"], "failed")
+        self.assertIn("modèle introuvable", state.readiness()["error"])
+
+    def test_load_in_background(self):
+        state = StartupState("test")
+        release = threading.Event()
+
+        thread = state.load_in_background(release.wait)
+        self.assertFalse(state.ready)
+        release.set()
+        thread.join(timeout=5)
+        self.assertTrue(state.ready)
+
+class TestHealthServer(unittest.TestCase):
+
+    def setUp(self):
+        self.state = StartupState("test")
+        self.server = start_health_server(self.state, 0, host="127.0.0.1")
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def get(self, path):
+        try:
+            with urllib.request.urlopen(self.base_url + path, timeout=5) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_live_but_not_ready_while_loading(self):
+        self.assertEqual(self.get("/health")[0], 200)
+        status, body = self.get("/ready")
+        self.assertEqual(status, 503)
+        self.assertFalse(body["ready"])
+
+    def test_ready_after_loading(self):
+        with self.state.phase("model"):
+            pass
+        self.state.mark_ready()
+
+        status, body = self.get("/ready")
+        self.assertEqual(status, 200)
+        self.assertIn("model", body["startup_profile_ms"])
+
+    def test_failed_startup_fails_liveness(self):
+        self.state.mark_failed(RuntimeError("boom"))
+        self.assertEqual(self.get("/health")[0], 503)
+
+    def test_failure_after_ready_fails_readiness(self):
+        self.state.mark_ready()
+        self.state.mark_failed(RuntimeError("pool de workers en échec"))
+
+        self.assertEqual(self.get("/ready")[0], 503)
+        self.assertEqual(self.get("/health")[0], 503)
+
+    def test_unknown_path(self):
+        self.assertEqual(self.get("/metrics")[0], 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,10 +4,15 @@ import time
 import sys
 import os
 import logging # <--- AMÉLIORATION 1
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 
-# Import Presidio
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
+from docqa_common.segment_protocol import BlobStore, blob_ref, message_kind, segment_message
+from docqa_common.startup import WARMUP, StartupState, start_health_server
+
+from batch_analysis import SegmentingAnalyzer
+from tiered_deid import NER_ENTITIES, TieredDeidEngine, load_profiles
+from worker_pool import OrderedAckDispatcher, WorkerPoolError
 
 # --- CONFIGURATION LOGGING ---
 logging.basicConfig(
@@ -23,59 +28,141 @@ OUTPUT_QUEUE = os.getenv("OUTPUT_QUEUE", "clean_documents_queue")
 # Choix du modèle de langue (fr recommandé pour la France)
 NLP_LANG = os.getenv("NLP_LANG", "en") 
 
-# Initialisation
-logger.info(f"Chargement du modèle IA (Presidio) en langue '{NLP_LANG}'...")
-try:
-    analyzer = AnalyzerEngine()
-    anonymizer = AnonymizerEngine()
-    logger.info("Modèle chargé avec succès.")
-except Exception as e:
-    logger.critical(f"Erreur chargement modèle: {e}")
-    logger.critical(f"Avez-vous installé le modèle Spacy ? (python -m spacy download {NLP_LANG}_core_web_lg)")
-    sys.exit(1)
-
-def process_text_anonymization(text):
+# Mode pool : DEID_WORKERS processus d'analyse (1 = consommateur historique)
+DEID_WORKERS = int(os.getenv("DEID_WORKERS", "1"))
+# Messages délivrés d'avance par RabbitMQ (de quoi occuper tous les processus)
+PREFETCH_COUNT = int(os.getenv("PREFETCH_COUNT", str(2 * DEID_WORKERS)))
+# Délai max d'un document dans le pool (au-delà : worker considéré bloqué, pool relancé)
+DEID_TASK_TIMEOUT = float(os.getenv("DEID_TASK_TIMEOUT", "300"))
+# Relances successives du pool sans document traité avant l'arrêt du service
+DEID_MAX_POOL_RESTARTS = int(os.getenv("DEID_MAX_POOL_RESTARTS", "3"))
+
+# Téléphones, e-mails, dates et NIR : regex compilées ; le modèle NER ne
+# cherche que PERSON / LOCATION / NRP (profil ajustable par doc_type)
+DEID_PROFILES_FILE = os.getenv("DEID_PROFILES_FILE")
+TIMING_LOG_INTERVAL = int(os.getenv("TIMING_LOG_INTERVAL", "100"))
+# Analyse par paragraphes (bien en dessous du max_length de spaCy), en lots
+# bornés en caractères : la mémoire ne dépend pas de la longueur du document
+MAX_SEGMENT_CHARS = int(os.getenv("MAX_SEGMENT_CHARS", "5000"))
+MAX_BATCH_CHARS = int(os.getenv("MAX_BATCH_CHARS", "100000"))
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "32"))
+# Sondes /health et /ready, servies avant le chargement du modèle
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8002"))
+WARMUP_TEXT = "Patient Jean Dupont, né le 12/03/1965, suivi à Lyon. Tél : 06 12 34 56 78."
+
+# Initialisation (une fois par processus : service principal ou chaque worker)
+analyzer = None
+anonymizer = None
+deid_engine = None
+
+def init_engines(startup=None):
+    """Charge Presidio et le modèle spaCy (import compris : c'est l'étape la plus lente)"""
+    global analyzer, anonymizer, deid_engine
+    phase = startup.phase if startup else nullcontext
+    logger.info(f"Chargement du modèle IA (Presidio) en langue '{NLP_LANG}'...")
+    try:
+        with phase("import_presidio"):
+            from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerResult
+            from presidio_anonymizer import AnonymizerEngine
+        with phase("nlp_model"):
+            analyzer = AnalyzerEngine()
+        with phase("engines"):
+            anonymizer = AnonymizerEngine()
+            segmenting_analyzer = SegmentingAnalyzer(
+                BatchAnalyzerEngine(analyzer_engine=analyzer), NLP_LANG, list(NER_ENTITIES),
+                max_segment_chars=MAX_SEGMENT_CHARS, max_batch_chars=MAX_BATCH_CHARS, batch_size=NLP_BATCH_SIZE
+            )
+            deid_engine = TieredDeidEngine(segmenting_analyzer, RecognizerResult, load_profiles(DEID_PROFILES_FILE))
+        logger.info("Modèle chargé avec succès.")
+    except Exception as e:
+        logger.critical(f"Erreur chargement modèle: {e}")
+        logger.critical(f"Avez-vous installé le modèle Spacy ? (python -m spacy download {NLP_LANG}_core_web_lg)")
+        sys.exit(1)
+
+def warmup_engines(_=None):
+    """Inférence factice : charge les pipelines spaCy paresseux avant le premier vrai document"""
+    if WARMUP:
+        process_text_anonymization(WARMUP_TEXT)
+    return os.getpid()
+
+blob_store = BlobStore()
+
+def process_text_anonymization(text, doc_type=None):
     if not text: return ""
     
-    # AMÉLIORATION 2 : Utilisation de la variable de langue
-    results = analyzer.analyze(
-        text=text, 
-        entities=["PERSON", "PHONE_NUMBER", "EMAIL_ADDRESS", "DATE_TIME", "NRP", "LOCATION"],
-        language=NLP_LANG
-    )
+    # Regex puis NER (paragraphes analysés par lots, positions recalées sur le texte complet)
+    results = deid_engine.analyze(text, doc_type)
     
+    # Anonymisation en une seule passe sur le texte d'origine
+    start = time.perf_counter()
     anonymized_result = anonymizer.anonymize(text=text, analyzer_results=results)
+    deid_engine.timings.record("anonymize", time.perf_counter() - start)
+
+    if deid_engine.timings.documents % TIMING_LOG_INTERVAL == 0:
+        logger.info(f"Temps DeID : {deid_engine.timings.summary()}")
     return anonymized_result.text
 
+def transform_message(message):
+    """Anonymise un message d'entrée.
+
+    Retourne (message de sortie, blob brut consommé ou None). Les segments
+    sont traités dès réception : le texte est lu dans le blob store, le texte
+    anonymisé y est réécrit et seule sa référence part dans la queue.
+    """
+    doc_id = message.get("doc_id", "UNKNOWN")
+    kind = message_kind(message)
+
+    if kind == "segment":
+        raw_text = blob_store.get(message["blob"])
+        logger.info(f"[->] Reçu Doc ID {doc_id} segment {message['seq']} ({len(raw_text)} chars)")
+        clean_text = process_text_anonymization(raw_text, message.get("metadata", {}).get("type"))
+        ref = blob_store.put(blob_ref("masked", doc_id, message["seq"]), clean_text)
+        # char_offset : position du segment dans le texte extrait d'origine
+        output_message = segment_message(
+            doc_id, message["seq"], ref, message["char_offset"], len(clean_text), message.get("metadata", {})
+        )
+        output_message["processed_at"] = time.time()
+        return output_message, message["blob"]
+
+    if kind in ("header", "end"):
+        # En-tête et marqueur de fin transmis tels quels
+        logger.info(f"[->] Reçu Doc ID {doc_id} ({kind})")
+        return message, None
+
+    # Format historique : texte complet dans le message
+    raw_text = message.get("text", "")
+    logger.info(f"[->] Reçu Doc ID {doc_id} ({len(raw_text)} chars)")
+    output_message = {
+        "doc_id": doc_id,
+        "original_text_masked": process_text_anonymization(raw_text, message.get("metadata", {}).get("type")),
+        "metadata": message.get("metadata", {}),
+        "processed_at": time.time()
+    }
+    return output_message, None
+
+def publish_result(ch, output_message, consumed_blob):
+    # AMÉLIORATION 3 : Déclaration de la queue de sortie ici aussi par sécurité
+    ch.queue_declare(queue=OUTPUT_QUEUE, durable=True)
+    
+    ch.basic_publish(
+        exchange='',
+        routing_key=OUTPUT_QUEUE,
+        body=json.dumps(output_message),
+        properties=pika.BasicProperties(delivery_mode=2)
+    )
+    # Le texte brut (non anonymisé) ne reste pas sur disque une fois traité
+    if consumed_blob:
+        blob_store.delete(consumed_blob)
+    
+    logger.info(f"[<-] Doc ID {output_message.get('doc_id')} anonymisé -> '{OUTPUT_QUEUE}'")
+
 def callback(ch, method, properties, body):
     try:
         message = json.loads(body)
-        doc_id = message.get("doc_id", "UNKNOWN")
-        raw_text = message.get("text", "")
-        
-        logger.info(f"[->] Reçu Doc ID {doc_id} ({len(raw_text)} chars)")
 
         # Traitement
-        clean_text = process_text_anonymization(raw_text)
-
-        output_message = {
-            "doc_id": doc_id,
-            "original_text_masked": clean_text,
-            "metadata": message.get("metadata", {}),
-            "processed_at": time.time()
-        }
-
-        # AMÉLIORATION 3 : Déclaration de la queue de sortie ici aussi par sécurité
-        ch.queue_declare(queue=OUTPUT_QUEUE, durable=True)
-        
-        ch.basic_publish(
-            exchange='',
-            routing_key=OUTPUT_QUEUE,
-            body=json.dumps(output_message),
-            properties=pika.BasicProperties(delivery_mode=2)
-        )
-        
-        logger.info(f"[<-] Doc ID {doc_id} anonymisé -> '{OUTPUT_QUEUE}'")
+        output_message, consumed_blob = transform_message(message)
+        publish_result(ch, output_message, consumed_blob)
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
     except json.JSONDecodeError:
@@ -86,28 +173,83 @@ def callback(ch, method, properties, body):
         # En prod, on pourrait mettre requeue=True avec un compteur d'essais
         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
+def transform_body(body):
+    """Point d'entrée des workers du pool (corps brut -> message de sortie)"""
+    return transform_message(json.loads(body))
+
+def make_pool():
+    """Pool de DEID_WORKERS processus, chacun chargeant son propre AnalyzerEngine une seule fois"""
+    pool = ProcessPoolExecutor(DEID_WORKERS, initializer=init_engines)
+    # Retourne quand des workers ont chargé le modèle (et fait l'échauffement) ;
+    # BrokenProcessPool si un worker meurt pendant le chargement
+    list(pool.map(warmup_engines, range(DEID_WORKERS)))
+    return pool
+
+def consume(channel, connection, dispatcher=None):
+    channel.queue_declare(queue=INPUT_QUEUE, durable=True)
+    channel.basic_qos(prefetch_count=PREFETCH_COUNT if dispatcher else 1)
+
+    if dispatcher is None:
+        channel.basic_consume(queue=INPUT_QUEUE, on_message_callback=callback)
+        logger.info('Service DeID démarré. En attente de documents...')
+        channel.start_consuming()
+        return
+
+    channel.basic_consume(queue=INPUT_QUEUE, on_message_callback=dispatcher.on_message)
+    logger.info(f'Service DeID démarré ({DEID_WORKERS} workers, prefetch {PREFETCH_COUNT}). En attente de documents...')
+    while True:
+        # Réception des messages et heartbeats, puis acquittement des résultats prêts
+        connection.process_data_events(time_limit=0.05)
+        dispatcher.drain(channel)
+
 def start_service():
+    # BLOB_STORE_DIR obligatoire : arrêt immédiat plutôt qu'une erreur au premier segment
+    logger.info(f"Blob store : {blob_store.directory}")
+    startup = StartupState("deid-service")
+    start_health_server(startup, HEALTH_PORT)
+    logger.info(f"Sondes /health et /ready sur le port {HEALTH_PORT}")
+
+    dispatcher = None
+    if DEID_WORKERS > 1:
+        with startup.phase("worker_pool"):
+            dispatcher = OrderedAckDispatcher(
+                make_pool, transform_body, publish_result, logger,
+                task_timeout=DEID_TASK_TIMEOUT, max_restarts=DEID_MAX_POOL_RESTARTS
+            )
+    else:
+        init_engines(startup)
+        if WARMUP:
+            with startup.phase("warmup"):
+                warmup_engines()
+    startup.mark_ready()
+
     while True:
         try:
             logger.info(f"Connexion à RabbitMQ ({RABBITMQ_HOST})...")
             connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
             channel = connection.channel()
-
-            channel.queue_declare(queue=INPUT_QUEUE, durable=True)
-            channel.basic_qos(prefetch_count=1)
-            channel.basic_consume(queue=INPUT_QUEUE, on_message_callback=callback)
-
-            logger.info('Service DeID démarré. En attente de documents...')
-            channel.start_consuming()
+            consume(channel, connection, dispatcher)
             
         except pika.exceptions.AMQPConnectionError:
             logger.warning("RabbitMQ indisponible. Retentative dans 5s...")
+            if dispatcher:
+                dispatcher.reset()
             time.sleep(5)
+        except WorkerPoolError as e:
+            # /health et /ready passent en 503 ; messages non acquittés redélivrés par RabbitMQ
+            logger.critical(str(e))
+            startup.mark_failed(e)
+            try: connection.close()
+            except: pass
+            dispatcher.close()
+            sys.exit(1)
         except KeyboardInterrupt:
             logger.info("Arrêt du service.")
             try: connection.close()
             except: pass
+            if dispatcher:
+                dispatcher.close()
             break
 
 if __name__ == "__main__":
-    start_service()
\ No newline at end of file
+    start_service()
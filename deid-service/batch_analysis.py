@@ -0,0 +1,89 @@
+import re
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t\r\f\v]*\n")
+_WHITESPACE = re.compile(r"\s")
+
+
+def paragraph_spans(text, max_chars):
+    """(start, end) des paragraphes non vides du texte, chacun d'au plus max_chars caractères.
+
+    Un paragraphe trop long est recoupé au dernier blanc de la fenêtre (ou à
+    la limite exacte s'il n'y en a pas).
+    """
+    start = 0
+    for match in [*_PARAGRAPH_BREAK.finditer(text), None]:
+        end = match.start() if match else len(text)
+        while start < end:
+            piece_end = min(start + max_chars, end)
+            if piece_end < end:
+                cut = max((m.start() for m in _WHITESPACE.finditer(text, start, piece_end)), default=-1)
+                if cut > start:
+                    piece_end = cut + 1
+            if text[start:piece_end].strip():
+                yield start, piece_end
+            start = piece_end
+        start = match.end() if match else end
+
+
+def batched(spans, max_batch_chars):
+    """Regroupe des spans (doc, start, end) consécutifs par lots d'au plus max_batch_chars caractères"""
+    batch, size = [], 0
+    for span in spans:
+        length = span[2] - span[1]
+        if batch and size + length > max_batch_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(span)
+        size += length
+    if batch:
+        yield batch
+
+
+class SegmentingAnalyzer:
+    """Analyse Presidio par paragraphes, en lots passés à spaCy (`nlp.pipe`).
+
+    `batch_analyzer` est un `BatchAnalyzerEngine` : chaque lot de paragraphes
+    (au plus `max_batch_chars` caractères) est analysé en un appel, puis les
+    positions des entités sont recalées sur le texte d'origine. La mémoire de
+    spaCy dépend de la taille d'un lot, pas de la longueur du document.
+
+    Le service n'appelle que `analyze` (un message = un document, analysé par
+    TieredDeidEngine avec le profil de son doc_type). `analyze_many` sait
+    regrouper les paragraphes de plusieurs textes dans les mêmes lots, mais
+    aucun consommateur ne lui passe encore plusieurs livraisons à la fois.
+    """
+
+    def __init__(self, batch_analyzer, language, entities,
+                 max_segment_chars=5000, max_batch_chars=100000, batch_size=32):
+        self.batch_analyzer = batch_analyzer
+        self.language = language
+        self.entities = entities
+        self.max_segment_chars = max_segment_chars
+        self.max_batch_chars = max_batch_chars
+        self.batch_size = batch_size
+
+    def _spans(self, texts):
+        for doc, text in enumerate(texts):
+            for start, end in paragraph_spans(text, self.max_segment_chars):
+                yield doc, start, end
+
+    def analyze_many(self, texts, entities=None):
+        """Liste de résultats (RecognizerResult, positions dans chaque texte) par texte"""
+        entities = self.entities if entities is None else entities
+        results = [[] for _ in texts]
+        for batch in batched(self._spans(texts), self.max_batch_chars):
+            per_segment = self.batch_analyzer.analyze_iterator(
+                [texts[doc][start:end] for doc, start, end in batch],
+                language=self.language,
+                batch_size=self.batch_size,
+                entities=entities
+            )
+            for (doc, start, _), segment_results in zip(batch, per_segment):
+                for result in segment_results:
+                    result.start += start
+                    result.end += start
+                    results[doc].append(result)
+        return results
+
+    def analyze(self, text, entities=None):
+        return self.analyze_many([text], entities)[0]
@@ -0,0 +1,102 @@
+"""Benchmark du DeID à niveaux sur un corpus clinique français synthétique.
+
+1. Niveau regex : temps de chaque expression seule et de la passe combinée,
+   nombre d'identifiants détectés par type (attendus : 1 NIR, 1 téléphone,
+   1 e-mail et 1 + N dates par document).
+2. Si Presidio et le modèle spaCy sont installés (sans --regex-only) :
+   - référence : `AnalyzerEngine.analyze` sur les 6 entités historiques ;
+   - DeID à niveaux (regex + NER PERSON/LOCATION/NRP par lots) ;
+   - temps par recognizer Presidio (analyse spaCy comptée à part).
+
+Usage (depuis deid-service/) :
+    python benchmarks/bench_tiered.py --docs 200
+    python benchmarks/bench_tiered.py --regex-only
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_corpus import make_corpus
+from tiered_deid import PATTERNS, StructuredPIIMatcher
+
+LEGACY_ENTITIES = ["PERSON", "PHONE_NUMBER", "EMAIL_ADDRESS", "DATE_TIME", "NRP", "LOCATION"]
+
+
+def timed(fn, docs):
+    start = time.perf_counter()
+    out = [fn(doc) for doc in docs]
+    return 1000 * (time.perf_counter() - start) / len(docs), out
+
+
+def bench_regex(docs, paragraphs):
+    print("-- Niveau 1 : expressions régulières --")
+    print(f"{'motif':>14} | {'ms/doc':>8} | {'détectés/doc':>12}")
+    for entity in PATTERNS:
+        regex = re.compile(PATTERNS[entity], re.IGNORECASE)
+        ms, _ = timed(lambda doc: regex.findall(doc), docs)
+        matcher = StructuredPIIMatcher([entity])
+        found = sum(len(matcher.find(doc)) for doc in docs)
+        print(f"{entity:>14} | {ms:8.3f} | {found / len(docs):12.2f}")
+
+    matcher = StructuredPIIMatcher(PATTERNS)
+    ms, results = timed(matcher.find, docs)
+    counts = Counter(entity for found in results for entity, _, _ in found)
+    print(f"{'combinée':>14} | {ms:8.3f} | {sum(counts.values()) / len(docs):12.2f}")
+    print(f"attendu/doc : FR_NIR 1, PHONE_NUMBER 1, EMAIL_ADDRESS 1, DATE_TIME {1 + paragraphs} ; "
+          f"obtenu : { {k: round(v / len(docs), 2) for k, v in counts.items()} }")
+
+
+def bench_presidio(docs):
+    from presidio_analyzer import AnalyzerEngine, BatchAnalyzerEngine, RecognizerResult
+    from batch_analysis import SegmentingAnalyzer
+    from tiered_deid import NER_ENTITIES, TieredDeidEngine
+
+    language = os.getenv("NLP_LANG", "en")
+    analyzer = AnalyzerEngine()
+    analyzer.analyze(docs[0], entities=LEGACY_ENTITIES, language=language)  # préchauffage
+
+    print("\n-- Référence vs DeID à niveaux --")
+    legacy_ms, _ = timed(lambda doc: analyzer.analyze(doc, entities=LEGACY_ENTITIES, language=language), docs)
+    engine = TieredDeidEngine(
+        SegmentingAnalyzer(BatchAnalyzerEngine(analyzer_engine=analyzer), language, list(NER_ENTITIES)),
+        RecognizerResult
+    )
+    tiered_ms, _ = timed(engine.analyze, docs)
+    print(f"référence (6 entités, analyze)  : {legacy_ms:8.1f} ms/doc")
+    print(f"à niveaux (regex + NER par lots) : {tiered_ms:8.1f} ms/doc  (x{legacy_ms / tiered_ms:.1f})")
+    print(f"répartition : {engine.timings.summary()}")
+
+    print("\n-- Temps par recognizer Presidio (registre complet) --")
+    nlp_ms, artifacts = timed(lambda doc: analyzer.nlp_engine.process_text(doc, language), docs)
+    print(f"{'spaCy (nlp)':>32} | {nlp_ms:8.2f} ms/doc")
+    for recognizer in analyzer.registry.get_recognizers(language=language, entities=LEGACY_ENTITIES):
+        start = time.perf_counter()
+        for doc, nlp_artifacts in zip(docs, artifacts):
+            recognizer.analyze(doc, recognizer.supported_entities, nlp_artifacts)
+        ms = 1000 * (time.perf_counter() - start) / len(docs)
+        print(f"{recognizer.name:>32} | {ms:8.2f} ms/doc")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=8)
+    parser.add_argument("--regex-only", action="store_true")
+    args = parser.parse_args()
+
+    docs = make_corpus(args.docs, args.paragraphs)
+    print(f"{args.docs} comptes-rendus synthétiques, {sum(map(len, docs)) // len(docs)} caractères en moyenne\n")
+    bench_regex(docs, args.paragraphs)
+    if not args.regex_only:
+        bench_presidio(docs)
+
+
+if __name__ == "__main__":
+    main()
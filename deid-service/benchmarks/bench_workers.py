@@ -0,0 +1,109 @@
+"""Benchmark de montée en charge du mode pool de DeID (documents/s de 1 à N processus).
+
+Les documents passent par le même chemin que le service : `OrderedAckDispatcher`
+(prefetch = 2 x workers, acquittement dans l'ordre) et `transform_body` dans
+un `ProcessPoolExecutor` dont chaque processus charge Presidio une fois.
+Le canal RabbitMQ est simulé en mémoire : seul le coût DeID est mesuré.
+
+Avec `--simulated`, l'analyse Presidio est remplacée par une boucle CPU
+proportionnelle à la longueur du texte (pour vérifier la mécanique sans
+modèle spaCy installé).
+
+Usage (depuis deid-service/) :
+    python benchmarks/bench_workers.py --docs 200 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_corpus import make_corpus
+from worker_pool import OrderedAckDispatcher
+
+
+class MemoryChannel:
+    def __init__(self):
+        self.acked = 0
+
+    def basic_ack(self, delivery_tag):
+        self.acked += 1
+
+    def basic_nack(self, delivery_tag, requeue):
+        self.acked += 1
+
+
+class Method:
+    def __init__(self, delivery_tag):
+        self.delivery_tag = delivery_tag
+
+
+def simulated_transform(body):
+    text = json.loads(body)["text"]
+    checksum = 0
+    for _ in range(20):
+        for c in text:
+            checksum = (checksum * 31 + ord(c)) & 0xFFFFFFFF
+    return {"doc_id": checksum}, None
+
+
+def real_init():
+    import anonymizer
+    anonymizer.init_engines()
+
+
+def real_transform(body):
+    import anonymizer
+    return anonymizer.transform_body(body)
+
+
+def run(workers, bodies, transform, initializer):
+    def make_pool():
+        pool = ProcessPoolExecutor(workers, initializer=initializer)
+        # Préchauffage : les modèles sont chargés avant la mesure
+        list(pool.map(transform, bodies[:workers]))
+        return pool
+
+    channel = MemoryChannel()
+    dispatcher = OrderedAckDispatcher(make_pool, transform, lambda ch, out, blob: None)
+    prefetch = 2 * workers
+    start = time.perf_counter()
+    next_body = 0
+    while channel.acked < len(bodies):
+        # Comme RabbitMQ : au plus `prefetch` messages non acquittés
+        while next_body < len(bodies) and len(dispatcher.pending) < prefetch:
+            dispatcher.on_message(channel, Method(next_body), None, bodies[next_body])
+            next_body += 1
+        if not dispatcher.drain(channel):
+            time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    dispatcher.close()
+    return len(bodies) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--simulated", action="store_true")
+    args = parser.parse_args()
+
+    bodies = [json.dumps({"doc_id": i, "text": text, "metadata": {}}) for i, text in enumerate(make_corpus(args.docs))]
+    transform, initializer = (simulated_transform, None) if args.simulated else (real_transform, real_init)
+
+    print(f"{args.docs} documents, {os.cpu_count()} cœurs ({'analyse simulée' if args.simulated else 'Presidio'})")
+    print(f"{'workers':>7} | {'docs/s':>8} | {'accélération':>12}")
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        rate = run(workers, bodies, transform, initializer)
+        baseline = baseline or rate
+        print(f"{workers:>7} | {rate:8.1f} | {rate / baseline:11.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Corpus synthétique de comptes-rendus cliniques français (aucune donnée réelle).
+
+Chaque document mélange du texte médical et des identifiants : noms, villes,
+téléphones, e-mails, dates, numéros de sécurité sociale (NIR).
+"""
+import random
+
+PRENOMS = ["Jean", "Marie", "Pierre", "Sophie", "Luc", "Camille", "Nadia", "Karim", "Élise", "Thomas"]
+NOMS = ["Dupont", "Martin", "Bernard", "Durand", "Lefèvre", "Moreau", "Benali", "Girard", "Roux", "Fournier"]
+VILLES = ["Lyon", "Marseille", "Toulouse", "Bordeaux", "Lille", "Nantes", "Rennes", "Strasbourg"]
+PHRASES = [
+    "Patient admis pour douleur thoracique atypique, ECG sans anomalie.",
+    "Antécédents : HTA traitée par amlodipine 5 mg, diabète de type 2.",
+    "Bilan biologique : CRP à 12 mg/L, créatinine normale, NFS sans particularité.",
+    "Scanner thoracique : absence d'embolie pulmonaire, pas d'épanchement.",
+    "Évolution favorable sous traitement, sortie autorisée avec suivi en consultation.",
+    "Allergie connue à la pénicilline, pas d'autre allergie médicamenteuse.",
+    "Examen clinique : auscultation cardio-pulmonaire normale, abdomen souple.",
+    "Traitement de sortie : metformine 1000 mg matin et soir, ramipril 5 mg.",
+]
+
+MOIS = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août", "septembre", "octobre", "novembre", "décembre"]
+MOIS_ABREGES = ["janv.", "févr.", "mars", "avr.", "mai", "juin", "juil.", "août", "sept.", "oct.", "nov.", "déc."]
+
+
+def date(rng):
+    """Date de consultation en 2024, dans un des formats courants des comptes-rendus"""
+    day, month = rng.randint(1, 28), rng.randint(1, 12)
+    return rng.choice([
+        f"{day:02d}/{month:02d}/2024",
+        f"{day:02d}/{month:02d}",
+        f"{day} {MOIS[month - 1]}",
+        f"{day} {MOIS[month - 1]} 2024",
+        f"{day} {MOIS_ABREGES[month - 1]} 2024",
+        f"en {MOIS[month - 1]} 2024",
+    ])
+
+
+def phone(rng):
+    if rng.random() < 0.8:
+        return f"0{rng.randint(1, 7)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)} {rng.randint(10, 99)}"
+    # Numéro étranger (Royaume-Uni, Belgique)
+    return rng.choice([f"+44 20 7946 {rng.randint(0, 9999):04d}", f"+32 2 {rng.randint(200, 799)} {rng.randint(10, 99)} {rng.randint(10, 99)}"])
+
+
+def nir(rng):
+    sexe = rng.choice("12")
+    corps = f"{sexe}{rng.randint(40, 99):02d}{rng.randint(1, 12):02d}{rng.randint(1, 95):02d}{rng.randint(1, 999):03d}{rng.randint(1, 999):03d}"
+    cle = 97 - int(corps) % 97
+    return f"{corps[0]} {corps[1:3]} {corps[3:5]} {corps[5:7]} {corps[7:10]} {corps[10:13]} {cle:02d}"
+
+
+def make_document(rng, paragraphs=8):
+    prenom, nom, ville = rng.choice(PRENOMS), rng.choice(NOMS), rng.choice(VILLES)
+    medecin = f"Dr {rng.choice(PRENOMS)} {rng.choice(NOMS)}"
+    lines = [
+        f"COMPTE-RENDU D'HOSPITALISATION",
+        f"Patient : {prenom} {nom}, né le {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1940, 2005)}, domicilié à {ville}.",
+        f"N° de sécurité sociale : {nir(rng)}",
+        f"Téléphone : {phone(rng)}",
+        f"Contact : {prenom.lower()}.{nom.lower()}@exemple.fr",
+        "",
+    ]
+    for _ in range(paragraphs):
+        lines.append(" ".join(rng.choice(PHRASES) for _ in range(4)))
+        lines.append(f"Vu le {date(rng)} par {medecin}.")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def make_corpus(n_docs, paragraphs=8, seed=0):
+    rng = random.Random(seed)
+    return [make_document(rng, paragraphs) for _ in range(n_docs)]
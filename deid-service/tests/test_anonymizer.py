@@ -6,11 +6,15 @@ import os
 # Add parent directory to path to allow importing modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from anonymizer import process_text_anonymization
+import tempfile
+
+import anonymizer as anonymizer_module
+from anonymizer import process_text_anonymization, transform_message
+from docqa_common.segment_protocol import BlobStore, document_messages
 
 class TestAnonymizer(unittest.TestCase):
 
-    @patch('anonymizer.analyzer')
+    @patch('anonymizer.deid_engine')
     @patch('anonymizer.anonymizer')
     def test_process_text_anonymization(self, mock_anonymizer_engine, mock_analyzer_engine):
         # Setup mocks
@@ -40,5 +44,42 @@ class TestAnonymizer(unittest.TestCase):
         result = process_text_anonymization(None)
         self.assertEqual(result, "")
 
+class TestSegmentedMessages(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = BlobStore(self.tmp.name)
+        patcher = patch.object(anonymizer_module, 'blob_store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('anonymizer.process_text_anonymization', side_effect=lambda text, doc_type=None: text.replace("Dupont", "<PERSON>"))
+    def test_segment_is_anonymized_through_blob_store(self, mock_process):
+        header, segment, end = document_messages(self.store, 5, "Patient Dupont, HTA.", {"type": "CR"})
+
+        output, consumed = transform_message(segment)
+
+        self.assertEqual(output["kind"], "segment")
+        self.assertEqual(output["seq"], 0)
+        self.assertEqual(self.store.get(output["blob"]), "Patient <PERSON>, HTA.")
+        self.assertEqual(output["metadata"], {"type": "CR"})
+        self.assertEqual(consumed, segment["blob"])
+
+    @patch('anonymizer.process_text_anonymization')
+    def test_header_and_end_pass_through(self, mock_process):
+        header, segment, end = document_messages(self.store, 5, "texte", {})
+
+        self.assertEqual(transform_message(header), (header, None))
+        self.assertEqual(transform_message(end), (end, None))
+        mock_process.assert_not_called()
+
+    @patch('anonymizer.process_text_anonymization', return_value="<PERSON>")
+    def test_legacy_message(self, mock_process):
+        output, consumed = transform_message({"doc_id": 1, "text": "Dupont", "metadata": {}})
+
+        self.assertEqual(output["original_text_masked"], "<PERSON>")
+        self.assertIsNone(consumed)
+
 if __name__ == '__main__':
     unittest.main()
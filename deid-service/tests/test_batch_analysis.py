@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import re
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_analysis import SegmentingAnalyzer, batched, paragraph_spans
+
+class Result:
+    def __init__(self, entity_type, start, end):
+        self.entity_type, self.start, self.end = entity_type, start, end
+
+class FakeBatchAnalyzer:
+    """Trouve les noms connus ; enregistre la taille des lots reçus"""
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_iterator(self, texts, language, batch_size, entities):
+        self.calls.append([len(text) for text in texts])
+        return [[Result("PERSON", m.start(), m.end()) for m in re.finditer(r"Dupont|Martin", text)] for text in texts]
+
+class TestParagraphSpans(unittest.TestCase):
+
+    def test_paragraphs(self):
+        text = "Motif.\n\n  \n\nAntécédents : HTA.\n \nConclusion."
+        spans = list(paragraph_spans(text, 1000))
+        self.assertEqual([text[s:e] for s, e in spans], ["Motif.", "Antécédents : HTA.", "Conclusion."])
+
+    def test_long_paragraph_is_split_on_whitespace(self):
+        text = " ".join(["mot"] * 50)
+        spans = list(paragraph_spans(text, 20))
+
+        self.assertTrue(all(e - s <= 20 for s, e in spans))
+        self.assertEqual("".join(text[s:e] for s, e in spans), text)
+        self.assertTrue(all(text[e - 1] == " " for s, e in spans[:-1]))
+
+    def test_batched(self):
+        spans = [(0, 0, 40), (0, 40, 80), (0, 80, 150), (1, 0, 10)]
+        self.assertEqual([len(b) for b in batched(spans, 100)], [2, 2])
+
+class TestSegmentingAnalyzer(unittest.TestCase):
+
+    def test_offsets_remapped_to_original_text(self):
+        text = "Patient Dupont admis.\n\nSuivi par le Dr Martin.\n\nRAS."
+        analyzer = SegmentingAnalyzer(FakeBatchAnalyzer(), "fr", ["PERSON"], max_segment_chars=100)
+
+        results = analyzer.analyze(text)
+
+        self.assertEqual([text[r.start:r.end] for r in results], ["Dupont", "Martin"])
+
+    def test_batches_bounded_for_long_document(self):
+        fake = FakeBatchAnalyzer()
+        text = "\n\n".join(f"Paragraphe {i} : patient Dupont, HTA." for i in range(1000))
+        analyzer = SegmentingAnalyzer(fake, "fr", ["PERSON"], max_segment_chars=200, max_batch_chars=2000)
+
+        results = analyzer.analyze(text)
+
+        self.assertEqual(len(results), 1000)
+        self.assertTrue(all(text[r.start:r.end] == "Dupont" for r in results))
+        self.assertTrue(all(sum(call) <= 2000 for call in fake.calls))
+        self.assertGreater(len(fake.calls), 1)
+
+    def test_many_short_documents_share_a_batch(self):
+        fake = FakeBatchAnalyzer()
+        texts = ["M. Dupont.", "", "Mme Martin, HTA."]
+        analyzer = SegmentingAnalyzer(fake, "fr", ["PERSON"])
+
+        results = analyzer.analyze_many(texts)
+
+        self.assertEqual(len(fake.calls), 1)
+        self.assertEqual([[texts[i][r.start:r.end] for r in rs] for i, rs in enumerate(results)],
+                         [["Dupont"], [], ["Martin"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import json
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tiered_deid import DEFAULT_PROFILES, NER_ENTITIES, StructuredPIIMatcher, TieredDeidEngine, load_profiles, valid_nir, PATTERNS
+
+class Result:
+    def __init__(self, entity_type, start, end, score):
+        self.entity_type, self.start, self.end, self.score = entity_type, start, end, score
+
+def found(text, entity_types=PATTERNS):
+    return [(entity, text[start:end]) for entity, start, end in StructuredPIIMatcher(entity_types).find(text)]
+
+class TestStructuredPIIMatcher(unittest.TestCase):
+
+    def test_phones(self):
+        text = "Tél : 06 12 34 56 78, fixe 01.23.45.67.89, portable +33 6 12 34 56 78."
+        self.assertEqual([v for e, v in found(text) if e == "PHONE_NUMBER"],
+                         ["06 12 34 56 78", "01.23.45.67.89", "+33 6 12 34 56 78"])
+
+    def test_email(self):
+        self.assertEqual(found("Contact : jean.dupont@chu-lyon.fr."), [("EMAIL_ADDRESS", "jean.dupont@chu-lyon.fr")])
+        self.assertEqual(found("héloïse.lefèvre@exemple.fr"), [("EMAIL_ADDRESS", "héloïse.lefèvre@exemple.fr")])
+
+    def test_dates(self):
+        text = "Né le 03/07/1985, vu le 2024-02-01 et le 1er mars 2024."
+        self.assertEqual([v for e, v in found(text)], ["03/07/1985", "2024-02-01", "1er mars 2024"])
+
+    def test_dates_day_month_and_month_year(self):
+        text = "Vu le 3 juillet, revu en juillet 2024, puis le 12 sept. 2023 et le 15/03."
+        self.assertEqual([v for e, v in found(text) if e == "DATE_TIME"],
+                         ["3 juillet", "juillet 2024", "12 sept. 2023", "15/03"])
+
+    def test_dates_abbreviated_and_english(self):
+        text = "Bilan le 2 févr. 2022, contrôle le 5 janv, admitted July 3, 2024 and 14 Aug 2023."
+        self.assertEqual([v for e, v in found(text) if e == "DATE_TIME"],
+                         ["2 févr. 2022", "5 janv", "July 3, 2024", "14 Aug 2023"])
+
+    def test_international_phones(self):
+        text = "Famille à Londres, tél +44 20 7946 0958 ; fille : +1 (415) 555-2671 ou 0044 20 7946 0958."
+        self.assertEqual([v for e, v in found(text) if e == "PHONE_NUMBER"],
+                         ["+44 20 7946 0958", "+1 (415) 555-2671", "0044 20 7946 0958"])
+
+    def test_phone_found_once(self):
+        # Les numéros français trouvés par la regex ne sont pas ajoutés une seconde fois
+        self.assertEqual(found("Tél : 06 12 34 56 78."), [("PHONE_NUMBER", "06 12 34 56 78")])
+
+    def test_nir_with_valid_key(self):
+        nir = "1 85 03 75 123 456"
+        key = 97 - int(nir.replace(" ", "")) % 97
+        text = f"NIR : {nir} {key:02d}"
+        self.assertEqual(found(text), [("FR_NIR", f"{nir} {key:02d}")])
+
+    def test_nir_with_invalid_key_is_ignored(self):
+        nir = "185037512345"
+        key = (97 - int(nir + "6") % 97 + 1) % 97
+        self.assertFalse(valid_nir(f"{nir}6{key:02d}"))
+
+    def test_nir_corsica(self):
+        body = "28512" + "2A" + "123456"
+        key = 97 - int(body.replace("2A", "19")) % 97
+        self.assertTrue(valid_nir(f"{body}{key:02d}"))
+
+    def test_profile_subset(self):
+        text = "06 12 34 56 78 le 03/07/1985"
+        self.assertEqual(found(text, ["DATE_TIME"]), [("DATE_TIME", "03/07/1985")])
+
+    def test_clinical_values_not_matched(self):
+        self.assertEqual(found("CRP à 12 mg/L, TA 13/8, PA 120/80, Hb 3.12, amlodipine 5 mg."), [])
+
+class TestTieredDeidEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.ner = MagicMock()
+        self.ner.analyze.return_value = [Result("PERSON", 10, 16, 0.85)]
+        self.engine = TieredDeidEngine(self.ner, Result, load_profiles())
+
+    def test_default_profile_runs_regex_then_restricted_ner(self):
+        results = self.engine.analyze("Patient : Dupont, tél 06 12 34 56 78")
+
+        self.assertEqual(sorted(r.entity_type for r in results), ["PERSON", "PHONE_NUMBER"])
+        self.assertEqual(self.ner.analyze.call_args.kwargs["entities"], list(NER_ENTITIES))
+        self.assertIn("regex", self.engine.timings.seconds)
+        self.assertIn("ner", self.engine.timings.seconds)
+
+    def test_default_profiles_mask_patient_documents_fully(self):
+        # Ordonnance : l'adresse du patient (LOCATION) reste masquée par défaut
+        self.engine.analyze("Dr Martin, 12 rue des Lilas, Lyon", doc_type="ORDONNANCE")
+        self.assertEqual(self.ner.analyze.call_args.kwargs["entities"], list(NER_ENTITIES))
+
+    def test_profile_per_doc_type_from_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump({"ORDONNANCE": {"patterns": list(PATTERNS), "ner": ["PERSON"]}}, f)
+        self.addCleanup(os.remove, f.name)
+        engine = TieredDeidEngine(self.ner, Result, load_profiles(f.name))
+
+        engine.analyze("Dr Martin", doc_type="ORDONNANCE")
+        self.assertEqual(self.ner.analyze.call_args.kwargs["entities"], ["PERSON"])
+        self.assertIn("default", engine.profiles)
+
+    def test_no_weaker_builtin_profile(self):
+        # doc_type choisi librement à l'upload : tout document est masqué complètement par défaut
+        results = self.engine.analyze("Dupont, NIR 1 85 03 75 123 456, vu le 3 juillet", doc_type="knowledge_base")
+        self.assertEqual(self.ner.analyze.call_args.kwargs["entities"], list(NER_ENTITIES))
+        self.assertIn("DATE_TIME", [r.entity_type for r in results])
+
+    def test_profile_without_ner_skips_model(self):
+        engine = TieredDeidEngine(self.ner, Result, {
+            **load_profiles(), "knowledge_base": {"patterns": ["EMAIL_ADDRESS"], "ner": []}
+        })
+        engine.analyze("Formule Si Jun Zi Tang", doc_type="knowledge_base")
+        self.ner.analyze.assert_not_called()
+
+    def test_incomplete_profile_falls_back_to_default(self):
+        engine = TieredDeidEngine(self.ner, Result, {**load_profiles(), "CR": {"ner": ["PERSON"]}})
+
+        engine.analyze("Dupont, tél 06 12 34 56 78", doc_type="CR")
+
+        self.assertEqual(engine.profile("CR"), engine.profiles["default"])
+        self.assertEqual(self.ner.analyze.call_args.kwargs["entities"], list(NER_ENTITIES))
+
+    def test_incomplete_default_falls_back_to_builtin(self):
+        engine = TieredDeidEngine(self.ner, Result, {"default": {"patterns": []}})
+        self.assertEqual(engine.profile(), DEFAULT_PROFILES["default"])
+
+    def test_unknown_doc_type_uses_default(self):
+        self.assertEqual(self.engine.profile("inconnu"), self.engine.profiles["default"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from worker_pool import OrderedAckDispatcher, WorkerPoolError
+
+def slow_transform(body):
+    message = json.loads(body)
+    time.sleep(message["delay"])
+    return {"doc_id": message["doc_id"]}, None
+
+def crashing_transform(body):
+    message = json.loads(body)
+    if message.get("crash"):
+        os._exit(1)  # comme un worker tué par l'OOM killer
+    return {"doc_id": message["doc_id"]}, None
+
+class TestOrderedAckDispatcher(unittest.TestCase):
+
+    def setUp(self):
+        self.published = []
+        self.channel = MagicMock()
+
+    def make_dispatcher(self, transform=slow_transform, pool_factory=None, **kwargs):
+        dispatcher = OrderedAckDispatcher(pool_factory or (lambda: ThreadPoolExecutor(4)), transform, self.on_result, **kwargs)
+        self.addCleanup(lambda: dispatcher.close())
+        return dispatcher
+
+    def on_result(self, ch, output_message, consumed_blob):
+        self.published.append(output_message["doc_id"])
+
+    def deliver(self, dispatcher, tag, body, redelivered=False):
+        method = MagicMock()
+        method.delivery_tag = tag
+        method.redelivered = redelivered
+        dispatcher.on_message(self.channel, method, None, body)
+
+    def drain_all(self, dispatcher):
+        deadline = time.time() + 5
+        while dispatcher.pending and time.time() < deadline:
+            dispatcher.drain(self.channel)
+            time.sleep(0.01)
+
+    def test_acks_in_delivery_order(self):
+        dispatcher = self.make_dispatcher()
+        # Le premier message est le plus lent : aucun ack avant qu'il soit terminé
+        for tag, delay in ((1, 0.2), (2, 0.0), (3, 0.05)):
+            self.deliver(dispatcher, tag, json.dumps({"doc_id": tag, "delay": delay}))
+
+        time.sleep(0.1)
+        self.assertEqual(dispatcher.drain(self.channel), 0)
+
+        self.drain_all(dispatcher)
+        acked = [call.kwargs["delivery_tag"] for call in self.channel.basic_ack.call_args_list]
+        self.assertEqual(acked, [1, 2, 3])
+        self.assertEqual(self.published, [1, 2, 3])
+
+    def test_failed_message_is_nacked_in_order(self):
+        dispatcher = self.make_dispatcher()
+        self.deliver(dispatcher, 1, "pas du json")
+        self.deliver(dispatcher, 2, json.dumps({"doc_id": 2, "delay": 0}))
+
+        self.drain_all(dispatcher)
+        self.channel.basic_nack.assert_called_once_with(delivery_tag=1, requeue=False)
+        self.channel.basic_ack.assert_called_once_with(delivery_tag=2)
+
+    def test_reset_drops_pending(self):
+        dispatcher = self.make_dispatcher()
+        self.deliver(dispatcher, 1, json.dumps({"doc_id": 1, "delay": 0}))
+        dispatcher.reset()
+
+        self.assertEqual(dispatcher.drain(self.channel), 0)
+        self.channel.basic_ack.assert_not_called()
+
+    def nacks(self):
+        return [(call.kwargs["delivery_tag"], call.kwargs["requeue"]) for call in self.channel.basic_nack.call_args_list]
+
+    def test_dead_worker_requeues_and_restarts_pool(self):
+        # Un seul worker : le message 2 attend derrière celui qui fait tomber le processus
+        dispatcher = self.make_dispatcher(crashing_transform, lambda: ProcessPoolExecutor(1))
+        self.deliver(dispatcher, 1, json.dumps({"doc_id": 1, "crash": True}))
+        self.deliver(dispatcher, 2, json.dumps({"doc_id": 2}))
+
+        self.drain_all(dispatcher)
+
+        # Messages du pool cassé rendus à RabbitMQ, pool remplacé
+        self.assertEqual(sorted(self.nacks()), [(1, True), (2, True)])
+        self.assertEqual(dispatcher.restarts, 1)
+        self.deliver(dispatcher, 3, json.dumps({"doc_id": 3}))
+        self.drain_all(dispatcher)
+        self.channel.basic_ack.assert_called_once_with(delivery_tag=3)
+
+    def test_redelivered_message_is_not_requeued_twice(self):
+        dispatcher = self.make_dispatcher(crashing_transform, lambda: ProcessPoolExecutor(1))
+        self.deliver(dispatcher, 1, json.dumps({"doc_id": 1, "crash": True}), redelivered=True)
+
+        self.drain_all(dispatcher)
+
+        self.assertEqual(self.nacks(), [(1, False)])
+
+    def test_stuck_task_times_out(self):
+        dispatcher = self.make_dispatcher(task_timeout=0.1)
+        self.deliver(dispatcher, 1, json.dumps({"doc_id": 1, "delay": 1.0}))
+        self.deliver(dispatcher, 2, json.dumps({"doc_id": 2, "delay": 0}))
+
+        time.sleep(0.15)
+        dispatcher.drain(self.channel)
+
+        self.assertEqual(self.nacks(), [(1, True), (2, True)])
+        self.assertFalse(dispatcher.pending)
+        self.assertEqual(dispatcher.restarts, 1)
+        self.channel.basic_ack.assert_not_called()
+
+    def test_pool_that_cannot_restart_raises(self):
+        pools = [ProcessPoolExecutor(1)]
+
+        def factory():
+            if pools:
+                return pools.pop()
+            raise BrokenProcessPool("worker mort au chargement du modèle")
+
+        dispatcher = self.make_dispatcher(crashing_transform, factory, max_restarts=2)
+        self.deliver(dispatcher, 1, json.dumps({"doc_id": 1, "crash": True}))
+
+        with self.assertRaises(WorkerPoolError):
+            deadline = time.time() + 5
+            while time.time() < deadline:
+                dispatcher.drain(self.channel)
+                time.sleep(0.01)
+        self.assertEqual(self.nacks(), [(1, True)])
+
+if __name__ == '__main__':
+    unittest.main()
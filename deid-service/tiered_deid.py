@@ -0,0 +1,176 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+import phonenumbers
+
+# --- NIVEAU 1 : identifiants structurés, une seule passe d'expressions régulières ---
+# Mois en toutes lettres ou abrégés ("sept.", "janv."), français et anglais
+_MOIS = (
+    r"(?:janvier|f[ée]vrier|mars|avril|mai|juin|juillet|ao[ûu]t|septembre|octobre|novembre|d[ée]cembre"
+    r"|janv|f[ée]vr?|avr|juil|sept|oct|nov|d[ée]c"
+    r"|january|february|march|april|may|june|july|august|september|october|november|december"
+    r"|jan|feb|mar|apr|jun|jul|aug|sep)\b\.?"
+)
+
+PATTERNS = {
+    "EMAIL_ADDRESS": r"[\w.%+-]+@[\w-]+(?:\.[\w-]+)*\.[A-Za-z]{2,}\b",
+    # N° de sécurité sociale : sexe, année, mois, département (2A/2B pour la Corse), commune, ordre, clé
+    "FR_NIR": r"\b[12]\s?\d{2}\s?(?:0[1-9]|1[0-2]|[2-9]\d)\s?(?:\d{2}|2[AB])\s?\d{3}\s?\d{3}(?:\s?\d{2})?\b",
+    # Numéros français ; les autres formats (internationaux) sont trouvés par `phonenumbers`
+    "PHONE_NUMBER": r"(?<![\d\w])(?:(?:\+|00)33\s?\(?0?\)?\s?|0)[1-9](?:[\s.-]?\d{2}){4}\b",
+    "DATE_TIME": (
+        r"\b(?:\d{1,2}[/.-]\d{1,2}[/.-](?:\d{4}|\d{2})|\d{4}-\d{2}-\d{2}"
+        # "3 juillet", "1er mars 2024", "12 sept. 2023"
+        rf"|\d{{1,2}}(?:er)?\s+{_MOIS}(?:\s+\d{{4}})?"
+        # "juillet 2024", "July 3, 2024"
+        rf"|{_MOIS}\s+(?:\d{{1,2}}(?:st|nd|rd|th)?,?\s+)?\d{{4}}"
+        # "15/03" (jour/mois, mois sur deux chiffres : "TA 13/8" n'est pas une date)
+        r"|(?<![\d/.,])(?:0?[1-9]|[12]\d|3[01])/(?:0[1-9]|1[0-2])(?![/.,]?\d))"
+    ),
+}
+# Région des numéros sans indicatif pour `phonenumbers`
+PHONE_REGION = os.getenv("DEID_PHONE_REGION", "FR")
+# Numéros nationaux : couverts par la regex ; `phonenumbers` (plus lent) n'est
+# lancé que si le texte contient un indicatif international (+44, 0044...)
+_INTERNATIONAL_PREFIX = re.compile(r"(?:\+|(?<!\d)00)\s?[1-9]")
+
+# --- NIVEAU 2 : modèle NER (spaCy via Presidio), réservé aux entités non structurées ---
+NER_ENTITIES = ("PERSON", "LOCATION", "NRP")
+
+# Un profil qui masque moins que "default" est un choix de confidentialité :
+# il se déclare dans DEID_PROFILES_FILE, pas ici
+# (le doc_type vient du formulaire d'upload : un profil par défaut allégé
+# désactiverait le masquage pour n'importe quel document qui s'en réclame)
+DEFAULT_PROFILES = {
+    "default": {"patterns": list(PATTERNS), "ner": list(NER_ENTITIES)},
+}
+
+
+def load_profiles(path=None):
+    """Profils par doc_type : défauts, surchargés par un fichier JSON optionnel"""
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            profiles.update(json.load(f))
+    return profiles
+
+
+def valid_nir(match_text):
+    digits = re.sub(r"\s", "", match_text).upper()
+    if len(digits) == 13:
+        return True
+    body, key = digits[:13], digits[13:]
+    # Corse : 2A -> 19, 2B -> 18 pour le calcul de la clé
+    body = body.replace("2A", "19").replace("2B", "18")
+    return body.isdigit() and 97 - int(body) % 97 == int(key)
+
+
+class StructuredPIIMatcher:
+    """Toutes les expressions du profil compilées en une alternance à groupes nommés (un seul parcours)"""
+
+    def __init__(self, entity_types):
+        self.entity_types = [entity for entity in PATTERNS if entity in entity_types]
+        alternatives = [f"(?P<{entity}>{PATTERNS[entity]})" for entity in self.entity_types]
+        self.regex = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def find(self, text):
+        """Liste de (entity_type, start, end)"""
+        if self.regex is None:
+            return []
+        found = []
+        for match in self.regex.finditer(text):
+            entity = match.lastgroup
+            if entity == "FR_NIR" and not valid_nir(match.group()):
+                continue
+            found.append((entity, match.start(), match.end()))
+        if "PHONE_NUMBER" in self.entity_types and _INTERNATIONAL_PREFIX.search(text):
+            found = self._add_phone_numbers(text, found)
+        return found
+
+    @staticmethod
+    def _add_phone_numbers(text, found):
+        """Ajoute les numéros valides (tous pays) que les regex n'ont pas déjà couverts"""
+        extra = [
+            ("PHONE_NUMBER", match.start, match.end)
+            for match in phonenumbers.PhoneNumberMatcher(text, PHONE_REGION)
+            if not any(start < match.end and match.start < end for _, start, end in found)
+        ]
+        return sorted(found + extra, key=lambda item: item[1]) if extra else found
+
+
+class DeidTimings:
+    """Temps cumulés par étape (regex, ner, anonymize) et nombre d'entités par type"""
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.entities = Counter()
+        self.documents = 0
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.seconds[stage] += seconds
+
+    def count(self, results):
+        with self._lock:
+            self.documents += 1
+            self.entities.update(result.entity_type for result in results)
+
+    def summary(self):
+        total = sum(self.seconds.values()) or 1.0
+        stages = ", ".join(
+            f"{stage} {1000 * seconds / max(self.documents, 1):.1f} ms/doc ({100 * seconds / total:.0f}%)"
+            for stage, seconds in sorted(self.seconds.items())
+        )
+        return f"{self.documents} docs : {stages} ; entités {dict(self.entities)}"
+
+
+class TieredDeidEngine:
+    """DeID en deux niveaux : regex compilées puis NER limité, selon le profil du doc_type.
+
+    `ner_analyzer` expose `analyze(text, entities=...)` (SegmentingAnalyzer) ;
+    `result_factory(entity_type, start, end, score)` construit les résultats
+    au format attendu par l'anonymiseur (RecognizerResult de Presidio).
+    """
+
+    def __init__(self, ner_analyzer, result_factory, profiles=None):
+        self.ner_analyzer = ner_analyzer
+        self.result_factory = result_factory
+        self.profiles = profiles or load_profiles()
+        self.timings = DeidTimings()
+        self._matchers = {}
+
+    def profile(self, doc_type=None):
+        """Profil du doc_type ; "default" si inconnu ou incomplet (sans "patterns" ou "ner")"""
+        for profile in (self.profiles.get(doc_type), self.profiles.get("default")):
+            if profile and "patterns" in profile and "ner" in profile:
+                return profile
+        return DEFAULT_PROFILES["default"]
+
+    def _matcher(self, patterns):
+        key = tuple(sorted(patterns))
+        if key not in self._matchers:
+            self._matchers[key] = StructuredPIIMatcher(patterns)
+        return self._matchers[key]
+
+    def analyze(self, text, doc_type=None):
+        profile = self.profile(doc_type)
+
+        start = time.perf_counter()
+        results = [
+            self.result_factory(entity, begin, end, 1.0)
+            for entity, begin, end in self._matcher(profile["patterns"]).find(text)
+        ]
+        self.timings.record("regex", time.perf_counter() - start)
+
+        if profile["ner"]:
+            start = time.perf_counter()
+            results.extend(self.ner_analyzer.analyze(text, entities=list(profile["ner"])))
+            self.timings.record("ner", time.perf_counter() - start)
+
+        self.timings.count(results)
+        return results
@@ -0,0 +1,127 @@
+import json
+import time
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+
+
+class WorkerPoolError(Exception):
+    """Le pool de processus ne se relance plus (workers qui meurent dès le démarrage)"""
+
+
+def shutdown_pool(pool):
+    """Arrête un ProcessPoolExecutor sans attendre les tâches en cours (workers tués)"""
+    # `_processes` : pas d'API publique pour tuer un worker bloqué avant Python 3.14
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+class OrderedAckDispatcher:
+    """Répartit les messages RabbitMQ sur un pool de processus, acquitte dans l'ordre.
+
+    `on_message` (callback pika) confie le corps du message au pool créé par
+    `pool_factory` (un `concurrent.futures.ProcessPoolExecutor`) ; `drain`
+    publie les résultats et acquitte les messages dans leur ordre d'arrivée,
+    dès que le plus ancien est terminé (un message rapide n'est jamais
+    acquitté avant un message plus ancien encore en cours). Tout se fait dans
+    le thread de la connexion pika : aucun accès concurrent au canal.
+
+    Un worker mort (OOM, segfault, échec du chargement du modèle) casse le
+    pool (BrokenProcessPool) ; une tâche sans résultat après `task_timeout`
+    secondes signale un worker bloqué. Dans les deux cas les messages en cours
+    sont rendus à RabbitMQ et le pool est recréé. Un message déjà redélivré
+    n'est pas remis en queue une seconde fois (document qui ferait tomber les
+    workers en boucle). Après `max_restarts` relances sans aucun message
+    traité, `drain` lève WorkerPoolError.
+    """
+
+    def __init__(self, pool_factory, transform, on_result, logger=None, task_timeout=300.0, max_restarts=3):
+        self.pool_factory = pool_factory
+        self.transform = transform
+        self.on_result = on_result
+        self.logger = logger
+        self.task_timeout = task_timeout
+        self.max_restarts = max_restarts
+        self.pool = pool_factory()
+        self.pending = deque()
+        self.processed = 0
+        self.restarts = 0
+        self._failed_restarts = 0
+
+    def on_message(self, ch, method, properties, body):
+        future = self.pool.submit(self.transform, body)
+        deadline = time.monotonic() + self.task_timeout
+        self.pending.append((method.delivery_tag, future, deadline, getattr(method, "redelivered", False)))
+
+    def _log(self, level, message):
+        if self.logger:
+            getattr(self.logger, level)(message)
+
+    def _requeue(self, ch, delivery_tag, redelivered):
+        if redelivered:
+            self._log("error", f"Message {delivery_tag} rejeté : pool en échec lors de deux livraisons")
+        ch.basic_nack(delivery_tag=delivery_tag, requeue=not redelivered)
+
+    def drain(self, ch):
+        acked = 0
+        pool_failed = False
+        while self.pending:
+            delivery_tag, future, deadline, redelivered = self.pending[0]
+            if not future.done():
+                if time.monotonic() < deadline:
+                    break
+                self._log("error", f"Message {delivery_tag} sans résultat après {self.task_timeout:.0f}s : worker bloqué")
+                self.pending.popleft()
+                self._requeue(ch, delivery_tag, redelivered)
+                pool_failed = True
+                break
+            self.pending.popleft()
+            try:
+                output_message, consumed_blob = future.result()
+                self.on_result(ch, output_message, consumed_blob)
+                ch.basic_ack(delivery_tag=delivery_tag)
+                self._failed_restarts = 0
+            except BrokenProcessPool:
+                self._log("error", f"Worker arrêté brutalement pendant le message {delivery_tag}")
+                self._requeue(ch, delivery_tag, redelivered)
+                pool_failed = True
+            except json.JSONDecodeError:
+                self._log("error", "Message reçu invalide (pas un JSON)")
+                ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+            except Exception as e:
+                self._log("error", f"Erreur traitement: {e}")
+                ch.basic_nack(delivery_tag=delivery_tag, requeue=False)
+            acked += 1
+        self.processed += acked
+        if pool_failed:
+            self._restart(ch)
+        return acked
+
+    def _restart(self, ch):
+        """Rend les messages en cours à RabbitMQ et remplace le pool"""
+        for delivery_tag, _, _, _ in self.pending:
+            ch.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        self.pending.clear()
+        shutdown_pool(self.pool)
+
+        while True:
+            self._failed_restarts += 1
+            if self._failed_restarts > self.max_restarts:
+                raise WorkerPoolError(f"Pool de workers en échec après {self.max_restarts} relances")
+            self.restarts += 1
+            self._log("warning", f"Relance du pool de workers ({self.restarts})")
+            try:
+                self.pool = self.pool_factory()
+                return
+            except BrokenProcessPool as e:
+                # Workers morts dès l'initialisation (modèle introuvable, mémoire insuffisante...)
+                self._log("error", f"Nouveau pool inutilisable : {e}")
+
+    def reset(self):
+        """Connexion perdue : les messages non acquittés seront redélivrés par RabbitMQ"""
+        self.pending.clear()
+
+    def close(self):
+        shutdown_pool(self.pool)
@@ -0,0 +1,50 @@
+import os
+import tarfile
+import zipfile
+
+# Archive corrompue, tronquée ou dans un format inattendu
+ARCHIVE_ERRORS = (zipfile.BadZipFile, tarfile.TarError, EOFError)
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+
+def safe_name(name):
+    """Nom de fichier sans chemin (pas de ../ ni de chemin absolu venant de l'archive)"""
+    return os.path.basename(name.replace("\\", "/"))
+
+
+def _is_hidden(name):
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return any(part.startswith(".") or part == "__MACOSX" for part in parts)
+
+
+def iter_zip(fileobj):
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or _is_hidden(info.filename):
+                continue
+            # Décompression à la volée, membre par membre
+            with archive.open(info) as member:
+                yield safe_name(info.filename), member
+
+
+def iter_tar(fileobj):
+    # Mode flux "r|*" : lecture séquentielle, sans index ni retour arrière
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile() or _is_hidden(info.name):
+                continue
+            member = archive.extractfile(info)
+            if member is not None:
+                yield safe_name(info.name), member
+
+
+def iter_upload_entries(filename, fileobj):
+    """Itère (nom, flux) sur un upload : membres d'une archive zip/tar, ou le fichier lui-même"""
+    lower = (filename or "").lower()
+    if lower.endswith(".zip"):
+        yield from iter_zip(fileobj)
+    elif lower.endswith(TAR_SUFFIXES):
+        yield from iter_tar(fileobj)
+    else:
+        yield safe_name(filename or "document"), fileobj
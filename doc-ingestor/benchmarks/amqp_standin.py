@@ -0,0 +1,117 @@
+"""Broker AMQP 0-9-1 minimal pour les benchmarks (pas de RabbitMQ requis).
+
+Implémente juste ce qu'utilise doc-ingestor : poignée de main, ouverture de
+canal, Confirm.Select, Queue.Declare, Basic.Publish (acquitté si le canal est
+en mode confirm) et fermetures. Les messages sont comptés puis jetés.
+
+Usage :
+    python benchmarks/amqp_standin.py --port 5673
+"""
+import argparse
+import socket
+import threading
+
+from pika import frame, spec
+
+
+class StandinBroker:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = socket.create_server((host, port))
+        self.host, self.port = self.server.getsockname()[:2]
+        self.published = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._accept, name="amqp-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.close()
+
+    def _accept(self):
+        while True:
+            try:
+                sock, _ = self.server.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self.connections += 1
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock):
+        buffer = b""
+        confirm_tags = {}
+        pending_body = {}
+
+        def send(channel, method):
+            sock.sendall(frame.Method(channel, method).marshal())
+
+        try:
+            while True:
+                data = sock.recv(65536)
+                if not data:
+                    return
+                buffer += data
+                while buffer:
+                    consumed, decoded = frame.decode_frame(buffer)
+                    if not decoded:
+                        break
+                    buffer = buffer[consumed:]
+
+                    if isinstance(decoded, frame.ProtocolHeader):
+                        send(0, spec.Connection.Start(
+                            server_properties={"product": "standin",
+                                               "capabilities": {"publisher_confirms": True, "basic.nack": True}},
+                            mechanisms="PLAIN", locales="en_US"))
+                    elif isinstance(decoded, frame.Method):
+                        method, channel = decoded.method, decoded.channel_number
+                        if isinstance(method, spec.Connection.StartOk):
+                            send(0, spec.Connection.Tune(channel_max=2047, frame_max=131072, heartbeat=0))
+                        elif isinstance(method, spec.Connection.Open):
+                            send(0, spec.Connection.OpenOk())
+                        elif isinstance(method, spec.Connection.Close):
+                            send(0, spec.Connection.CloseOk())
+                            return
+                        elif isinstance(method, spec.Channel.Open):
+                            send(channel, spec.Channel.OpenOk())
+                        elif isinstance(method, spec.Channel.Close):
+                            send(channel, spec.Channel.CloseOk())
+                        elif isinstance(method, spec.Confirm.Select):
+                            confirm_tags[channel] = 0
+                            send(channel, spec.Confirm.SelectOk())
+                        elif isinstance(method, spec.Queue.Declare):
+                            send(channel, spec.Queue.DeclareOk(queue=method.queue, message_count=0, consumer_count=0))
+                        elif isinstance(method, spec.Basic.Publish):
+                            pending_body[channel] = None
+                    elif isinstance(decoded, frame.Header):
+                        pending_body[decoded.channel_number] = decoded.body_size
+                        if decoded.body_size == 0:
+                            self._published(send, decoded.channel_number, confirm_tags, pending_body)
+                    elif isinstance(decoded, frame.Body):
+                        channel = decoded.channel_number
+                        pending_body[channel] -= len(decoded.fragment)
+                        if pending_body[channel] <= 0:
+                            self._published(send, channel, confirm_tags, pending_body)
+        except OSError:
+            return
+        finally:
+            sock.close()
+
+    def _published(self, send, channel, confirm_tags, pending_body):
+        pending_body.pop(channel, None)
+        with self._lock:
+            self.published += 1
+        if channel in confirm_tags:
+            confirm_tags[channel] += 1
+            send(channel, spec.Basic.Ack(delivery_tag=confirm_tags[channel]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=5673)
+    args = parser.parse_args()
+    broker = StandinBroker(port=args.port).start()
+    print(f"Broker de substitution sur {broker.host}:{broker.port}")
+    threading.Event().wait()
@@ -0,0 +1,99 @@
+"""Benchmark du débit de publication RabbitMQ (messages/s).
+
+Compare l'ancienne publication (une connexion + déclaration de queue par
+message) au `RabbitPublisher` persistant du service, message par message
+(`publish`) puis par lots de --batch messages (`publish_many`, une seule
+connexion du pool par lot ; chaque message reste confirmé), avec 1 et
+plusieurs threads émetteurs, contre le broker de substitution
+`amqp_standin.py` (ou un vrai RabbitMQ via --host/--port).
+
+Usage (depuis doc-ingestor/) :
+    python benchmarks/bench_publisher.py --messages 2000 --threads 1 8 --batch 50
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import pika
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from amqp_standin import StandinBroker
+from processing import QUEUE_NAME, RabbitPublisher
+
+
+def legacy_publisher(host, port):
+    """Comportement historique de publish_to_queue"""
+    def publish(body):
+        connection = pika.BlockingConnection(pika.ConnectionParameters(host=host, port=port))
+        channel = connection.channel()
+        channel.queue_declare(queue=QUEUE_NAME, durable=True)
+        channel.basic_publish(exchange='', routing_key=QUEUE_NAME, body=body,
+                              properties=pika.BasicProperties(delivery_mode=2))
+        connection.close()
+    return publish
+
+
+def one_by_one(publish):
+    """Émetteur message par message"""
+    return lambda chunk: [publish(body) for body in chunk]
+
+
+def batched(publisher, size):
+    """Émetteur par lots : les messages de chaque thread partent par `size`"""
+    def publish_chunk(chunk):
+        for i in range(0, len(chunk), size):
+            publisher.publish_many(chunk[i:i + size])
+    return publish_chunk
+
+
+def run(publish_chunk, bodies, threads):
+    chunks = [bodies[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=publish_chunk, args=(c,)) for c in chunks]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return len(bodies) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--text-size", type=int, default=4000)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int, default=5672)
+    args = parser.parse_args()
+
+    if args.host:
+        host, port = args.host, args.port
+    else:
+        broker = StandinBroker().start()
+        host, port = broker.host, broker.port
+
+    text = ("Patient suivi pour HTA, traitement par amlodipine 5 mg. " * 100)[:args.text_size]
+    bodies = [json.dumps({"doc_id": i, "text": text, "metadata": {"filename": f"doc_{i}.pdf", "type": "CR"}})
+              for i in range(args.messages)]
+
+    print(f"{args.messages} messages de {args.text_size} caractères vers {host}:{port}")
+    print(f"{'threads':>7} | {'connexion/message (msg/s)':>26} | {'publisher persistant (msg/s)':>29} | "
+          f"{f'lots de {args.batch} (msg/s)':>20}")
+    for threads in args.threads:
+        legacy = run(one_by_one(legacy_publisher(host, port)), bodies, threads)
+        publisher = RabbitPublisher(host=host, port=port, pool_size=threads)
+        pooled = run(one_by_one(publisher.publish), bodies, threads)
+        batch = run(batched(publisher, args.batch), bodies, threads)
+        publisher.close()
+        print(f"{threads:>7} | {legacy:26.0f} | {pooled:29.0f} | {batch:20.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import threading
+
+SPOOL_BLOCK_SIZE = 1024 * 1024
+
+
+def spool_with_hash(stream, path, max_bytes=None):
+    """Copie le flux sur disque par blocs en calculant son SHA-256 au passage.
+
+    Retourne le hash hexadécimal, ou None si le flux dépasse `max_bytes`.
+    """
+    digest = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as buffer:
+        while True:
+            block = stream.read(SPOOL_BLOCK_SIZE)
+            if not block:
+                return digest.hexdigest()
+            written += len(block)
+            if max_bytes is not None and written > max_bytes:
+                return None
+            digest.update(block)
+            buffer.write(block)
+
+
+class ExtractionCache:
+    """Texte extrait par Tika, indexé par le SHA-256 du fichier source (un fichier par hash)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, content_hash):
+        return os.path.join(self.directory, f"{content_hash}.txt")
+
+    def get(self, content_hash):
+        if not content_hash:
+            return None
+        try:
+            with open(self._path(content_hash), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, content_hash, text):
+        if not content_hash or not text:
+            return
+        # Écriture atomique : un lecteur concurrent ne voit jamais un fichier partiel
+        tmp_path = f"{self._path(content_hash)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, self._path(content_hash))
+
+
+class DedupStats:
+    """Compteurs de déduplication (uploads) et du cache d'extraction (Tika)"""
+
+    def __init__(self):
+        self.uploads = 0
+        self.duplicates = 0
+        self.extraction_hits = 0
+        self.extraction_misses = 0
+        self._lock = threading.Lock()
+
+    def record_upload(self, duplicate):
+        with self._lock:
+            self.uploads += 1
+            self.duplicates += int(duplicate)
+
+    def record_extraction(self, hit):
+        with self._lock:
+            if hit:
+                self.extraction_hits += 1
+            else:
+                self.extraction_misses += 1
+
+    def stats(self):
+        extractions = self.extraction_hits + self.extraction_misses
+        return {
+            "uploads": self.uploads,
+            "duplicates": self.duplicates,
+            "dedup_hit_rate": self.duplicates / self.uploads if self.uploads else 0.0,
+            "extraction_cache_hits": self.extraction_hits,
+            "extraction_cache_misses": self.extraction_misses,
+            "extraction_cache_hit_rate": self.extraction_hits / extractions if extractions else 0.0
+        }
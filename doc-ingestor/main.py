@@ -1,74 +1,304 @@
-from fastapi import FastAPI, UploadFile, File, Depends, Form
+from fastapi import FastAPI, UploadFile, File, Depends, Form, HTTPException
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, ProgrammingError
 from sqlalchemy.orm import Session
-import shutil
+from datetime import date
+from typing import List, Optional
 import os
+import uuid
 
+from archive import ARCHIVE_ERRORS, iter_upload_entries
 from database import engine, Base, get_db
+from dedup import DedupStats, ExtractionCache, spool_with_hash
 import models
-from processing import extract_text_from_file, publish_to_queue
+from pipeline import IN_PROGRESS_STATUSES, STATUS_PROGRESS, IngestPipeline, PipelineFull
+from processing import blob_store, publisher
 
-# Création des tables dans la BDD
-models.Base.metadata.create_all(bind=engine)
+# create_all ne modifie pas une table existante : colonnes ajoutées après coup
+ADDED_COLUMNS = {"content_hash": "VARCHAR(64)", "patient_id": "VARCHAR(64)", "document_date": "VARCHAR(10)"}
 
 app = FastAPI(title="DocIngestor Service")
 
+@app.on_event("startup")
+def migrate_database():
+    """Crée les tables et ajoute les colonnes / index apparus depuis leur création"""
+    models.Base.metadata.create_all(bind=engine)
+
+    existing_columns = {column["name"] for column in inspect(engine).get_columns("documents")}
+    for column_name, column_type in ADDED_COLUMNS.items():
+        if column_name not in existing_columns:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE documents ADD COLUMN {column_name} {column_type}"))
+
+    for index in models.DocumentMetadata.__table__.indexes:
+        try:
+            index.create(bind=engine, checkfirst=True)
+        except (IntegrityError, ProgrammingError) as e:
+            # Doublons antérieurs à l'index unique : à fusionner avant qu'il puisse être créé
+            print(f"⚠️ Index {index.name} non créé : {e.orig}")
+
 # Dossier temporaire pour stocker les fichiers uploadés avant traitement
 UPLOAD_DIR = "temp_uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@app.post("/ingest/")
-async def ingest_document(
+# Déduplication par SHA-256 et cache du texte extrait (évite de rappeler Tika)
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", "extraction_cache")
+dedup_stats = DedupStats()
+
+# Pool borné pour l'extraction Tika et la publication RabbitMQ
+ingest_pipeline = IngestPipeline(
+    max_workers=int(os.getenv("INGEST_WORKERS", "4")),
+    max_pending=int(os.getenv("INGEST_MAX_PENDING", "100")),
+    bulk_parallelism=int(os.getenv("BULK_TIKA_PARALLELISM", "4")),
+    max_pending_batches=int(os.getenv("BULK_MAX_PENDING_BATCHES", "4")),
+    publish_batch_size=int(os.getenv("BULK_PUBLISH_BATCH_SIZE", "50")),
+    extraction_cache=ExtractionCache(EXTRACTION_CACHE_DIR),
+    dedup_stats=dedup_stats
+)
+
+# Ingestion en masse : documents insérés / planifiés par groupes
+BULK_GROUP_SIZE = int(os.getenv("BULK_GROUP_SIZE", "50"))
+BULK_MAX_ENTRY_BYTES = int(os.getenv("BULK_MAX_ENTRY_MB", "100")) * 1024 * 1024
+BULK_SUBMIT_TIMEOUT = float(os.getenv("BULK_SUBMIT_TIMEOUT", "300"))
+
+def parse_document_date(value):
+    """Date clinique optionnelle, au format ISO (AAAA-MM-JJ)"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"document_date invalide (AAAA-MM-JJ attendu) : {value}")
+
+def find_existing_documents(db, hashes, patient_id=None):
+    """Documents déjà ingérés (hors échecs) pour ces SHA-256 et ce patient : {hash: document}
+
+    Le même fichier déposé pour un autre patient n'est pas un doublon : il doit
+    être indexé sous ce patient.
+    """
+    rows = db.query(models.DocumentMetadata).filter(
+        models.DocumentMetadata.content_hash.in_(list(hashes)),
+        models.DocumentMetadata.patient_id == patient_id,
+        ~models.DocumentMetadata.status.like("ERROR%")
+    ).order_by(models.DocumentMetadata.id).all()
+    found = {}
+    for row in rows:
+        found.setdefault(row.content_hash, row)
+    return found
+
+@app.post("/ingest/", status_code=202)
+def ingest_document(
     file: UploadFile = File(...), 
     doc_type: str = Form(...), # ex: "CR_HOSPITALISATION"
+    patient_id: Optional[str] = Form(None),
+    document_date: Optional[str] = Form(None), # ex: "2024-03-18"
     db: Session = Depends(get_db)
 ):
-    # 1. Sauvegarder métadonnées en BDD (Status: PENDING)
-    new_doc = models.DocumentMetadata(
-        filename=file.filename,
-        status="PENDING",
-        doc_type=doc_type
-    )
-    db.add(new_doc)
-    db.commit()
+    document_date = parse_document_date(document_date)
+    # Route synchrone : FastAPI l'exécute dans son threadpool, l'écriture disque
+    # et le commit SQL ne bloquent pas la boucle d'événements.
+    # 1. Sauvegarder le fichier physiquement (temporaire), SHA-256 calculé au passage
+    spool_path = f"{UPLOAD_DIR}/upload_{uuid.uuid4().hex}"
+    content_hash = spool_with_hash(file.file, spool_path)
+
+    # Contenu déjà ingéré : on renvoie le document existant sans le retraiter
+    existing = find_existing_documents(db, [content_hash], patient_id).get(content_hash)
+    if existing is None:
+        # 2. Sauvegarder métadonnées en BDD (Status: PENDING)
+        new_doc = models.DocumentMetadata(
+            filename=file.filename,
+            status="PENDING",
+            doc_type=doc_type,
+            content_hash=content_hash,
+            patient_id=patient_id,
+            document_date=document_date
+        )
+        db.add(new_doc)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Même contenu inséré entre-temps par un dépôt concurrent (index unique) : c'est lui qu'on renvoie
+            db.rollback()
+            existing = find_existing_documents(db, [content_hash], patient_id).get(content_hash)
+            if existing is None:
+                raise
+
+    dedup_stats.record_upload(duplicate=existing is not None)
+    if existing is not None:
+        os.remove(spool_path)
+        return {
+            "message": "Document déjà ingéré",
+            "doc_id": existing.id,
+            "status": existing.status,
+            "duplicate": True,
+            "status_url": f"/documents/{existing.id}"
+        }
     db.refresh(new_doc)
-    
-    # 2. Sauvegarder le fichier physiquement (temporaire)
+
     file_path = f"{UPLOAD_DIR}/{new_doc.id}_{file.filename}"
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    os.replace(spool_path, file_path)
         
-    # 3. Extraire le texte via Tika
-    extracted_text = extract_text_from_file(file_path)
-    
-    if not extracted_text:
-        new_doc.status = "ERROR_EXTRACTION"
-        db.commit()
-        return {"error": "Impossible d'extraire le texte"}
-    
-    # 4. Envoyer dans RabbitMQ
+    # 3-5. Extraction Tika et publication RabbitMQ en arrière-plan
     try:
-        payload_meta = {"filename": file.filename, "type": doc_type}
-        publish_to_queue(new_doc.id, extracted_text, payload_meta)
-        
-        # 5. Mise à jour statut (Status: PROCESSED)
-        new_doc.status = "PROCESSED"
-        db.commit()
-        
-        # Nettoyage (optionnel : supprimer le fichier temp)
-        # os.remove(file_path)
-        
-        return {"message": "Ingestion réussie", "doc_id": new_doc.id}
-        
-    except Exception as e:
+        ingest_pipeline.submit(new_doc.id, file_path, file.filename, doc_type)
+    except PipelineFull as e:
         new_doc.status = "ERROR_QUEUE"
         db.commit()
-        return {"error": str(e)}
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    
+    return {
+        "message": "Document reçu, traitement en cours",
+        "doc_id": new_doc.id,
+        "status": new_doc.status,
+        "duplicate": False,
+        "status_url": f"/documents/{new_doc.id}"
+    }
+
+def flush_bulk_group(db, group, doc_type, results, patient_id=None, document_date=None):
+    """Écarte les doublons, insère les métadonnées du groupe en une transaction puis le planifie en un lot"""
+    def insert_new_entries():
+        existing = find_existing_documents(db, {content_hash for _, _, content_hash in group}, patient_id)
+        new_entries, duplicates = [], []
+        first_by_hash = set()
+        for name, spool_path, content_hash in group:
+            if content_hash in existing or content_hash in first_by_hash:
+                duplicates.append((name, spool_path, content_hash))
+            else:
+                first_by_hash.add(content_hash)
+                new_entries.append((name, spool_path, content_hash))
+
+        rows = [
+            models.DocumentMetadata(
+                filename=name, status="PENDING", doc_type=doc_type, content_hash=content_hash,
+                patient_id=patient_id, document_date=document_date
+            )
+            for name, _, content_hash in new_entries
+        ]
+        db.add_all(rows)
+        db.commit()
+        return existing, new_entries, duplicates, rows
+
+    try:
+        existing, new_entries, duplicates, rows = insert_new_entries()
+    except IntegrityError:
+        # Contenu du groupe inséré entre-temps par un dépôt concurrent (index unique) :
+        # cette insertion est désormais visible, les doublons sont recalculés une fois
+        db.rollback()
+        existing, new_entries, duplicates, rows = insert_new_entries()
+
+    for _, spool_path, _ in duplicates:
+        os.remove(spool_path)
+    for entries, duplicate in ((new_entries, False), (duplicates, True)):
+        for _ in entries:
+            dedup_stats.record_upload(duplicate=duplicate)
+
+    docs = []
+    for row, (name, spool_path, _) in zip(rows, new_entries):
+        file_path = f"{UPLOAD_DIR}/{row.id}_{name}"
+        os.replace(spool_path, file_path)
+        docs.append((row.id, file_path, name, doc_type))
+
+    status = "PENDING"
+    if docs:
+        try:
+            ingest_pipeline.submit_batch(docs, timeout=BULK_SUBMIT_TIMEOUT)
+        except PipelineFull:
+            status = "ERROR_QUEUE"
+            for row in rows:
+                row.status = status
+            db.commit()
+    results.extend({"filename": name, "doc_id": doc_id, "status": status} for doc_id, _, name, _ in docs)
+
+    # Doublons (d'un document existant ou d'un autre fichier du même lot)
+    new_ids = {row.content_hash: row.id for row in rows}
+    results.extend({
+        "filename": name,
+        "doc_id": existing[content_hash].id if content_hash in existing else new_ids[content_hash],
+        "status": "DUPLICATE"
+    } for name, _, content_hash in duplicates)
+
+@app.post("/ingest/batch", status_code=202)
+def ingest_batch(
+    files: List[UploadFile] = File(...),
+    doc_type: str = Form(...),
+    patient_id: Optional[str] = Form(None),
+    document_date: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Ingestion en masse : plusieurs fichiers et/ou archives zip / tar(.gz).
+
+    Les membres des archives sont lus un par un (jamais d'extraction complète
+    préalable) ; le traitement d'un groupe commence pendant la lecture du suivant.
+    `patient_id` et `document_date`, optionnels, s'appliquent à tous les fichiers.
+    """
+    document_date = parse_document_date(document_date)
+    results = []
+    group = []
+    for upload in files:
+        try:
+            for name, stream in iter_upload_entries(upload.filename, upload.file):
+                spool_path = f"{UPLOAD_DIR}/bulk_{uuid.uuid4().hex}"
+                content_hash = spool_with_hash(stream, spool_path, BULK_MAX_ENTRY_BYTES)
+                if content_hash is None:
+                    os.remove(spool_path)
+                    results.append({"filename": name, "doc_id": None, "status": "ERROR_TOO_LARGE"})
+                    continue
+                group.append((name, spool_path, content_hash))
+                if len(group) >= BULK_GROUP_SIZE:
+                    flush_bulk_group(db, group, doc_type, results, patient_id, document_date)
+                    group = []
+        except ARCHIVE_ERRORS as e:
+            # Archive corrompue ou illisible : les autres fichiers sont traités quand même
+            print(f"Erreur lecture {upload.filename}: {e}")
+            results.append({"filename": upload.filename, "doc_id": None, "status": "ERROR_ARCHIVE"})
+    if group:
+        flush_bulk_group(db, group, doc_type, results, patient_id, document_date)
+
+    return {
+        "message": f"{sum(r['status'] == 'PENDING' for r in results)} document(s) en cours de traitement",
+        "documents": results
+    }
+
+@app.on_event("startup")
+def resume_pending_documents():
+    # BLOB_STORE_DIR obligatoire : le service ne démarre pas sans répertoire partagé
+    print(f"📦 Blob store : {blob_store.directory}")
+    resumed = ingest_pipeline.resume(UPLOAD_DIR)
+    if resumed:
+        print(f"🔄 {resumed} document(s) interrompu(s) relancé(s)")
+
+@app.on_event("shutdown")
+def close_publisher():
+    # Termine les traitements en cours puis ferme les connexions RabbitMQ du pool
+    ingest_pipeline.shutdown()
+    publisher.close()
 
 @app.get("/documents/")
 def list_documents(db: Session = Depends(get_db)):
     return db.query(models.DocumentMetadata).all()
 
 
+@app.get("/documents/{doc_id}")
+def get_document_status(doc_id: int, db: Session = Depends(get_db)):
+    doc = db.get(models.DocumentMetadata, doc_id)
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Document introuvable")
+    return {
+        "doc_id": doc.id,
+        "filename": doc.filename,
+        "doc_type": doc.doc_type,
+        "patient_id": doc.patient_id,
+        "document_date": doc.document_date,
+        "status": doc.status,
+        "progress": STATUS_PROGRESS.get(doc.status, 0),
+        "done": doc.status not in IN_PROGRESS_STATUSES,
+        "upload_date": doc.upload_date
+    }
+
+@app.get("/metrics")
+def metrics():
+    return {"dedup": dedup_stats.stats()}
+
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "doc-ingestor"}
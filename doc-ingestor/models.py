@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index, text
 from sqlalchemy.sql import func
 from database import Base
 
@@ -9,4 +9,16 @@ class DocumentMetadata(Base):
     filename = Column(String, index=True)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(String) # "PENDING", "PROCESSED", "ERROR"
-    doc_type = Column(String) # "ORDONNANCE", "COMPTE-RENDU", etc.
\ No newline at end of file
+    doc_type = Column(String) # "ORDONNANCE", "COMPTE-RENDU", etc.
+    content_hash = Column(String(64), index=True) # SHA-256 du fichier (déduplication)
+    patient_id = Column(String(64), index=True) # Patient du document (recherche filtrée par patient)
+    document_date = Column(String(10)) # Date clinique ISO (AAAA-MM-JJ), sinon date d'upload
+
+    # Un seul document non en échec par contenu et par patient : deux dépôts
+    # simultanés du même fichier ne peuvent pas créer deux documents
+    __table_args__ = (
+        Index(
+            "uq_documents_content_patient", content_hash, func.coalesce(patient_id, ""), unique=True,
+            postgresql_where=text("status NOT LIKE 'ERROR%'")
+        ),
+    )
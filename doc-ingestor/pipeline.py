@@ -0,0 +1,224 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from database import SessionLocal
+import models
+from processing import extract_text_from_file, publish_batch_to_queue, publish_to_queue
+
+# Étapes du traitement en arrière-plan et avancement (%) correspondant
+STATUS_PROGRESS = {
+    "PENDING": 10,
+    "EXTRACTING": 30,
+    "PUBLISHING": 80,
+    "PROCESSED": 100,
+    "ERROR_EXTRACTION": 100,
+    "ERROR_QUEUE": 100
+}
+IN_PROGRESS_STATUSES = ("PENDING", "EXTRACTING", "PUBLISHING")
+
+
+class PipelineFull(Exception):
+    """Trop de documents en attente de traitement"""
+
+
+def document_metadata(doc, filename, doc_type):
+    """Métadonnées publiées avec le texte (reprises par l'indexeur pour la recherche filtrée)"""
+    metadata = {"filename": filename, "type": doc_type}
+    if doc is not None and doc.patient_id:
+        metadata["patient_id"] = doc.patient_id
+        # Date clinique fournie à l'upload, sinon date de réception du document
+        upload_date = doc.upload_date.date().isoformat() if doc.upload_date else None
+        metadata["date"] = doc.document_date or upload_date
+    elif doc is not None and doc.document_date:
+        metadata["date"] = doc.document_date
+    return metadata
+
+
+class IngestPipeline:
+    """Extraction Tika + publication RabbitMQ hors de la requête HTTP.
+
+    `max_workers` documents sont traités en parallèle ; au plus `max_pending`
+    documents (en cours + en attente) sont acceptés, au-delà `submit` lève
+    PipelineFull. Chaque étape est enregistrée dans `DocumentMetadata.status`
+    avec sa propre session SQLAlchemy.
+    """
+
+    def __init__(self, max_workers=4, max_pending=100, session_factory=SessionLocal,
+                 bulk_parallelism=4, max_pending_batches=4, publish_batch_size=50,
+                 extraction_cache=None, dedup_stats=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        # Ingestion en masse : lots traités un par un, extraction Tika parallèle
+        # (bulk_parallelism appels simultanés), publication par paquets
+        self.publish_batch_size = publish_batch_size
+        self.batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-batch")
+        self.extraction_executor = ThreadPoolExecutor(max_workers=bulk_parallelism, thread_name_prefix="tika")
+        self._batch_slots = threading.BoundedSemaphore(max_pending_batches)
+        # Texte déjà extrait pour ce contenu (SHA-256) : Tika n'est pas rappelé
+        self.extraction_cache = extraction_cache
+        self.dedup_stats = dedup_stats
+
+    def submit(self, doc_id, file_path, filename, doc_type):
+        if not self._slots.acquire(blocking=False):
+            raise PipelineFull(f"{self.max_pending} documents déjà en attente de traitement")
+        try:
+            self.executor.submit(self._run, doc_id, file_path, filename, doc_type)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def submit_batch(self, docs, timeout=None):
+        """Planifie un lot [(doc_id, file_path, filename, doc_type), ...].
+
+        Bloque tant que `max_pending_batches` lots sont déjà en attente (la
+        lecture de l'archive ralentit au rythme du traitement) ; lève
+        PipelineFull après `timeout` secondes.
+        """
+        if not self._batch_slots.acquire(timeout=timeout):
+            raise PipelineFull("Trop de lots en attente de traitement")
+        try:
+            self.batch_executor.submit(self._run_batch, docs)
+        except Exception:
+            self._batch_slots.release()
+            raise
+
+    def extract(self, file_path, content_hash=None):
+        if self.extraction_cache is not None:
+            cached = self.extraction_cache.get(content_hash)
+            if self.dedup_stats is not None:
+                self.dedup_stats.record_extraction(hit=cached is not None)
+            if cached is not None:
+                return cached
+
+        text = extract_text_from_file(file_path)
+        if self.extraction_cache is not None:
+            self.extraction_cache.put(content_hash, text)
+        return text
+
+    def _set_status(self, db, doc, status):
+        doc.status = status
+        db.commit()
+
+    def _set_statuses(self, db, doc_ids, status):
+        if not doc_ids:
+            return
+        db.query(models.DocumentMetadata).filter(
+            models.DocumentMetadata.id.in_(doc_ids)
+        ).update({"status": status}, synchronize_session=False)
+        db.commit()
+
+    def _run(self, doc_id, file_path, filename, doc_type):
+        db = self.session_factory()
+        try:
+            self.process(db, doc_id, file_path, filename, doc_type)
+        except Exception as e:
+            print(f"Erreur traitement document {doc_id}: {e}")
+        finally:
+            db.close()
+            self._slots.release()
+
+    def process(self, db, doc_id, file_path, filename, doc_type):
+        doc = db.get(models.DocumentMetadata, doc_id)
+        if doc is None:
+            return
+
+        # 3. Extraire le texte via Tika
+        self._set_status(db, doc, "EXTRACTING")
+        extracted_text = self.extract(file_path, doc.content_hash)
+        if not extracted_text:
+            self._set_status(db, doc, "ERROR_EXTRACTION")
+            return
+
+        # 4. Envoyer dans RabbitMQ
+        self._set_status(db, doc, "PUBLISHING")
+        try:
+            publish_to_queue(doc_id, extracted_text, document_metadata(doc, filename, doc_type))
+        except Exception as e:
+            print(f"Erreur publication document {doc_id}: {e}")
+            self._set_status(db, doc, "ERROR_QUEUE")
+            return
+
+        # 5. Mise à jour statut (Status: PROCESSED)
+        self._set_status(db, doc, "PROCESSED")
+
+        # Nettoyage (optionnel : supprimer le fichier temp)
+        # os.remove(file_path)
+
+    def _run_batch(self, docs):
+        db = self.session_factory()
+        try:
+            self.process_batch(db, docs)
+        except Exception as e:
+            print(f"Erreur traitement lot ({len(docs)} documents): {e}")
+        finally:
+            db.close()
+            self._batch_slots.release()
+
+    def process_batch(self, db, docs):
+        self._set_statuses(db, [doc[0] for doc in docs], "EXTRACTING")
+        rows = {row.id: row for row in db.query(models.DocumentMetadata).filter(
+            models.DocumentMetadata.id.in_([doc[0] for doc in docs])
+        ).all()}
+        hashes = {doc_id: row.content_hash for doc_id, row in rows.items()}
+        texts = list(self.extraction_executor.map(lambda doc: self.extract(doc[1], hashes.get(doc[0])), docs))
+
+        extracted = [(doc, text) for doc, text in zip(docs, texts) if text]
+        self._set_statuses(db, [doc[0] for doc, text in zip(docs, texts) if not text], "ERROR_EXTRACTION")
+        self._set_statuses(db, [doc[0] for doc, _ in extracted], "PUBLISHING")
+
+        for start in range(0, len(extracted), self.publish_batch_size):
+            group = extracted[start:start + self.publish_batch_size]
+            doc_ids = [doc_id for (doc_id, _, _, _), _ in group]
+            try:
+                publish_batch_to_queue([
+                    (doc_id, text, document_metadata(rows.get(doc_id), filename, doc_type))
+                    for (doc_id, _, filename, doc_type), text in group
+                ])
+            except Exception as e:
+                print(f"Erreur publication lot: {e}")
+                self._set_statuses(db, doc_ids, "ERROR_QUEUE")
+                continue
+            self._set_statuses(db, doc_ids, "PROCESSED")
+
+    def resume(self, upload_dir):
+        """Relance les documents interrompus (arrêt du service pendant le traitement).
+
+        Seuls PENDING et EXTRACTING sont relancés : rien n'a encore été publié.
+        Un document arrêté en PUBLISHING a pu être publié en tout ou partie ; le
+        republier le ferait indexer deux fois. Il passe en ERROR_QUEUE (publication
+        non confirmée) et peut être déposé à nouveau.
+        """
+        db = self.session_factory()
+        try:
+            interrupted = db.query(models.DocumentMetadata).filter(
+                models.DocumentMetadata.status == "PUBLISHING"
+            ).all()
+            if interrupted:
+                print(f"⚠️ {len(interrupted)} document(s) interrompu(s) pendant la publication, passés en ERROR_QUEUE")
+                self._set_statuses(db, [doc.id for doc in interrupted], "ERROR_QUEUE")
+
+            pending = db.query(models.DocumentMetadata).filter(
+                models.DocumentMetadata.status.in_(("PENDING", "EXTRACTING"))
+            ).all()
+            resumed = 0
+            for doc in pending:
+                file_path = f"{upload_dir}/{doc.id}_{doc.filename}"
+                if not os.path.exists(file_path):
+                    continue
+                try:
+                    self.submit(doc.id, file_path, doc.filename, doc.doc_type)
+                    resumed += 1
+                except PipelineFull:
+                    break
+            return resumed
+        finally:
+            db.close()
+
+    def shutdown(self, wait=True):
+        self.batch_executor.shutdown(wait=wait)
+        self.extraction_executor.shutdown(wait=wait)
+        self.executor.shutdown(wait=wait)
@@ -1,8 +1,12 @@
 import pika
 import json
+import queue
+import threading
 from tika import parser
 import os
 
+from docqa_common.segment_protocol import BlobStore, document_messages
+
 # Configuration RabbitMQ
 RABBITMQ_HOST = os.getenv('RABBITMQ_HOST', 'localhost')
 QUEUE_NAME = 'raw_documents_queue'
@@ -18,27 +22,112 @@ def extract_text_from_file(file_path: str):
         print(f"Erreur Tika: {e}")
         return None
 
+class RabbitPublisher:
+    """Publication persistante vers RabbitMQ, partagée entre les requêtes /ingest/.
+
+    Un pool de `pool_size` connexions (une connexion pika bloquante n'est pas
+    thread-safe : chaque slot a la sienne et n'est utilisé que par un thread à
+    la fois). Chaque canal est en mode confirm : `publish` ne rend la main
+    qu'une fois le message acquitté par le broker. Les messages sont publiés
+    avec mandatory=True : un message sans queue de destination lève
+    UnroutableError avant la confirmation, `publish_many` échoue donc avant
+    d'annoncer le lot comme publié. La queue est déclarée une seule fois ; une
+    connexion perdue est rouverte et seul le message non confirmé est renvoyé.
+    """
+
+    def __init__(self, host=RABBITMQ_HOST, queue_name=QUEUE_NAME, pool_size=4, port=5672):
+        self.parameters = pika.ConnectionParameters(host=host, port=port)
+        self.queue_name = queue_name
+        self.pool_size = pool_size
+        self._slots = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._slots.put([None, None])  # [connexion, canal], ouverts à la demande
+        self._declared = False
+        self._declare_lock = threading.Lock()
+
+    def _open(self, slot):
+        connection = pika.BlockingConnection(self.parameters)
+        channel = connection.channel()
+        channel.confirm_delivery()
+        with self._declare_lock:
+            if not self._declared:
+                # On s'assure que la queue existe (une fois pour tout le pool)
+                channel.queue_declare(queue=self.queue_name, durable=True)
+                self._declared = True
+        slot[0], slot[1] = connection, channel
+
+    @staticmethod
+    def _discard(slot):
+        connection = slot[0]
+        slot[0] = slot[1] = None
+        if connection is not None and connection.is_open:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _publish_on(self, slot, body, retries):
+        for attempt in range(retries + 1):
+            try:
+                if slot[1] is None or not slot[1].is_open:
+                    self._discard(slot)
+                    self._open(slot)
+                # Bloque jusqu'au Basic.Ack ; Basic.Return (mandatory) -> UnroutableError, Basic.Nack -> NackError
+                slot[1].basic_publish(
+                    exchange='',
+                    routing_key=self.queue_name,
+                    body=body,
+                    properties=pika.BasicProperties(
+                        delivery_mode=2,  # Rend le message persistant (ne se perd pas si RabbitMQ crash)
+                    ),
+                    mandatory=True
+                )
+                return
+            except (pika.exceptions.UnroutableError, pika.exceptions.NackError):
+                # Refus du broker (sous-classes de AMQPChannelError) : pas de renvoi
+                raise
+            except (pika.exceptions.AMQPConnectionError, pika.exceptions.AMQPChannelError) as e:
+                # Connexion coupée (broker redémarré, heartbeat expiré...) : on rouvre
+                self._discard(slot)
+                if attempt == retries:
+                    raise
+                print(f"⚠️ Connexion RabbitMQ perdue ({e!r}), reconnexion...")
+
+    def publish(self, body, retries=1):
+        self.publish_many([body], retries)
+
+    def publish_many(self, bodies, retries=1):
+        """Publie un lot sur une seule connexion du pool (chaque message confirmé)"""
+        slot = self._slots.get()
+        try:
+            for body in bodies:
+                self._publish_on(slot, body, retries)
+        finally:
+            self._slots.put(slot)
+
+    def close(self):
+        for _ in range(self.pool_size):
+            self._discard(self._slots.get())
+        for _ in range(self.pool_size):
+            self._slots.put([None, None])
+
+
+publisher = RabbitPublisher(pool_size=int(os.getenv('RABBITMQ_POOL_SIZE', '4')))
+# Texte des segments (la queue ne transporte que des références)
+blob_store = BlobStore()
+
 def publish_to_queue(doc_id: int, text: str, metadata: dict):
-    """Envoie le JSON dans RabbitMQ"""
-    connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
-    channel = connection.channel()
-    
-    # On s'assure que la queue existe
-    channel.queue_declare(queue=QUEUE_NAME, durable=True)
-    
-    message = {
-        "doc_id": doc_id,
-        "text": text,
-        "metadata": metadata
-    }
-    
-    channel.basic_publish(
-        exchange='',
-        routing_key=QUEUE_NAME,
-        body=json.dumps(message),
-        properties=pika.BasicProperties(
-            delivery_mode=2,  # Rend le message persistant (ne se perd pas si RabbitMQ crash)
-        )
-    )
-    print(f" [x] Envoyé document ID {doc_id} vers RabbitMQ")
-    connection.close()
\ No newline at end of file
+    """Envoie le document dans RabbitMQ : en-tête, segments (références vers le blob store), fin"""
+    messages = document_messages(blob_store, doc_id, text, metadata)
+    publisher.publish_many([json.dumps(message) for message in messages])
+    print(f" [x] Envoyé document ID {doc_id} vers RabbitMQ ({len(messages) - 2} segments)")
+
+def publish_batch_to_queue(messages):
+    """Envoie un lot de documents [(doc_id, text, metadata), ...] dans RabbitMQ"""
+    bodies = [
+        json.dumps(message)
+        for doc_id, text, metadata in messages
+        for message in document_messages(blob_store, doc_id, text, metadata)
+    ]
+    publisher.publish_many(bodies)
+    print(f" [x] Envoyé lot de {len(messages)} documents vers RabbitMQ")
@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+import io
+import tarfile
+import zipfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from archive import ARCHIVE_ERRORS, iter_upload_entries, safe_name
+
+def read_entries(filename, fileobj):
+    return [(name, stream.read()) for name, stream in iter_upload_entries(filename, fileobj)]
+
+class TestArchive(unittest.TestCase):
+
+    def test_plain_file(self):
+        entries = read_entries("cr.pdf", io.BytesIO(b"%PDF"))
+        self.assertEqual(entries, [("cr.pdf", b"%PDF")])
+
+    def test_zip_entries(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("reports/cr1.pdf", b"un")
+            archive.writestr("reports/", b"")
+            archive.writestr("__MACOSX/._cr1.pdf", b"meta")
+            archive.writestr("cr2.docx", b"deux")
+        buffer.seek(0)
+
+        self.assertEqual(read_entries("lot.zip", buffer), [("cr1.pdf", b"un"), ("cr2.docx", b"deux")])
+
+    def test_tar_gz_entries_streamed(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for name, data in (("a/cr1.pdf", b"un"), ("../../etc/cr2.pdf", b"deux")):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        buffer.seek(0)
+
+        self.assertEqual(read_entries("lot.tar.gz", buffer), [("cr1.pdf", b"un"), ("cr2.pdf", b"deux")])
+
+    def test_safe_name_strips_paths(self):
+        self.assertEqual(safe_name("..\\..\\windows\\cr.pdf"), "cr.pdf")
+        self.assertEqual(safe_name("/etc/passwd"), "passwd")
+
+    def test_corrupted_zip(self):
+        with self.assertRaises(ARCHIVE_ERRORS):
+            read_entries("lot.zip", io.BytesIO(b"pas une archive"))
+
+if __name__ == '__main__':
+    unittest.main()
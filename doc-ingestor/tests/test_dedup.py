@@ -0,0 +1,52 @@
+import unittest
+import sys
+import os
+import hashlib
+import io
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dedup import DedupStats, ExtractionCache, spool_with_hash
+
+class TestDedup(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_spool_with_hash(self):
+        data = b"compte-rendu " * 200000
+        path = os.path.join(self.tmp.name, "spool")
+
+        content_hash = spool_with_hash(io.BytesIO(data), path)
+
+        self.assertEqual(content_hash, hashlib.sha256(data).hexdigest())
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), data)
+
+    def test_spool_with_hash_size_limit(self):
+        path = os.path.join(self.tmp.name, "spool")
+        self.assertIsNone(spool_with_hash(io.BytesIO(b"x" * 100), path, max_bytes=10))
+
+    def test_extraction_cache(self):
+        cache = ExtractionCache(os.path.join(self.tmp.name, "cache"))
+
+        self.assertIsNone(cache.get("abc"))
+        cache.put("abc", "Texte extrait")
+        self.assertEqual(cache.get("abc"), "Texte extrait")
+        # Pas de hash (document antérieur à la déduplication) : pas de cache
+        self.assertIsNone(cache.get(None))
+
+    def test_stats(self):
+        stats = DedupStats()
+        stats.record_upload(duplicate=False)
+        stats.record_upload(duplicate=True)
+        stats.record_extraction(hit=True)
+
+        self.assertEqual(stats.stats()["dedup_hit_rate"], 0.5)
+        self.assertEqual(stats.stats()["extraction_cache_hit_rate"], 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+try:
+    # database.py crée l'engine PostgreSQL à l'import (pilote psycopg2 requis)
+    import models
+    from dedup import DedupStats, ExtractionCache
+    from pipeline import IngestPipeline, PipelineFull
+except ImportError:
+    models = None
+
+@unittest.skipIf(models is None, "pilote PostgreSQL non installé")
+class TestIngestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        models.Base.metadata.create_all(bind=engine)
+        self.Session = sessionmaker(bind=engine)
+        db = self.Session()
+        doc = models.DocumentMetadata(filename="cr.pdf", status="PENDING", doc_type="CR")
+        db.add(doc)
+        db.commit()
+        self.doc_id = doc.id
+        db.close()
+
+    def status(self):
+        db = self.Session()
+        try:
+            return db.get(models.DocumentMetadata, self.doc_id).status
+        finally:
+            db.close()
+
+    @patch('pipeline.publish_to_queue')
+    @patch('pipeline.extract_text_from_file', return_value="Texte extrait")
+    def test_process_success(self, mock_extract, mock_publish):
+        pipeline = IngestPipeline(session_factory=self.Session)
+        db = self.Session()
+        pipeline.process(db, self.doc_id, "path/cr.pdf", "cr.pdf", "CR")
+        db.close()
+
+        mock_publish.assert_called_once_with(self.doc_id, "Texte extrait", {"filename": "cr.pdf", "type": "CR"})
+        self.assertEqual(self.status(), "PROCESSED")
+
+    @patch('pipeline.publish_to_queue')
+    @patch('pipeline.extract_text_from_file', return_value="Texte extrait")
+    def test_process_publishes_patient_metadata(self, mock_extract, mock_publish):
+        db = self.Session()
+        doc = models.DocumentMetadata(filename="ordo.pdf", status="PENDING", doc_type="ORDONNANCE",
+                                      patient_id="P42", document_date="2024-03-18")
+        db.add(doc)
+        db.commit()
+        pipeline = IngestPipeline(session_factory=self.Session)
+        pipeline.process(db, doc.id, "path/ordo.pdf", "ordo.pdf", "ORDONNANCE")
+        db.close()
+
+        mock_publish.assert_called_once()
+        self.assertEqual(mock_publish.call_args.args[2], {
+            "filename": "ordo.pdf", "type": "ORDONNANCE", "patient_id": "P42", "date": "2024-03-18"
+        })
+
+    @patch('pipeline.publish_to_queue')
+    @patch('pipeline.extract_text_from_file', return_value="Texte extrait")
+    def test_extraction_cache_skips_tika(self, mock_extract, mock_publish):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        stats = DedupStats()
+        pipeline = IngestPipeline(session_factory=self.Session,
+                                  extraction_cache=ExtractionCache(cache_dir.name), dedup_stats=stats)
+
+        self.assertEqual(pipeline.extract("path/cr.pdf", "abc"), "Texte extrait")
+        self.assertEqual(pipeline.extract("path/copie.pdf", "abc"), "Texte extrait")
+
+        mock_extract.assert_called_once_with("path/cr.pdf")
+        self.assertEqual(stats.stats()["extraction_cache_hits"], 1)
+
+    @patch('pipeline.publish_to_queue')
+    @patch('pipeline.extract_text_from_file', return_value=None)
+    def test_process_extraction_error(self, mock_extract, mock_publish):
+        pipeline = IngestPipeline(session_factory=self.Session)
+        db = self.Session()
+        pipeline.process(db, self.doc_id, "path/cr.pdf", "cr.pdf", "CR")
+        db.close()
+
+        mock_publish.assert_not_called()
+        self.assertEqual(self.status(), "ERROR_EXTRACTION")
+
+    @patch('pipeline.publish_to_queue', side_effect=Exception("RabbitMQ down"))
+    @patch('pipeline.extract_text_from_file', return_value="Texte extrait")
+    def test_process_queue_error(self, mock_extract, mock_publish):
+        pipeline = IngestPipeline(session_factory=self.Session)
+        db = self.Session()
+        pipeline.process(db, self.doc_id, "path/cr.pdf", "cr.pdf", "CR")
+        db.close()
+
+        self.assertEqual(self.status(), "ERROR_QUEUE")
+
+    @patch('pipeline.publish_batch_to_queue')
+    @patch('pipeline.extract_text_from_file', side_effect=lambda path: None if "vide" in path else "texte")
+    def test_process_batch(self, mock_extract, mock_publish):
+        db = self.Session()
+        docs = [models.DocumentMetadata(filename=f"cr{i}.pdf", status="PENDING", doc_type="CR") for i in range(4)]
+        db.add_all(docs)
+        db.commit()
+        batch = [(doc.id, "vide.pdf" if i == 0 else f"cr{i}.pdf", doc.filename, "CR") for i, doc in enumerate(docs)]
+
+        pipeline = IngestPipeline(session_factory=self.Session, bulk_parallelism=2, publish_batch_size=2)
+        pipeline.process_batch(db, batch)
+        db.close()
+
+        # 3 documents extraits publiés en 2 paquets (2 + 1)
+        self.assertEqual([len(call.args[0]) for call in mock_publish.call_args_list], [2, 1])
+        db = self.Session()
+        statuses = {doc.filename: doc.status for doc in db.query(models.DocumentMetadata).all()}
+        db.close()
+        self.assertEqual(statuses["cr0.pdf"], "ERROR_EXTRACTION")
+        self.assertEqual(statuses["cr3.pdf"], "PROCESSED")
+
+    @patch('pipeline.publish_to_queue')
+    def test_submit_rejects_when_full(self, mock_publish):
+        release = threading.Event()
+        pipeline = IngestPipeline(max_workers=1, max_pending=1, session_factory=self.Session)
+
+        with patch('pipeline.extract_text_from_file', side_effect=lambda path: release.wait(5) and "texte"):
+            pipeline.submit(self.doc_id, "path/cr.pdf", "cr.pdf", "CR")
+            with self.assertRaises(PipelineFull):
+                pipeline.submit(self.doc_id, "path/cr.pdf", "cr.pdf", "CR")
+            release.set()
+            pipeline.shutdown()
+
+        self.assertEqual(self.status(), "PROCESSED")
+
+    def test_resume_does_not_republish(self):
+        db = self.Session()
+        docs = [models.DocumentMetadata(filename=f"{status}.pdf", status=status, doc_type="CR")
+                for status in ("EXTRACTING", "PUBLISHING", "PROCESSED")]
+        db.add_all(docs)
+        db.commit()
+        filenames = {self.doc_id: "cr.pdf", **{doc.id: doc.filename for doc in docs}}
+        db.close()
+
+        pipeline = IngestPipeline(session_factory=self.Session)
+        with tempfile.TemporaryDirectory() as upload_dir, patch.object(pipeline, 'submit') as mock_submit:
+            for doc_id, filename in filenames.items():
+                open(os.path.join(upload_dir, f"{doc_id}_{filename}"), "w").close()
+            resumed = pipeline.resume(upload_dir)
+
+        # PENDING et EXTRACTING relancés ; PUBLISHING a pu être publié : pas de second envoi
+        self.assertEqual(resumed, 2)
+        self.assertEqual(sorted(call.args[2] for call in mock_submit.call_args_list), ["EXTRACTING.pdf", "cr.pdf"])
+        db = self.Session()
+        statuses = {doc.filename: doc.status for doc in db.query(models.DocumentMetadata).all()}
+        db.close()
+        self.assertEqual(statuses["PUBLISHING.pdf"], "ERROR_QUEUE")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,16 @@ from unittest.mock import MagicMock, patch
 import sys
 import os
 import json
+import tempfile
 
 # Add parent directory to path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from processing import extract_text_from_file, publish_to_queue
+import pika
+
+import processing
+from docqa_common.segment_protocol import BlobStore
+from processing import RabbitPublisher, extract_text_from_file, publish_batch_to_queue, publish_to_queue
 
 class TestProcessing(unittest.TestCase):
 
@@ -34,37 +39,122 @@ class TestProcessing(unittest.TestCase):
         # Verify
         self.assertIsNone(result)
 
-    @patch('processing.pika')
-    def test_publish_to_queue(self, mock_pika):
-        # Setup mocks
+    def _mock_pika(self, mock_pika):
         mock_connection = MagicMock()
         mock_channel = MagicMock()
         mock_pika.BlockingConnection.return_value = mock_connection
+        mock_pika.exceptions = pika.exceptions
         mock_connection.channel.return_value = mock_channel
+        return mock_connection, mock_channel
+
+    @patch('processing.pika')
+    def test_publish_to_queue(self, mock_pika):
+        # Setup mocks
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
         
         doc_id = 123
         text = "Sample text"
         metadata = {"type": "report"}
         
         # Execute
-        publish_to_queue(doc_id, text, metadata)
+        with tempfile.TemporaryDirectory() as blob_dir, \
+                patch.object(processing, 'publisher', RabbitPublisher(pool_size=1)), \
+                patch.object(processing, 'blob_store', BlobStore(blob_dir)):
+            publish_to_queue(doc_id, text, metadata)
         
-        # Verify
-        mock_pika.BlockingConnection.assert_called_once()
-        mock_channel.queue_declare.assert_called_once_with(queue='raw_documents_queue', durable=True)
-        
-        expected_body = json.dumps({
-            "doc_id": doc_id,
-            "text": text,
-            "metadata": metadata
-        })
-        
-        mock_channel.basic_publish.assert_called_once()
-        args, kwargs = mock_channel.basic_publish.call_args
-        self.assertEqual(kwargs['routing_key'], 'raw_documents_queue')
-        self.assertEqual(kwargs['body'], expected_body)
+            # Verify
+            mock_pika.BlockingConnection.assert_called_once()
+            mock_channel.confirm_delivery.assert_called_once()
+            mock_channel.queue_declare.assert_called_once_with(queue='raw_documents_queue', durable=True)
+            
+            # En-tête, un segment (référence vers le blob store), fin
+            bodies = [json.loads(call.kwargs['body']) for call in mock_channel.basic_publish.call_args_list]
+            self.assertEqual([body["kind"] for body in bodies], ["header", "segment", "end"])
+            self.assertEqual(bodies[0]["metadata"], metadata)
+            self.assertEqual(bodies[1]["doc_id"], doc_id)
+            self.assertNotIn("text", bodies[1])
+            self.assertEqual(processing.blob_store.get(bodies[1]["blob"]), text)
+            self.assertEqual(mock_channel.basic_publish.call_args.kwargs['routing_key'], 'raw_documents_queue')
         
+        # La connexion reste ouverte pour les envois suivants
+        mock_connection.close.assert_not_called()
+
+    @patch('processing.pika')
+    def test_publisher_reuses_connection(self, mock_pika):
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
+        publisher = RabbitPublisher(pool_size=2)
+
+        for i in range(5):
+            publisher.publish(f"message {i}")
+
+        mock_pika.BlockingConnection.assert_called_once()
+        mock_channel.queue_declare.assert_called_once()
+        self.assertEqual(mock_channel.basic_publish.call_count, 5)
+
+        publisher.close()
         mock_connection.close.assert_called_once()
 
+    @patch('processing.pika')
+    def test_publish_batch_to_queue(self, mock_pika):
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
+
+        with tempfile.TemporaryDirectory() as blob_dir, \
+                patch.object(processing, 'publisher', RabbitPublisher(pool_size=2)), \
+                patch.object(processing, 'blob_store', BlobStore(blob_dir)):
+            publish_batch_to_queue([(1, "a", {}), (2, "b", {})])
+
+        mock_pika.BlockingConnection.assert_called_once()
+        bodies = [json.loads(call.kwargs['body']) for call in mock_channel.basic_publish.call_args_list]
+        self.assertEqual([(body["kind"], body["doc_id"]) for body in bodies],
+                         [("header", 1), ("segment", 1), ("end", 1), ("header", 2), ("segment", 2), ("end", 2)])
+        self.assertTrue(all(call.kwargs['mandatory'] for call in mock_channel.basic_publish.call_args_list))
+
+    @patch('processing.pika')
+    def test_publisher_reconnects_after_connection_loss(self, mock_pika):
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
+        mock_channel.basic_publish.side_effect = [pika.exceptions.StreamLostError("reset"), None]
+        publisher = RabbitPublisher(pool_size=1)
+
+        publisher.publish("message")
+
+        self.assertEqual(mock_pika.BlockingConnection.call_count, 2)
+        self.assertEqual(mock_channel.basic_publish.call_count, 2)
+        # Queue déclarée une seule fois malgré la reconnexion
+        mock_channel.queue_declare.assert_called_once()
+
+    @patch('processing.pika')
+    def test_publisher_gives_up_after_retries(self, mock_pika):
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
+        mock_channel.basic_publish.side_effect = pika.exceptions.AMQPConnectionError("down")
+        publisher = RabbitPublisher(pool_size=1)
+
+        with self.assertRaises(pika.exceptions.AMQPConnectionError):
+            publisher.publish("message", retries=2)
+        self.assertEqual(mock_channel.basic_publish.call_count, 3)
+
+    @patch('processing.pika')
+    def test_only_unconfirmed_message_is_republished(self, mock_pika):
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
+        # Connexion perdue au deuxième message : "a" est déjà confirmé, seul "b" est renvoyé
+        mock_channel.basic_publish.side_effect = [None, pika.exceptions.StreamLostError("reset"), None, None]
+        publisher = RabbitPublisher(pool_size=1)
+
+        publisher.publish_many(["a", "b", "c"])
+
+        bodies = [call.kwargs['body'] for call in mock_channel.basic_publish.call_args_list]
+        self.assertEqual(bodies, ["a", "b", "b", "c"])
+
+    @patch('processing.pika')
+    def test_returned_message_fails_the_batch(self, mock_pika):
+        mock_connection, mock_channel = self._mock_pika(mock_pika)
+        # Basic.Return (mandatory) avant le Basic.Ack : pika lève UnroutableError
+        mock_channel.basic_publish.side_effect = [None, pika.exceptions.UnroutableError([MagicMock()])]
+        publisher = RabbitPublisher(pool_size=1)
+
+        with self.assertRaises(pika.exceptions.UnroutableError):
+            publisher.publish_many(["a", "b", "c"])
+        # Ni renvoyé ni suivi du reste du lot
+        self.assertEqual(mock_channel.basic_publish.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """Cache de réponses indexé par l'embedding de la question.
+
+    Une question dont la similarité cosinus avec une question déjà posée
+    dépasse `threshold` reçoit la réponse stockée, tant que la génération
+    d'index n'a pas changé. Éviction LRU (au-delà de `max_entries`) et TTL.
+    """
+
+    def __init__(self, max_entries=256, ttl_seconds=3600, threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.generation = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype='float32')
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_generation(self, generation):
+        """False si `generation` est antérieure à celle du cache (requête commencée avant un rechargement)"""
+        # Nouvel index : les réponses en cache peuvent ne plus refléter le corpus
+        if self.generation is None or generation > self.generation:
+            self._entries.clear()
+            self.generation = generation
+        return generation == self.generation
+
+    def _evict_expired(self, now):
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, vector, generation):
+        """Retourne {"answer", "sources", "question", "similarity"} ou None"""
+        with self._lock:
+            current = self._check_generation(generation)
+            self._evict_expired(time.time())
+            if not current or not self._entries:
+                self.misses += 1
+                return None
+
+            keys = list(self._entries)
+            matrix = np.stack([self._entries[key]["vector"] for key in keys])
+            similarities = matrix @ self._normalize(vector)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(keys[best])
+            entry = self._entries[keys[best]]
+            return {
+                "answer": entry["answer"],
+                "sources": entry["sources"],
+                "question": entry["question"],
+                "similarity": float(similarities[best])
+            }
+
+    def store(self, question, vector, generation, answer, sources):
+        with self._lock:
+            if not self._check_generation(generation):
+                # Réponse calculée sur l'ancien index : ni stockée, ni cause d'un vidage
+                return
+            self._entries[self._next_key] = {
+                "question": question,
+                "vector": self._normalize(vector),
+                "answer": answer,
+                "sources": sources,
+                "created_at": time.time()
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
@@ -0,0 +1,129 @@
+"""Benchmark de la latence de récupération (encodage de la question + recherche FAISS).
+
+Compare trois configurations sous charge concurrente :
+  - direct  : `embed_query` du modèle pour chaque requête (comportement historique)
+  - cache   : cache LRU exact seul (micro-batching désactivé : lots de 1)
+  - batch   : cache LRU + micro-batching (`CachedBatchingEmbeddings`)
+
+Les questions sont tirées d'un pool avec répétitions (loi de Zipf), comme
+des praticiens qui reposent les mêmes questions.
+
+Avec `--simulated`, le modèle est remplacé par un encodeur au coût fixe
+par passe + coût par question, sérialisé par un verrou (une passe PyTorch
+occupe déjà tous les cœurs). Sans cette option, all-MiniLM-L6-v2 est chargé.
+
+Usage (depuis llm-qa/) :
+    python benchmarks/bench_query_encoding.py --clients 16 --requests 2000
+    python benchmarks/bench_query_encoding.py --simulated
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import faiss
+import numpy as np
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+from query_encoder import CachedBatchingEmbeddings
+
+DIMENSION = 384
+
+
+class SimulatedEncoder:
+    """Coût d'une passe : `pass_ms` + `per_query_ms` par question, une passe à la fois"""
+
+    def __init__(self, pass_ms, per_query_ms):
+        self.pass_ms = pass_ms
+        self.per_query_ms = per_query_ms
+        self._lock = threading.Lock()
+
+    def _vectors(self, texts):
+        return [np.random.default_rng(abs(hash(t)) % 2**32).random(DIMENSION, dtype='float32').tolist() for t in texts]
+
+    def embed_documents(self, texts):
+        with self._lock:
+            time.sleep((self.pass_ms + self.per_query_ms * len(texts)) / 1000)
+        return self._vectors(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def make_questions(n_distinct, n_requests, seed=0):
+    rng = np.random.default_rng(seed)
+    pool = [f"Quelles plantes pour le syndrome {i} (vide de Qi, chaleur) ?" for i in range(n_distinct)]
+    ranks = np.minimum(rng.zipf(1.3, n_requests), n_distinct) - 1
+    return [pool[r] for r in ranks]
+
+
+def run(embed_query, index, questions, clients):
+    latencies = []
+    lock = threading.Lock()
+    cursor = iter(questions)
+
+    def client():
+        while True:
+            with lock:
+                question = next(cursor, None)
+            if question is None:
+                return
+            start = time.perf_counter()
+            vector = np.asarray([embed_query(question)], dtype='float32')
+            index.search(vector, 3)
+            elapsed = 1000 * (time.perf_counter() - start)
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--distinct", type=int, default=500)
+    parser.add_argument("--corpus", type=int, default=10000)
+    parser.add_argument("--wait-ms", type=float, default=5)
+    parser.add_argument("--simulated", action="store_true")
+    parser.add_argument("--pass-ms", type=float, default=8.0)
+    parser.add_argument("--per-query-ms", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.simulated:
+        make_base = lambda: SimulatedEncoder(args.pass_ms, args.per_query_ms)
+    else:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+        make_base = lambda: model
+
+    index = faiss.IndexFlatL2(DIMENSION)
+    index.add(np.random.default_rng(1).random((args.corpus, DIMENSION), dtype='float32'))
+    questions = make_questions(args.distinct, args.requests)
+
+    configs = [
+        ("direct", lambda: make_base().embed_query),
+        ("cache", lambda: CachedBatchingEmbeddings(make_base(), max_batch_size=1, max_wait_ms=0).embed_query),
+        ("batch", lambda: CachedBatchingEmbeddings(make_base(), max_wait_ms=args.wait_ms).embed_query),
+    ]
+
+    print(f"{args.requests} requêtes, {args.clients} clients, {args.distinct} questions distinctes, "
+          f"index plat de {args.corpus} vecteurs ({'encodeur simulé' if args.simulated else 'all-MiniLM-L6-v2'})")
+    print(f"{'config':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'req/s':>8}")
+    for name, factory in configs:
+        latencies, elapsed = run(factory(), index, questions, args.clients)
+        print(f"{name:>8} | {np.percentile(latencies, 50):9.2f} | {np.percentile(latencies, 99):9.2f} | "
+              f"{len(latencies) / elapsed:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
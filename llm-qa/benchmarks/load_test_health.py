@@ -0,0 +1,74 @@
+"""Test de charge : latence de /health pendant des générations /ask/ en cours.
+
+Mesure d'abord la latence de /health au repos, puis lance N appels /ask/
+simultanés (20 par défaut) et continue d'échantillonner /health jusqu'à
+leur fin. Avec le pool de générations, la latence de /health doit rester
+plate ; les /ask/ au-delà de la file d'attente reçoivent un 429.
+
+Usage (llm-qa démarré sur le port 8001) :
+    python benchmarks/load_test_health.py --url http://127.0.0.1:8001 --concurrent 20
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+import numpy as np
+
+
+async def sample_health(client, url, stop_event, interval):
+    latencies = []
+    while not stop_event.is_set():
+        start = time.perf_counter()
+        await client.get(f"{url}/health")
+        latencies.append(1000 * (time.perf_counter() - start))
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def ask(client, url, question):
+    start = time.perf_counter()
+    response = await client.post(f"{url}/ask/", json={"question": question})
+    return response.status_code, time.perf_counter() - start
+
+
+def describe(name, latencies):
+    print(f"{name:>22} | n={len(latencies):>4} | p50={np.percentile(latencies, 50):7.2f} ms "
+          f"| p99={np.percentile(latencies, 99):7.2f} ms | max={max(latencies):7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8001")
+    parser.add_argument("--concurrent", type=int, default=20)
+    parser.add_argument("--question", default="Quelles plantes pour un vide de Qi ?")
+    parser.add_argument("--baseline-seconds", type=float, default=3)
+    parser.add_argument("--interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrent + 5)
+    async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+        stop_event = asyncio.Event()
+        baseline_task = asyncio.create_task(sample_health(client, args.url, stop_event, args.interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop_event.set()
+        baseline = await baseline_task
+
+        stop_event = asyncio.Event()
+        loaded_task = asyncio.create_task(sample_health(client, args.url, stop_event, args.interval))
+        asks = await asyncio.gather(*(ask(client, args.url, args.question) for _ in range(args.concurrent)))
+        stop_event.set()
+        loaded = await loaded_task
+
+    print()
+    describe("/health au repos", baseline)
+    describe(f"/health + {args.concurrent} /ask/", loaded)
+    statuses = Counter(status for status, _ in asks)
+    durations = [d for status, d in asks if status == 200]
+    print(f"{'/ask/':>22} | statuts={dict(statuses)} | "
+          f"durée max (200) = {max(durations) if durations else 0:.1f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackpressureError(Exception):
+    """File d'attente des générations pleine, ou délai d'attente dépassé"""
+
+
+class GenerationLimiter:
+    """Limite le nombre de générations LLM simultanées.
+
+    Les appels bloquants (chaîne LangChain, Ollama) tournent dans un pool de
+    threads dédié de `max_concurrent` threads : la boucle d'événements reste
+    libre pour /health et les autres routes. Au-delà, jusqu'à `max_queue`
+    requêtes attendent un créneau pendant `queue_timeout` secondes ; les
+    suivantes sont refusées immédiatement (BackpressureError -> HTTP 429).
+    """
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="llm-generation")
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def acquire(self):
+        """Réserve un créneau de génération (à libérer avec `release`)"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise BackpressureError("File d'attente des générations pleine")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BackpressureError(f"Aucun créneau de génération libéré en {self.queue_timeout}s")
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        """Libère un créneau (à appeler depuis la boucle d'événements)"""
+        self.active -= 1
+        self._semaphore.release()
+
+    def releaser(self):
+        """Fonction qui libère le créneau réservé une seule fois, même appelée plusieurs fois.
+
+        Pour un créneau tenu au-delà du handler (réponse en streaming) : la
+        libération peut venir de la fin du flux comme de la fin de la réponse.
+        """
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self.release()
+
+        return release
+
+    async def run(self, fn, *args, **kwargs):
+        """Exécute `fn` dans le pool dédié, une fois un créneau obtenu"""
+        await self.acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.release()
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected
+        }
@@ -1,71 +1,47 @@
 import os
-import pickle
-import faiss
+import threading
+import time
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 # --- CHANGEMENT CLÉ : On importe ChatOllama au lieu de ChatOpenAI ---
 from langchain_community.chat_models import ChatOllama 
 
 from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.prompts import PromptTemplate
-from langchain_community.docstore.in_memory import InMemoryDocstore
-from langchain_community.docstore.document import Document
 
-app = FastAPI(title="Health LLM Assistant (Local Version)")
+from docqa_common.startup import WARMUP, StartupState
 
-# Chemins vers les fichiers créés par l'indexeur
-FAISS_PATH = "../semantic-indexer/vector_store.faiss"
-META_PATH = "../semantic-indexer/metadata_store.pkl"
+from answer_cache import SemanticAnswerCache
+from concurrency import BackpressureError, GenerationLimiter
+from query_encoder import CachedBatchingEmbeddings
+from search_client import SEARCH_API_URL, SearchAPIClient, SearchAPIEmbeddings, SearchAPIRetriever, served_generation
+from streaming import AnswerStreamer, SlotStreamingResponse, limited_stream
 
-print("1. Chargement du modèle d'embedding...")
-# On garde le même modèle d'embedding que l'indexeur (HuggingFace)
-embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+app = FastAPI(title="Health LLM Assistant (Local Version)")
 
-print("2. Reconstruction de la base vectorielle...")
-vector_store = None
+# Le serveur répond (/health, /ready) pendant que les modèles se chargent en arrière-plan
+startup = StartupState("llm-qa")
 
-try:
-    if not os.path.exists(FAISS_PATH):
-        raise FileNotFoundError(f"Fichier introuvable: {FAISS_PATH}")
-    
-    # Lecture manuelle des fichiers de l'indexeur
-    raw_index = faiss.read_index(FAISS_PATH)
-    
-    with open(META_PATH, "rb") as f:
-        metadata_store = pickle.load(f)
-    
-    # Reconstruction du lien Index <-> Texte pour LangChain
-    docstore = InMemoryDocstore({})
-    index_to_docstore_id = {}
-    
-    for i, meta in enumerate(metadata_store):
-        doc_id = str(i)
-        doc = Document(
-            page_content=meta["text_content"],
-            metadata={"source": meta["source"], "original_id": meta["doc_id"]}
-        )
-        docstore.add({doc_id: doc})
-        index_to_docstore_id[i] = doc_id
-        
-    vector_store = FAISS(
-        embedding_function=embeddings,
-        index=raw_index,
-        docstore=docstore,
-        index_to_docstore_id=index_to_docstore_id
-    )
-    print(f"✅ Base locale chargée avec succès ! ({raw_index.ntotal} documents)")
+# Modèle d'embedding et index : servis par l'API de recherche de semantic-indexer
+# (search_service.py), plus de copie locale. Créés par load_models() au démarrage.
+search_client = None
+embeddings = None
 
-except Exception as e:
-    print(f"❌ ERREUR : Impossible de charger l'index. Détails: {e}")
+# Génération d'index servie par l'API (clé du cache de réponses), relue périodiquement
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "10"))
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "3"))
+# hybrid (k-NN + BM25), dense ou lexical ; vide : mode par défaut de l'API
+SEARCH_MODE = os.getenv("SEARCH_MODE", "")
+index_generation = 0
 
 # --- CHANGEMENT MAJEUR ICI ---
 # On utilise Ollama (Mistral) qui tourne sur votre PC
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 
-print(f"3. Connexion au LLM Local (Ollama) sur {OLLAMA_BASE_URL}...")
+print(f"1. Connexion au LLM Local (Ollama) sur {OLLAMA_BASE_URL}...")
 llm = ChatOllama(model="mistral", base_url=OLLAMA_BASE_URL, temperature=0)
 # Le Prompt (Consignes données à l'IA)
 template = """
@@ -94,33 +70,185 @@ RÉPONSE EXPERT :
 QA_CHAIN_PROMPT = PromptTemplate(input_variables=["context", "question"], template=template)
 
 # Création de la chaîne RAG
-if vector_store:
-    qa_chain = RetrievalQA.from_chain_type(
+def build_qa_chain(retriever):
+    return RetrievalQA.from_chain_type(
         llm=llm,
         chain_type="stuff",
-        retriever=vector_store.as_retriever(search_kwargs={"k": 3}),
+        retriever=retriever,
         return_source_documents=True,
         chain_type_kwargs={"prompt": QA_CHAIN_PROMPT}
     )
-else:
-    qa_chain = None
+
+qa_chain = None
+
+# --- GÉNÉRATION DE L'INDEX ---
+def reload_if_new_generation():
+    """Relève la génération servie par l'API de recherche.
+
+    L'API recharge elle-même l'index publié ; ici seule la clé du cache de
+    réponses change (les réponses calculées sur l'ancien index sont écartées).
+    """
+    global index_generation
+    generation = search_client.generation()
+    if generation is None or generation == index_generation:
+        return False
+    index_generation = generation
+    print(f"🔄 Nouvel index servi par l'API de recherche : génération {generation}")
+    return True
+
+def watch_index(interval=INDEX_RELOAD_INTERVAL):
+    while True:
+        time.sleep(interval)
+        try:
+            reload_if_new_generation()
+        except Exception as e:
+            print(f"⚠️ API de recherche injoignable : {e}")
+
+# --- CONNEXION À L'API DE RECHERCHE (après l'ouverture du port) ---
+def load_models():
+    global search_client, embeddings, qa_chain
+
+    print(f"2. Connexion à l'API de recherche ({SEARCH_API_URL})...")
+    with startup.phase("search_api"):
+        search_client = SearchAPIClient()
+        # Encodage des questions : cache LRU exact + micro-batching des requêtes concurrentes,
+        # chaque lot étant un seul appel POST /api/embed
+        embeddings = CachedBatchingEmbeddings(
+            SearchAPIEmbeddings(search_client),
+            cache_size=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024")),
+            max_batch_size=int(os.getenv("QUERY_BATCH_SIZE", "32")),
+            max_wait_ms=float(os.getenv("QUERY_BATCH_WAIT_MS", "5"))
+        )
+        qa_chain = build_qa_chain(SearchAPIRetriever(
+            client=search_client, embeddings=embeddings, k=RETRIEVAL_K, mode=SEARCH_MODE
+        ))
+        try:
+            reload_if_new_generation()
+            print(f"✅ API de recherche joignable (génération {index_generation})")
+        except Exception as e:
+            # Pas bloquant : la génération sera relevée par le watcher
+            print(f"❌ ERREUR : API de recherche injoignable. Détails: {e}")
+
+    if WARMUP:
+        with startup.phase("warmup"):
+            # Encodeur distant directement : la question factice n'entre pas dans le cache
+            try:
+                embeddings.base.embed_query("échauffement du modèle")
+            except Exception as e:
+                print(f"⚠️ Échauffement impossible : {e}")
+
+    threading.Thread(target=watch_index, name="index-watcher", daemon=True).start()
+
+@app.on_event("startup")
+def start_loading():
+    startup.load_in_background(load_models)
+
+def not_ready():
+    detail = startup.error or f"Service en cours de démarrage ({startup.current_phase or 'initialisation'})."
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+
+# --- CONCURRENCE DES GÉNÉRATIONS ---
+# Les appels Ollama sont bloquants : ils tournent hors de la boucle d'événements,
+# en nombre limité, avec une file d'attente bornée (429 au-delà)
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "2"))
+MAX_QUEUED_GENERATIONS = int(os.getenv("MAX_QUEUED_GENERATIONS", "8"))
+GENERATION_QUEUE_TIMEOUT = float(os.getenv("GENERATION_QUEUE_TIMEOUT", "30"))
+
+generation_limiter = GenerationLimiter(
+    MAX_CONCURRENT_GENERATIONS, MAX_QUEUED_GENERATIONS, GENERATION_QUEUE_TIMEOUT
+)
+
+def too_many_requests(e):
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+
+# --- CACHE SÉMANTIQUE DES RÉPONSES ---
+# Une question quasi identique (cosinus >= seuil) à une question déjà traitée
+# reçoit la même réponse sans appel au LLM ; vidé à chaque nouvelle génération d'index
+answer_cache = SemanticAnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "256")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+)
 
 class Query(BaseModel):
     question: str
 
 @app.post("/ask/")
 async def ask_question(query: Query):
-    if not qa_chain:
+    if not startup.ready:
+        raise not_ready()
+    # Référence locale : un rechargement concurrent ne change pas la chaîne de cette requête
+    chain, generation = qa_chain, index_generation
+    if not chain:
         raise HTTPException(status_code=503, detail="Index non chargé.")
+
+    question_vector = await run_in_threadpool(embeddings.embed_query, query.question)
+    cached = answer_cache.lookup(question_vector, generation)
+    if cached:
+        return {"answer": cached["answer"], "sources": cached["sources"], "cached": True}
     
-    # L'appel peut prendre quelques secondes en local
-    result = qa_chain.invoke({"query": query.question})
+    # L'appel peut prendre quelques secondes en local : exécuté dans le pool dédié
+    try:
+        result = await generation_limiter.run(chain.invoke, {"query": query.question})
+    except BackpressureError as e:
+        raise too_many_requests(e)
     
+    answer = result["result"]
+    sources = [doc.metadata.get("source") for doc in result["source_documents"]]
+    # Clé du cache : la génération qui a servi les extraits, pas celle relevée avant l'appel
+    generation = served_generation(result["source_documents"], generation)
+    answer_cache.store(query.question, question_vector, generation, answer, sources)
+    return {"answer": answer, "sources": sources, "cached": False}
+
+# --- STREAMING (Server-Sent Events) ---
+streamer = AnswerStreamer(llm, QA_CHAIN_PROMPT, answer_cache)
+
+@app.post("/ask/stream")
+async def ask_question_stream(query: Query):
+    if not startup.ready:
+        raise not_ready()
+    chain, generation = qa_chain, index_generation
+    if not chain:
+        raise HTTPException(status_code=503, detail="Index non chargé.")
+
+    sse_headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    question_vector = await run_in_threadpool(embeddings.embed_query, query.question)
+    cached = answer_cache.lookup(question_vector, generation)
+    if cached:
+        # Pas de génération : aucun créneau du limiteur n'est consommé
+        return StreamingResponse(streamer.replay(cached), media_type="text/event-stream", headers=sse_headers)
+
+    # Créneau réservé avant la réponse : le refus est un vrai 429, pas un flux vide
+    try:
+        await generation_limiter.acquire()
+    except BackpressureError as e:
+        raise too_many_requests(e)
+
+    # Libéré à la fin du flux, ou à la fin de la réponse si le flux n'a jamais démarré
+    release = generation_limiter.releaser()
+    return SlotStreamingResponse(
+        limited_stream(streamer.stream(chain, query.question, question_vector, generation), release),
+        release,
+        media_type="text/event-stream",
+        headers=sse_headers
+    )
+
+@app.get("/metrics")
+def metrics():
     return {
-        "answer": result["result"],
-        "sources": [doc.metadata.get("source") for doc in result["source_documents"]]
+        "ttft_ms": streamer.ttft_stats(),
+        "generations": generation_limiter.stats(),
+        "answer_cache": answer_cache.stats(),
+        "query_embeddings": embeddings.stats() if embeddings else None,
+        "startup": startup.readiness()
     }
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "service": "llm-qa"}
+    """Vivacité : répond dès l'ouverture du port, modèles chargés ou non"""
+    return {**startup.liveness(), "index_generation": index_generation}
+
+@app.get("/ready")
+def ready():
+    """Disponibilité : 503 tant que les modèles ne sont pas chargés"""
+    return JSONResponse(status_code=200 if startup.ready else 503, content=startup.readiness())
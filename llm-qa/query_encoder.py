@@ -0,0 +1,108 @@
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_question(text):
+    """Clé de cache : espaces réduits et minuscules (all-MiniLM-L6-v2 ignore la casse)"""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class CachedBatchingEmbeddings(Embeddings):
+    """Embeddings de requêtes avec cache LRU exact et micro-batching.
+
+    `embed_query` consulte d'abord un cache LRU (texte normalisé -> vecteur).
+    En cas d'absence, la question est confiée à un thread d'encodage qui
+    attend jusqu'à `max_wait_ms` d'autres requêtes concurrentes, puis encode
+    le lot (au plus `max_batch_size`) en une seule passe du modèle.
+    `embed_documents` est délégué tel quel au modèle sous-jacent.
+    """
+
+    def __init__(self, base, cache_size=1024, max_batch_size=32, max_wait_ms=5):
+        self.base = base
+        self.cache_size = cache_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.batched_queries = 0
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="query-encoder", daemon=True)
+        self._worker.start()
+
+    def embed_documents(self, texts):
+        return self.base.embed_documents(texts)
+
+    def embed_query(self, text):
+        key = normalize_question(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return list(vector)
+            self.misses += 1
+            # Même question déjà en cours d'encodage : on attend le même résultat
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._queue.put((key, text, future))
+        return list(future.result())
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            try:
+                vectors = self.base.embed_documents([text for _, text, _ in batch])
+            except Exception as e:
+                with self._lock:
+                    for key, _, _ in batch:
+                        self._inflight.pop(key, None)
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.batched_queries += len(batch)
+                for (key, _, _), vector in zip(batch, vectors):
+                    self._cache[key] = tuple(vector)
+                    self._inflight.pop(key, None)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            for (_, _, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "cache_size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "batches": self.batches,
+            "mean_batch_size": self.batched_queries / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,108 @@
+"""Accès à l'API de recherche de semantic-indexer (search_service.py).
+
+llm-qa ne charge plus ni le modèle d'embedding ni l'index : les questions
+sont encodées par POST /api/embed (derrière le cache et le micro-batching de
+`CachedBatchingEmbeddings`) et les chunks retrouvés par POST /api/search/batch,
+avec le vecteur déjà calculé pour ne pas ré-encoder la question.
+"""
+import os
+from typing import Any, List
+
+import httpx
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+SEARCH_API_URL = os.getenv("SEARCH_API_URL", "http://localhost:8003")
+SEARCH_API_TIMEOUT = float(os.getenv("SEARCH_API_TIMEOUT", "10"))
+
+
+class SearchAPIClient:
+    """Client HTTP synchrone (appelé hors boucle d'événements), connexions gardées ouvertes"""
+
+    def __init__(self, base_url=SEARCH_API_URL, timeout=SEARCH_API_TIMEOUT, max_connections=20, transport=None):
+        self.client = httpx.Client(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    def _post(self, path, payload):
+        response = self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def embed(self, texts):
+        return self._post("/api/embed", {"texts": list(texts)})["vectors"]
+
+    def search_batch(self, queries, k, mode=None):
+        """queries : [{"q": texte, "vector": [...] ou absent}] -> (génération, [[extraits]])"""
+        payload = {"queries": queries, "k": k}
+        if mode:
+            payload["mode"] = mode
+        body = self._post("/api/search/batch", payload)
+        return body["generation"], body["results"]
+
+    def generation(self):
+        """Génération d'index servie (None si l'API n'a pas encore d'index)"""
+        response = self.client.get("/health")
+        response.raise_for_status()
+        return response.json().get("generation")
+
+    def close(self):
+        self.client.close()
+
+
+class SearchAPIEmbeddings(Embeddings):
+    """Embeddings calculés par l'API de recherche (même modèle que l'index)"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def embed_documents(self, texts):
+        return self.client.embed(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class SearchAPIRetriever(BaseRetriever):
+    """Retriever LangChain : k extraits de l'API de recherche pour une question.
+
+    Avec `embeddings`, le vecteur de la question est pris dans leur cache (déjà
+    calculé pour le cache de réponses) et envoyé avec la requête. Chaque extrait
+    porte la génération d'index qui l'a servi (`metadata["generation"]`).
+    """
+
+    client: Any
+    embeddings: Any = None
+    k: int = 3
+    mode: str = ""
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        search_query = {"q": query}
+        if self.embeddings is not None and self.mode != "lexical":
+            search_query["vector"] = [float(x) for x in self.embeddings.embed_query(query)]
+        generation, results = self.client.search_batch([search_query], self.k, self.mode or None)
+        return [
+            Document(
+                page_content=snippet["text"],
+                metadata={"source": snippet["source"], "original_id": snippet["doc_id"], "score": snippet.get("score"),
+                          "generation": generation}
+            )
+            for snippet in results[0]
+        ]
+
+
+def served_generation(docs, default=None):
+    """Génération d'index qui a réellement servi ces extraits (clé du cache de réponses).
+
+    Peut être plus récente que celle relevée par `reload_if_new_generation` si
+    l'API a rechargé l'index entre-temps. `default` si aucun extrait.
+    """
+    for doc in docs:
+        if doc.metadata.get("generation") is not None:
+            return doc.metadata["generation"]
+    return default
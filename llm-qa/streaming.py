@@ -0,0 +1,111 @@
+import json
+import time
+from collections import deque
+
+import numpy as np
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import StreamingResponse
+
+from search_client import served_generation
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class AnswerStreamer:
+    """Flux Server-Sent Events de /ask/stream.
+
+    Événements : `sources`, puis un `token` par fragment généré par le LLM,
+    puis `done` (temps au premier token et temps total) ; `error` remplace la
+    suite du flux si la recherche ou la génération échoue. Les temps au premier
+    token (ms) sont conservés pour /metrics.
+    """
+
+    def __init__(self, llm, prompt, answer_cache=None, max_samples=1000):
+        self.llm = llm
+        self.prompt = prompt
+        self.answer_cache = answer_cache
+        self.ttft_samples = deque(maxlen=max_samples)
+
+    def stream(self, chain, question, question_vector=None, generation=None):
+        """Générateur SSE : sources d'abord, puis tokens au fil de la génération Ollama.
+
+        Générateur synchrone : Starlette l'itère dans son threadpool, la boucle
+        d'événements n'est pas bloquée par la génération. Si `question_vector`
+        est fourni, la réponse complète est mise en cache à la fin du flux, sous
+        la génération qui a servi les extraits (`generation` s'ils n'en portent pas).
+        """
+        start = time.perf_counter()
+        try:
+            docs = chain.retriever.invoke(question)
+            generation = served_generation(docs, generation)
+            sources = [doc.metadata.get("source") for doc in docs]
+            yield sse_event("sources", {"sources": sources})
+
+            # Même prompt que la chaîne "stuff" de RetrievalQA
+            prompt = self.prompt.format(
+                context="\n\n".join(doc.page_content for doc in docs),
+                question=question
+            )
+            ttft_ms = None
+            parts = []
+            for chunk in self.llm.stream(prompt):
+                if not chunk.content:
+                    continue
+                if ttft_ms is None:
+                    ttft_ms = 1000 * (time.perf_counter() - start)
+                    self.ttft_samples.append(ttft_ms)
+                parts.append(chunk.content)
+                yield sse_event("token", {"text": chunk.content})
+
+            if question_vector is not None and self.answer_cache is not None:
+                self.answer_cache.store(question, question_vector, generation, "".join(parts), sources)
+            yield sse_event("done", {"ttft_ms": ttft_ms, "total_ms": 1000 * (time.perf_counter() - start)})
+        except Exception as e:
+            print(f"Erreur streaming: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    @staticmethod
+    def replay(cached):
+        """Rejoue une réponse en cache avec les mêmes événements SSE qu'une génération"""
+        yield sse_event("sources", {"sources": cached["sources"]})
+        yield sse_event("token", {"text": cached["answer"]})
+        yield sse_event("done", {"ttft_ms": None, "total_ms": 0.0, "cached": True})
+
+    def ttft_stats(self):
+        samples = list(self.ttft_samples)
+        return {
+            "count": len(samples),
+            "p50": float(np.percentile(samples, 50)) if samples else None,
+            "p95": float(np.percentile(samples, 95)) if samples else None
+        }
+
+
+async def limited_stream(events, release):
+    """Relaie le générateur SSE (itéré hors boucle) puis libère le créneau de génération"""
+    try:
+        async for event in iterate_in_threadpool(events):
+            yield event
+    finally:
+        release()
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """StreamingResponse qui libère le créneau de génération quand la réponse se termine.
+
+    Si le client se déconnecte avant que Starlette n'itère le flux, le
+    `finally` de `limited_stream` ne s'exécute jamais : la libération est donc
+    aussi faite ici, quelle que soit l'issue. `release` doit être idempotente
+    (`GenerationLimiter.releaser()`).
+    """
+
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
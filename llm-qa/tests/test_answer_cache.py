@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from answer_cache import SemanticAnswerCache
+
+class TestSemanticAnswerCache(unittest.TestCase):
+
+    def test_similar_question_hits(self):
+        cache = SemanticAnswerCache(threshold=0.9)
+        cache.store("Quelles plantes pour le vide de Qi ?", [1.0, 0.0, 0.0], 1, "Ren Shen", ["kb.csv"])
+
+        cached = cache.lookup([0.98, 0.1, 0.0], 1)
+
+        self.assertEqual(cached["answer"], "Ren Shen")
+        self.assertEqual(cached["sources"], ["kb.csv"])
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_dissimilar_question_misses(self):
+        cache = SemanticAnswerCache(threshold=0.9)
+        cache.store("q", [1.0, 0.0], 1, "a", [])
+
+        self.assertIsNone(cache.lookup([0.0, 1.0], 1))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_new_generation_invalidates(self):
+        cache = SemanticAnswerCache()
+        cache.store("q", [1.0, 0.0], 1, "a", [])
+
+        self.assertIsNone(cache.lookup([1.0, 0.0], 2))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_store_from_older_generation_is_dropped(self):
+        # Requête commencée avant le rechargement de l'index, terminée après
+        cache = SemanticAnswerCache()
+        cache.store("q2", [0.0, 1.0], 2, "nouvelle", [])
+        cache.store("q1", [1.0, 0.0], 1, "ancienne", [])
+
+        self.assertEqual(cache.generation, 2)
+        self.assertEqual(cache.stats()["size"], 1)
+        self.assertIsNone(cache.lookup([1.0, 0.0], 2))
+        self.assertEqual(cache.lookup([0.0, 1.0], 2)["answer"], "nouvelle")
+
+    def test_lookup_from_older_generation_misses_without_clearing(self):
+        cache = SemanticAnswerCache()
+        cache.store("q", [1.0, 0.0], 2, "a", [])
+
+        self.assertIsNone(cache.lookup([1.0, 0.0], 1))
+        self.assertEqual(cache.lookup([1.0, 0.0], 2)["answer"], "a")
+
+    def test_lru_eviction(self):
+        cache = SemanticAnswerCache(max_entries=2)
+        cache.store("a", [1.0, 0.0, 0.0], 1, "A", [])
+        cache.store("b", [0.0, 1.0, 0.0], 1, "B", [])
+        cache.lookup([1.0, 0.0, 0.0], 1)  # "a" devient le plus récent
+        cache.store("c", [0.0, 0.0, 1.0], 1, "C", [])
+
+        self.assertIsNotNone(cache.lookup([1.0, 0.0, 0.0], 1))
+        self.assertIsNone(cache.lookup([0.0, 1.0, 0.0], 1))
+
+    def test_ttl_expiry(self):
+        cache = SemanticAnswerCache(ttl_seconds=10)
+        with patch("answer_cache.time.time", return_value=1000.0):
+            cache.store("q", [1.0, 0.0], 1, "a", [])
+        with patch("answer_cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.lookup([1.0, 0.0], 1))
+
+if __name__ == '__main__':
+    unittest.main()
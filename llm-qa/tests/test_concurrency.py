@@ -0,0 +1,58 @@
+import unittest
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from concurrency import BackpressureError, GenerationLimiter
+
+class TestGenerationLimiter(unittest.IsolatedAsyncioTestCase):
+
+    async def test_run_offloads_blocking_call(self):
+        limiter = GenerationLimiter(max_concurrent=1, max_queue=1, queue_timeout=1)
+        main_thread = threading.get_ident()
+
+        thread_id = await limiter.run(threading.get_ident)
+
+        self.assertNotEqual(thread_id, main_thread)
+        self.assertEqual(limiter.stats()["active"], 0)
+
+    async def test_releaser_releases_once(self):
+        limiter = GenerationLimiter(max_concurrent=2, max_queue=1, queue_timeout=1)
+        await limiter.acquire()
+        await limiter.acquire()
+        release = limiter.releaser()
+
+        release()
+        release()
+
+        self.assertEqual(limiter.stats()["active"], 1)
+
+    async def test_full_queue_is_rejected(self):
+        limiter = GenerationLimiter(max_concurrent=1, max_queue=1, queue_timeout=5)
+        running = asyncio.ensure_future(limiter.run(time.sleep, 0.3))
+        queued = asyncio.ensure_future(limiter.run(time.sleep, 0))
+        await asyncio.sleep(0.05)
+
+        with self.assertRaises(BackpressureError):
+            await limiter.run(time.sleep, 0)
+
+        await asyncio.gather(running, queued)
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+    async def test_queue_timeout(self):
+        limiter = GenerationLimiter(max_concurrent=1, max_queue=5, queue_timeout=0.05)
+        await limiter.acquire()
+
+        with self.assertRaises(BackpressureError):
+            await limiter.acquire()
+
+        limiter.release()
+        self.assertEqual(limiter.stats()["waiting"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
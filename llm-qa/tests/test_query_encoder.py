@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from query_encoder import CachedBatchingEmbeddings, normalize_question
+
+class FakeEncoder:
+    """Encodeur factice : enregistre la taille de chaque lot"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        time.sleep(self.delay)
+        return [[float(len(text)), 1.0] for text in texts]
+
+class TestCachedBatchingEmbeddings(unittest.TestCase):
+
+    def test_normalize_question(self):
+        self.assertEqual(normalize_question("  Quelles  plantes\n pour le Qi ? "), "quelles plantes pour le qi ?")
+
+    def test_repeated_question_hits_cache(self):
+        base = FakeEncoder()
+        embeddings = CachedBatchingEmbeddings(base, max_wait_ms=0)
+
+        first = embeddings.embed_query("Vide de Qi")
+        second = embeddings.embed_query("  vide de   qi ")
+
+        self.assertEqual(first, second)
+        self.assertEqual(base.batches, [1])
+        self.assertEqual(embeddings.stats()["hits"], 1)
+
+    def test_concurrent_queries_are_batched(self):
+        base = FakeEncoder(delay=0.05)
+        embeddings = CachedBatchingEmbeddings(base, max_wait_ms=20)
+        results = {}
+
+        def ask(i):
+            results[i] = embeddings.embed_query(f"question {i:02d}")
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(results), 8)
+        self.assertLess(len(base.batches), 8)
+        self.assertEqual(sum(base.batches), 8)
+
+    def test_lru_bound(self):
+        embeddings = CachedBatchingEmbeddings(FakeEncoder(), cache_size=2, max_wait_ms=0)
+        for question in ("a", "b", "c"):
+            embeddings.embed_query(question)
+
+        self.assertEqual(embeddings.stats()["cache_size"], 2)
+
+    def test_encoder_error_propagates(self):
+        class Failing:
+            def embed_documents(self, texts):
+                raise RuntimeError("modèle indisponible")
+
+        embeddings = CachedBatchingEmbeddings(Failing(), max_wait_ms=0)
+        with self.assertRaises(RuntimeError):
+            embeddings.embed_query("q")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import json
+
+import httpx
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from query_encoder import CachedBatchingEmbeddings
+from search_client import SearchAPIClient, SearchAPIEmbeddings, SearchAPIRetriever, served_generation
+
+class FakeSearchAPI:
+    """API de recherche factice : enregistre les requêtes reçues"""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request):
+        body = json.loads(request.content) if request.content else None
+        self.requests.append((request.url.path, body))
+        if request.url.path == "/api/embed":
+            return httpx.Response(200, json={"generation": 4, "vectors": [[float(len(t)), 1.0] for t in body["texts"]]})
+        if request.url.path == "/api/search/batch":
+            results = [[{"doc_id": "KB_MTC", "text": f"extrait {q['q']}", "source": "kb.csv", "score": 0.5}]
+                       for q in body["queries"]]
+            return httpx.Response(200, json={"generation": 4, "results": results})
+        if request.url.path == "/health":
+            return httpx.Response(200, json={"status": "alive", "generation": 4})
+        return httpx.Response(404)
+
+class TestSearchClient(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeSearchAPI()
+        self.client = SearchAPIClient("http://search", transport=httpx.MockTransport(self.api))
+        self.addCleanup(self.client.close)
+
+    def test_embeddings(self):
+        embeddings = SearchAPIEmbeddings(self.client)
+        self.assertEqual(embeddings.embed_documents(["ab", "abc"]), [[2.0, 1.0], [3.0, 1.0]])
+        self.assertEqual(self.api.requests, [("/api/embed", {"texts": ["ab", "abc"]})])
+
+    def test_retriever_reuses_cached_vector(self):
+        embeddings = CachedBatchingEmbeddings(SearchAPIEmbeddings(self.client), max_wait_ms=0)
+        embeddings.embed_query("Vide de Qi")
+        retriever = SearchAPIRetriever(client=self.client, embeddings=embeddings, k=3, mode="hybrid")
+
+        docs = retriever.invoke("Vide de Qi")
+
+        self.assertEqual(docs[0].page_content, "extrait Vide de Qi")
+        self.assertEqual(docs[0].metadata["source"], "kb.csv")
+        # Un seul encodage : la recherche reçoit le vecteur du cache
+        self.assertEqual([path for path, _ in self.api.requests], ["/api/embed", "/api/search/batch"])
+        self.assertEqual(self.api.requests[1][1], {
+            "queries": [{"q": "Vide de Qi", "vector": [10.0, 1.0]}], "k": 3, "mode": "hybrid"
+        })
+
+    def test_lexical_mode_sends_no_vector(self):
+        retriever = SearchAPIRetriever(client=self.client, k=2, mode="lexical")
+        retriever.invoke("metformine")
+        self.assertEqual(self.api.requests, [("/api/search/batch", {
+            "queries": [{"q": "metformine"}], "k": 2, "mode": "lexical"
+        })])
+
+    def test_generation(self):
+        self.assertEqual(self.client.generation(), 4)
+
+    def test_retriever_reports_served_generation(self):
+        docs = SearchAPIRetriever(client=self.client, k=1, mode="lexical").invoke("metformine")
+
+        self.assertEqual(docs[0].metadata["generation"], 4)
+        self.assertEqual(served_generation(docs, 3), 4)
+        self.assertEqual(served_generation([], 3), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import unittest
+import sys
+import os
+import json
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from concurrency import GenerationLimiter
+from streaming import AnswerStreamer, SlotStreamingResponse, limited_stream, sse_event
+
+def parse(events):
+    """[(event, data)] à partir des chaînes SSE produites"""
+    parsed = []
+    for raw in events:
+        event_line, data_line = raw.rstrip("\n").split("\n")
+        parsed.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return parsed
+
+class FakeLLM:
+    def __init__(self, tokens, fail_after=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.prompts = []
+
+    def stream(self, prompt):
+        self.prompts.append(prompt)
+        for i, token in enumerate(self.tokens):
+            if i == self.fail_after:
+                raise RuntimeError("Ollama injoignable")
+            yield SimpleNamespace(content=token)
+
+def make_chain(docs=None, error=None):
+    retriever = MagicMock()
+    if error:
+        retriever.invoke.side_effect = error
+    else:
+        retriever.invoke.return_value = docs or [
+            SimpleNamespace(page_content="Ren Shen : score 10", metadata={"source": "kb.csv"}),
+            SimpleNamespace(page_content="Dossier P1", metadata={"source": "P1.pdf"}),
+        ]
+    return SimpleNamespace(retriever=retriever)
+
+class TestAnswerStreamer(unittest.TestCase):
+
+    def test_events_in_order(self):
+        llm = FakeLLM(["Ren", "", " Shen"])
+        streamer = AnswerStreamer(llm, "{context}|{question}")
+
+        events = parse(streamer.stream(make_chain(), "Vide de Qi ?"))
+
+        self.assertEqual([e for e, _ in events], ["sources", "token", "token", "done"])
+        self.assertEqual(events[0][1], {"sources": ["kb.csv", "P1.pdf"]})
+        self.assertEqual("".join(d["text"] for e, d in events if e == "token"), "Ren Shen")
+        self.assertEqual(llm.prompts, ["Ren Shen : score 10\n\nDossier P1|Vide de Qi ?"])
+        self.assertIsNotNone(events[-1][1]["ttft_ms"])
+
+    def test_retrieval_error_emits_error_event(self):
+        streamer = AnswerStreamer(FakeLLM(["x"]), "{context}|{question}")
+
+        events = parse(streamer.stream(make_chain(error=RuntimeError("API de recherche injoignable")), "q"))
+
+        self.assertEqual(events, [("error", {"detail": "API de recherche injoignable"})])
+
+    def test_generation_error_after_tokens(self):
+        cache = MagicMock()
+        streamer = AnswerStreamer(FakeLLM(["Ren", " Shen"], fail_after=1), "{context}|{question}", cache)
+
+        events = parse(streamer.stream(make_chain(), "q", [1.0, 0.0], 3))
+
+        self.assertEqual([e for e, _ in events], ["sources", "token", "error"])
+        self.assertEqual(events[-1][1], {"detail": "Ollama injoignable"})
+        # Réponse incomplète : pas de mise en cache
+        cache.store.assert_not_called()
+
+    def test_full_answer_is_cached(self):
+        cache = MagicMock()
+        streamer = AnswerStreamer(FakeLLM(["Ren", " Shen"]), "{context}|{question}", cache)
+
+        list(streamer.stream(make_chain(), "q", [1.0, 0.0], 3))
+
+        cache.store.assert_called_once_with("q", [1.0, 0.0], 3, "Ren Shen", ["kb.csv", "P1.pdf"])
+
+    def test_answer_cached_under_served_generation(self):
+        cache = MagicMock()
+        streamer = AnswerStreamer(FakeLLM(["Ren"]), "{context}|{question}", cache)
+        # Index rechargé par l'API de recherche après la lecture de la génération 3
+        chain = make_chain([SimpleNamespace(page_content="Ren Shen", metadata={"source": "kb.csv", "generation": 4})])
+
+        list(streamer.stream(chain, "q", [1.0, 0.0], 3))
+
+        cache.store.assert_called_once_with("q", [1.0, 0.0], 4, "Ren", ["kb.csv"])
+
+    def test_ttft_recorded_for_metrics(self):
+        streamer = AnswerStreamer(FakeLLM(["a", "b"]), "{context}|{question}")
+        self.assertEqual(streamer.ttft_stats(), {"count": 0, "p50": None, "p95": None})
+
+        list(streamer.stream(make_chain(), "q1"))
+        list(streamer.stream(make_chain(), "q2"))
+
+        stats = streamer.ttft_stats()
+        self.assertEqual(stats["count"], 2)
+        self.assertGreaterEqual(stats["p95"], stats["p50"])
+        self.assertGreater(stats["p50"], 0)
+
+    def test_no_token_means_no_ttft_sample(self):
+        streamer = AnswerStreamer(FakeLLM([]), "{context}|{question}")
+
+        events = parse(streamer.stream(make_chain(), "q"))
+
+        self.assertEqual(events[-1][0], "done")
+        self.assertIsNone(events[-1][1]["ttft_ms"])
+        self.assertEqual(streamer.ttft_stats()["count"], 0)
+
+    def test_replay_uses_same_events(self):
+        cached = {"answer": "Ren Shen", "sources": ["kb.csv"]}
+
+        events = parse(AnswerStreamer.replay(cached))
+
+        self.assertEqual([e for e, _ in events], ["sources", "token", "done"])
+        self.assertTrue(events[-1][1]["cached"])
+
+    def test_sse_event_format(self):
+        self.assertEqual(sse_event("token", {"text": "é"}), 'event: token\ndata: {"text": "é"}\n\n')
+
+class TestLimitedStream(unittest.IsolatedAsyncioTestCase):
+
+    async def test_releases_after_stream(self):
+        release = MagicMock()
+
+        events = [event async for event in limited_stream(iter(["a", "b"]), release)]
+
+        self.assertEqual(events, ["a", "b"])
+        release.assert_called_once()
+
+class TestSlotStreamingResponse(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.limiter = GenerationLimiter(max_concurrent=1, max_queue=0, queue_timeout=0.05)
+        await self.limiter.acquire()
+        self.release = self.limiter.releaser()
+        self.response = SlotStreamingResponse(
+            limited_stream(iter(["a", "b"]), self.release), self.release, media_type="text/event-stream"
+        )
+
+    async def assert_slot_free(self):
+        self.assertEqual(self.limiter.stats()["active"], 0)
+        # Le créneau est réutilisable : pas de 429 pour la requête suivante
+        await self.limiter.acquire()
+        self.limiter.release()
+
+    async def test_released_after_full_stream(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            await asyncio.Event().wait()
+
+        await self.response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+        self.assertEqual(b"".join(m.get("body", b"") for m in sent), b"ab")
+        await self.assert_slot_free()
+
+    async def test_released_on_disconnect_before_streaming(self):
+        # ASGI < 2.4 : Starlette écoute la déconnexion et annule le flux avant sa première itération
+        async def send(message):
+            await asyncio.sleep(1)
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        await self.response({"type": "http", "asgi": {"spec_version": "2.0"}}, receive, send)
+
+        await self.assert_slot_free()
+
+    async def test_released_when_send_fails(self):
+        # ASGI 2.4 : l'envoi des en-têtes échoue, le flux n'est jamais itéré
+        async def send(message):
+            raise OSError("client parti")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        with self.assertRaises(Exception):
+            await self.response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+        await self.assert_slot_free()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""Benchmark recall@k / latence des modes d'index (flat, IVF-Flat, IVF-PQ, HNSW).
+
+La vérité terrain est la recherche exacte (flat). Les vecteurs viennent soit
+d'un index existant (--from-index), soit d'un tirage synthétique en grappes
+(--vectors), les requêtes étant des vecteurs du corpus légèrement bruités.
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_ann.py --vectors 200000 --k 3
+    python benchmarks/bench_ann.py --from-index vector_store.faiss --queries 200
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+import index_factory
+
+DIMENSION = 384
+
+
+def synthetic_vectors(n, rng):
+    """Vecteurs regroupés autour de centres (plus réaliste qu'un tirage uniforme)"""
+    centers = rng.normal(size=(max(1, n // 500), DIMENSION)).astype('float32')
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.3 * rng.normal(size=(n, DIMENSION)).astype('float32')
+    return vectors.astype('float32')
+
+
+def recall_at_k(ids, truth):
+    hits = sum(len(set(row) & set(expected)) for row, expected in zip(ids, truth))
+    return hits / truth.size
+
+
+def timed_search(index, queries, k):
+    latencies = []
+    all_ids = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        all_ids.append(ids[0])
+    return np.array(all_ids), 1000 * np.percentile(latencies, 50), 1000 * np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--from-index", help="index FAISS existant dont on extrait les vecteurs")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--threads", type=int, default=1, help="threads OpenMP (1 = latence mono-requête)")
+    args = parser.parse_args()
+
+    faiss.omp_set_num_threads(args.threads)
+    rng = np.random.default_rng(0)
+    if args.from_index:
+        vectors = index_factory.extract_vectors(faiss.read_index(args.from_index))
+    else:
+        vectors = synthetic_vectors(args.vectors, rng)
+    n, dimension = vectors.shape
+    queries = vectors[rng.integers(0, n, args.queries)] + 0.05 * rng.normal(size=(args.queries, dimension)).astype('float32')
+
+    flat = index_factory.build_index("flat", dimension)
+    flat.add(vectors)
+    truth, p50, p99 = timed_search(flat, queries, args.k)
+
+    print(f"\n{n} vecteurs, {args.queries} requêtes, k={args.k}")
+    print(f"{'mode':>9} | {'paramètre':>12} | {'build (s)':>9} | {'recall@k':>8} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+    print(f"{'flat':>9} | {'-':>12} | {0:>9.2f} | {1:>8.3f} | {p50:>8.3f} | {p99:>8.3f}")
+
+    for mode in ("ivf_flat", "ivf_pq", "hnsw"):
+        start = time.perf_counter()
+        index = index_factory.migrate_index(flat, mode)
+        build_time = time.perf_counter() - start
+        if index is flat:
+            continue
+
+        settings = [("nprobe", v) for v in args.nprobe] if mode != "hnsw" else [("efSearch", v) for v in args.ef_search]
+        for name, value in settings:
+            index_factory.configure_search(index, nprobe=value, ef_search=value)
+            ids, p50, p99 = timed_search(index, queries, args.k)
+            print(f"{mode:>9} | {f'{name}={value}':>12} | {build_time:>9.2f} | "
+                  f"{recall_at_k(ids, truth):>8.3f} | {p50:>8.3f} | {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark d'ingestion CSV : ligne par ligne vs. lots.
+
+Génère un CSV synthétique (50k lignes par défaut) au format de
+`matrice_plante_syndrome.csv`, puis mesure le débit (lignes/s) de
+`ingest_csv_data` avec des lots de 1 (comportement historique : un
+`encode` + un `index.add` par ligne) et avec des lots plus grands.
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_batch_ingest.py --rows 50000 --batch-sizes 1 64 256
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+SYNDROMES = ["Vide de Qi", "Vide de Yang", "Stase de Sang", "Chaleur du Foie", "Vide de Yin du Rein"]
+PLANTES = [
+    ("Panax ginseng", "人参"), ("Angelica sinensis", "当归"), ("Astragalus membranaceus", "黄芪"),
+    ("Glycyrrhiza uralensis", "甘草"), ("Cordyceps sinensis", "冬虫夏草"),
+]
+
+
+def write_synthetic_csv(path, rows):
+    rng = random.Random(42)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["nom_syndrome", "nom_latin", "nom_chinois", "score_role"])
+        for i in range(rows):
+            latin, chinois = rng.choice(PLANTES)
+            writer.writerow([f"{rng.choice(SYNDROMES)} {i}", latin, chinois, rng.choice([3, 5, 7, 10])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 64, 256])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_ingest_")
+    data_dir = os.path.join(workdir, "synthetic_data")
+    os.makedirs(data_dir)
+    write_synthetic_csv(os.path.join(data_dir, "matrice_synthetique.csv"), args.rows)
+
+    # L'indexeur travaille dans le dossier temporaire ; seul le modèle est chargé
+    os.chdir(workdir)
+    import indexer
+    indexer.load_model()
+
+    print(f"\n{'batch_size':>10} | {'durée (s)':>10} | {'lignes/s':>10}")
+    results = {}
+    for batch_size in args.batch_sizes:
+        indexer.index = indexer.faiss.IndexFlatL2(indexer.dimension)
+        indexer.metadata_store = []
+        indexer.DEFAULT_DATA_DIR = data_dir
+
+        start = time.perf_counter()
+        indexer.ingest_csv_data(batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+
+        assert indexer.index.ntotal == args.rows
+        results[batch_size] = args.rows / elapsed
+        print(f"{batch_size:>10} | {elapsed:>10.2f} | {results[batch_size]:>10.0f}")
+
+    baseline = results.get(1)
+    if baseline:
+        for batch_size, rate in results.items():
+            print(f"   -> batch_size={batch_size}: x{rate / baseline:.1f} vs. ligne par ligne")
+
+
+if __name__ == "__main__":
+    main()
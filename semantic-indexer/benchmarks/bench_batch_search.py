@@ -0,0 +1,73 @@
+"""Benchmark de la recherche par lots : une requête à la fois vs. matrice empilée.
+
+Index FAISS de vecteurs aléatoires (et index lexical sur des textes
+synthétiques de même taille) ; N requêtes cherchées soit une par une
+(`hybrid_search`, un `index.search` chacune), soit en un lot
+(`hybrid_search_batch`, un seul `index.search` sur la matrice (N, d)).
+L'encodage des questions n'est pas compté (une passe du modèle dans les deux cas
+côté API).
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_batch_search.py --vectors 200000 --batch-sizes 1 8 32 128
+    python benchmarks/bench_batch_search.py --mode ivf_flat --search-mode hybrid
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from hybrid_search import SEARCH_MODES, hybrid_search, hybrid_search_batch
+from index_factory import build_index, train_index
+from lexical_index import LexicalIndex
+
+WORDS = ["vide", "qi", "yang", "yin", "sang", "rein", "foie", "rate", "chaleur", "humidité", "stase",
+         "ginseng", "astragalus", "angelica", "glycyrrhiza", "cordyceps", "metformine", "ramipril",
+         "tension", "fatigue", "douleur", "insomnie", "toux", "vertiges", "digestion", "sueurs"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--mode", choices=["flat", "hnsw", "ivf_flat"], default="flat")
+    parser.add_argument("--search-mode", choices=SEARCH_MODES, default="dense")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    words = random.Random(0)
+    vectors = rng.normal(size=(args.vectors, args.dimension)).astype('float32')
+    index = build_index(args.mode, args.dimension, args.vectors)
+    train_index(index, vectors)
+    index.add(vectors)
+    lexical = LexicalIndex()
+    if args.search_mode != "dense":
+        lexical.extend(" ".join(words.choices(WORDS, k=30)) for _ in range(args.vectors))
+    print(f"Index {args.mode} : {args.vectors} vecteurs de dimension {args.dimension}, mode {args.search_mode}\n")
+
+    print(f"{'lot':>5} | {'une à une (ms/req)':>18} | {'lot (ms/req)':>12} | {'gain':>5}")
+    for size in args.batch_sizes:
+        texts = [" ".join(words.choices(WORDS, k=4)) for _ in range(size)]
+        queries = rng.normal(size=(size, args.dimension)).astype('float32')
+        single, batch = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for text, query in zip(texts, queries):
+                hybrid_search(index, lexical, text, query, args.k, mode=args.search_mode)
+            single.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            hybrid_search_batch(index, lexical, texts, queries, args.k, mode=args.search_mode)
+            batch.append(time.perf_counter() - start)
+        single_ms, batch_ms = 1000 * min(single) / size, 1000 * min(batch) / size
+        print(f"{size:>5} | {single_ms:>18.3f} | {batch_ms:>12.3f} | {single_ms / batch_ms:>4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Benchmark du découpage : chunks par document et recall sur un jeu de QA annoté.
+
+Corpus synthétique de comptes-rendus (sections MOTIF, ANTÉCÉDENTS, TRAITEMENT,
+EXAMEN, BIOLOGIE, CONCLUSION) ; chaque question est annotée avec la position
+(char_start, char_end) de la phrase qui contient la réponse.
+
+Mesures par stratégie de découpage :
+  - chunks/doc, tokens moyens et max par chunk (tokenizer du modèle si disponible),
+    part des chunks au-delà de 256 tokens (tronqués par all-MiniLM-L6-v2) ;
+  - réponse intacte : la phrase réponse tient entière dans au moins un chunk ;
+  - recall@k : un des k chunks les plus proches de la question (parmi ceux du
+    dossier, comme une recherche filtrée par patient) contient la réponse entière.
+
+Embeddings : all-MiniLM-L6-v2 si sentence-transformers est installé, sinon
+(ou avec --embedder hashing) un sac de mots haché, purement lexical.
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_chunking.py --docs 200
+    python benchmarks/bench_chunking.py --docs 200 --embedder hashing
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+from chunking import estimate_tokens, make_chunker, model_token_counter
+
+MODEL_MAX_TOKENS = 256
+
+DRUGS = [("metformine", [500, 850, 1000]), ("amlodipine", [5, 10]), ("ramipril", [2.5, 5, 10]),
+         ("atorvastatine", [10, 20, 40]), ("bisoprolol", [1.25, 2.5, 5]), ("lévothyroxine", [50, 75, 100])]
+FREQUENCIES = ["une fois par jour", "matin et soir", "trois fois par jour", "le soir au coucher"]
+EVENTS = ["une appendicectomie", "une fracture du poignet", "un infarctus du myocarde",
+          "une cholécystectomie", "une pneumopathie", "une embolie pulmonaire"]
+ALLERGENS = ["la pénicilline", "l'iode", "l'aspirine", "le latex", "les sulfamides"]
+FILLER = [
+    "Le patient est venu accompagné de son épouse.",
+    "Il ne rapporte pas d'autre plainte particulière.",
+    "L'examen est réalisé dans de bonnes conditions.",
+    "Pas de modification récente du mode de vie.",
+    "Le suivi est assuré par le médecin traitant.",
+    "Les résultats antérieurs sont comparés aux valeurs actuelles.",
+    "Une surveillance clinique régulière est recommandée.",
+    "Le patient comprend les explications données.",
+    "Aucun effet indésirable n'est signalé à ce jour.",
+    "La situation sociale est stable, le patient vit à domicile.",
+    "Les consignes de réévaluation ont été expliquées.",
+    "L'observance thérapeutique semble satisfaisante.",
+]
+
+
+def filler(rng, n):
+    return " ".join(rng.choice(FILLER) for _ in range(n))
+
+
+def make_document(rng):
+    """Compte-rendu synthétique et questions annotées (question, start, end de la réponse)"""
+    drug, doses = rng.choice(DRUGS)
+    dose, frequency = rng.choice(doses), rng.choice(FREQUENCIES)
+    event, year = rng.choice(EVENTS), rng.randint(1990, 2023)
+    systolic, diastolic = rng.randint(105, 170), rng.randint(60, 100)
+    hba1c = round(rng.uniform(5.2, 9.8), 1)
+    allergen = rng.choice(ALLERGENS)
+
+    facts = {
+        "ANTÉCÉDENTS": (f"Le patient a présenté {event} en {year}.",
+                        f"En quelle année le patient a-t-il eu {event} ?"),
+        "TRAITEMENT": (f"{drug.capitalize()} {dose} mg {frequency}.",
+                       f"Quelle est la posologie de {drug} ?"),
+        "EXAMEN CLINIQUE": (f"Tension artérielle mesurée à {systolic}/{diastolic} mmHg.",
+                            "Quelle est la tension artérielle mesurée ?"),
+        "BIOLOGIE": (f"HbA1c à {hba1c} % sur le dernier bilan.",
+                     "Quel est le taux d'HbA1c ?"),
+        "ALLERGIES": (f"Allergie connue à {allergen}.",
+                      "Le patient a-t-il une allergie connue ?"),
+    }
+
+    parts, questions, position = [], [], 0
+
+    def emit(piece):
+        nonlocal position
+        parts.append(piece)
+        position += len(piece)
+
+    emit(f"COMPTE RENDU DE CONSULTATION\n\nMOTIF :\n{filler(rng, rng.randint(2, 5))}\n\n")
+    for section, (answer, question) in facts.items():
+        emit(f"{section} :\n{filler(rng, rng.randint(1, 6))} ")
+        questions.append((question, position, position + len(answer)))
+        emit(f"{answer} {filler(rng, rng.randint(1, 6))}\n\n")
+    emit(f"CONCLUSION :\n{filler(rng, rng.randint(2, 4))}")
+    return "".join(parts), questions
+
+
+class HashingEmbedder:
+    """Sac de mots et trigrammes de caractères hachés (repli sans modèle, lexical)"""
+
+    def __init__(self, dimension=4096):
+        self.dimension = dimension
+
+    def encode(self, texts, **_):
+        vectors = np.zeros((len(texts), self.dimension), dtype='float32')
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            features = words + [w[i:i + 3] for w in words for i in range(max(1, len(w) - 2))]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest()
+                vectors[row, int.from_bytes(digest, "little") % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+def load_embedder(name):
+    if name in ("auto", "minilm"):
+        try:
+            from sentence_transformers import SentenceTransformer
+            return "all-MiniLM-L6-v2", SentenceTransformer('all-MiniLM-L6-v2')
+        except ImportError:
+            if name == "minilm":
+                raise
+            print("sentence-transformers absent : embeddings hachés (lexicaux)\n")
+    return "hashing", HashingEmbedder()
+
+
+def evaluate(chunker, corpus, embedder, count_tokens, ks):
+    start = time.perf_counter()
+    chunked = [chunker.split(text) for text, _ in corpus]
+    split_ms = 1000 * (time.perf_counter() - start) / len(corpus)
+
+    all_chunks = [chunk for chunks in chunked for chunk in chunks]
+    token_counts = [count_tokens(chunk.text) for chunk in all_chunks]
+    chunk_vectors = np.asarray(embedder.encode([c.text for c in all_chunks]), dtype='float32')
+    questions = [q for _, qs in corpus for q in qs]
+    question_vectors = np.asarray(embedder.encode([q for q, _, _ in questions]), dtype='float32')
+
+    intact, hits = 0, {k: 0 for k in ks}
+    first, q = 0, 0
+    for chunks, (_, doc_questions) in zip(chunked, corpus):
+        vectors = chunk_vectors[first:first + len(chunks)]
+        for _, answer_start, answer_end in doc_questions:
+            contains = [c.start <= answer_start and answer_end <= c.end for c in chunks]
+            intact += any(contains)
+            ranking = np.argsort(-(vectors @ question_vectors[q]))
+            for k in ks:
+                hits[k] += any(contains[i] for i in ranking[:k])
+            q += 1
+        first += len(chunks)
+
+    return {
+        "chunks_per_doc": len(all_chunks) / len(corpus),
+        "mean_tokens": float(np.mean(token_counts)),
+        "max_tokens": int(np.max(token_counts)),
+        "truncated": sum(t > MODEL_MAX_TOKENS for t in token_counts) / len(all_chunks),
+        "intact": intact / len(questions),
+        "recall": {k: hits[k] / len(questions) for k in ks},
+        "split_ms": split_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--embedder", choices=["auto", "minilm", "hashing"], default="auto")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [make_document(rng) for _ in range(args.docs)]
+    embedder_name, embedder = load_embedder(args.embedder)
+    count_tokens = model_token_counter(embedder) if embedder_name != "hashing" else estimate_tokens
+    n_questions = sum(len(qs) for _, qs in corpus)
+    print(f"{args.docs} documents ({sum(len(t) for t, _ in corpus) // args.docs} car. en moyenne), "
+          f"{n_questions} questions, embeddings {embedder_name}\n")
+
+    strategies = [
+        ("fixed 500 car.", make_chunker("fixed", chunk_chars=500)),
+        ("structured 200/40", make_chunker("structured", max_tokens=200, overlap_tokens=40, count_tokens=count_tokens)),
+        ("structured 128/32", make_chunker("structured", max_tokens=128, overlap_tokens=32, count_tokens=count_tokens)),
+        ("structured 64/16", make_chunker("structured", max_tokens=64, overlap_tokens=16, count_tokens=count_tokens)),
+    ]
+    recall_header = " | ".join(f"{f'recall@{k}':>9}" for k in args.k)
+    print(f"{'stratégie':>18} | {'chunks/doc':>10} | {'tokens moy':>10} | {'max':>5} | "
+          f"{'>256 tok':>8} | {'intacte':>7} | {recall_header} | {'découpe ms/doc':>14}")
+    for name, chunker in strategies:
+        r = evaluate(chunker, corpus, embedder, count_tokens, args.k)
+        recalls = " | ".join(f"{r['recall'][k]:>9.3f}" for k in args.k)
+        print(f"{name:>18} | {r['chunks_per_doc']:>10.1f} | {r['mean_tokens']:>10.1f} | {r['max_tokens']:>5} | "
+              f"{r['truncated']:>8.1%} | {r['intact']:>7.1%} | {recalls} | {r['split_ms']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark de la recherche restreinte à un patient.
+
+Vecteurs aléatoires répartis entre N patients ; pour chaque requête, les k
+plus proches voisins parmi les chunks d'un patient :
+
+  - post-filtre : recherche globale (k × facteur) puis filtrage par patient,
+    ce que ferait un client sans pré-filtre (recall incomplet) ;
+  - sélecteur : IDSelectorBatch sur les ids du patient ;
+  - exact : relecture des seuls vecteurs du patient (reconstruct_batch).
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_filtered_search.py --vectors 200000 --patients 2000
+    python benchmarks/bench_filtered_search.py --mode ivf_flat
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from filtered_search import MetadataFilterIndex, filtered_search
+from index_factory import build_index, train_index
+
+
+def timed(queries, search):
+    start = time.perf_counter()
+    results = [search(patient, query) for patient, query in queries]
+    return 1000 * (time.perf_counter() - start) / len(queries), results
+
+
+def recall(results, truth):
+    return np.mean([len(set(r) & set(t)) / len(t) for r, t in zip(results, truth)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--mode", choices=["flat", "hnsw", "ivf_flat"], default="flat")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--overfetch", type=int, default=20, help="facteur k du post-filtre")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(args.vectors, args.dimension)).astype('float32')
+    patients = rng.integers(args.patients, size=args.vectors)
+
+    start = time.perf_counter()
+    index = build_index(args.mode, args.dimension, args.vectors)
+    train_index(index, vectors)
+    index.add(vectors)
+    print(f"Index {args.mode} : {args.vectors} vecteurs, {args.patients} patients "
+          f"({args.vectors // args.patients} chunks/patient), construit en {time.perf_counter() - start:.1f} s")
+
+    start = time.perf_counter()
+    filters = MetadataFilterIndex()
+    filters.extend([f"P{p}" for p in patients], ["CR"] * args.vectors, ["2024-01-01"] * args.vectors)
+    print(f"Filtres : {1000 * (time.perf_counter() - start):.0f} ms\n")
+
+    queries = [(f"P{p}", rng.normal(size=args.dimension).astype('float32'))
+               for p in rng.integers(args.patients, size=args.queries)]
+    truth = []
+    for patient, query in queries:
+        ids = filters.candidates(patient_id=patient)
+        truth.append(ids[np.argsort(((vectors[ids] - query) ** 2).sum(axis=1))[:args.k]].tolist())
+
+    def post_filter(patient, query):
+        _, labels = index.search(query.reshape(1, -1), args.k * args.overfetch)
+        return [i for i in labels[0] if i >= 0 and patients[i] == int(patient[1:])][:args.k]
+
+    strategies = [
+        (f"post-filtre ×{args.overfetch}", post_filter),
+        ("sélecteur", lambda p, q: filtered_search(index, q, filters.candidates(patient_id=p), args.k,
+                                                   exact_max_candidates=0)[1].tolist()),
+        ("exact", lambda p, q: filtered_search(index, q, filters.candidates(patient_id=p), args.k,
+                                               exact_max_candidates=args.vectors)[1].tolist()),
+    ]
+    print(f"{'stratégie':>16} | {'ms/requête':>10} | {f'recall@{args.k}':>9}")
+    for name, search in strategies:
+        if name == "exact" and args.mode == "ivf_flat":
+            continue
+        ms, results = timed(queries, search)
+        print(f"{name:>16} | {ms:>10.2f} | {recall(results, truth):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Benchmark du store de métadonnées : pickle vs. store colonnaire (mmap).
+
+Génère N chunks (1M par défaut, ~500 caractères chacun), les écrit dans les
+deux formats, puis mesure dans un processus neuf pour chaque format :
+temps d'ouverture, mémoire résidente maximale et temps de lecture de
+quelques chunks au hasard (simulation d'une requête de retrieval).
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_metadata_store.py --chunks 1000000
+"""
+import argparse
+import os
+import pickle
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+from columnar_store import ColumnarMetadataStore
+
+LOOKUPS = 100
+
+
+def make_records(n):
+    filler = "Patient suivi pour vide de Qi de la Rate, fatigue chronique et inappétence. " * 7
+    for i in range(n):
+        yield {
+            "doc_id": str(i // 20),
+            "text_content": f"[{i}] {filler[:480]}",
+            "source": f"Dossier Patient {i // 20}",
+            "type": "patient_file"
+        }
+
+
+def rss_mb():
+    """(mémoire anonyme, pages de fichiers mappées) en Mo, d'après /proc (Linux).
+
+    Les pages mappées du store colonnaire restent dans le cache disque partagé
+    et sont récupérables par le noyau : seule la mémoire anonyme est propre au
+    processus. Hors Linux, on retombe sur le pic global de getrusage.
+    """
+    values = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    values[line.split(":")[0]] = int(line.split()[1]) / 1024
+        return values["RssAnon"], values["RssFile"]
+    except (OSError, KeyError):
+        # ru_maxrss est en Ko sous Linux, en octets sous macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 0.0
+
+
+def load(kind, path, n):
+    """Exécuté dans un processus fils : ouvre le store et lit quelques chunks"""
+    anon_before, file_before = rss_mb()
+    start = time.perf_counter()
+    if kind == "pickle":
+        with open(path, 'rb') as f:
+            store = pickle.load(f)
+    else:
+        store = ColumnarMetadataStore(path, readonly=True)
+    load_time = time.perf_counter() - start
+
+    ids = random.Random(0).sample(range(n), LOOKUPS)
+    start = time.perf_counter()
+    for i in ids:
+        store[i]["text_content"]
+    lookup_time = (time.perf_counter() - start) / LOOKUPS
+    anon_after, file_after = rss_mb()
+    print(f"{load_time:.3f} {anon_after - anon_before:.1f} {file_after - file_before:.1f} {lookup_time * 1e6:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--load", choices=["pickle", "columnar"], help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load(args.load, args.path, args.chunks)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="bench_meta_")
+    try:
+        pickle_path = os.path.join(workdir, "metadata_store.pkl")
+        columnar_path = os.path.join(workdir, "metadata_store")
+        print(f"Génération de {args.chunks} chunks...")
+        records = list(make_records(args.chunks))
+        with open(pickle_path, 'wb') as f:
+            pickle.dump(records, f)
+        ColumnarMetadataStore.from_records(columnar_path, records).close()
+        del records
+
+        print(f"\n{'format':>9} | {'disque (Mo)':>11} | {'chargement (s)':>14} | "
+              f"{'RSS anon (Mo)':>13} | {'RSS mmap (Mo)':>13} | {'lecture (µs)':>12}")
+        for kind, path in (("pickle", pickle_path), ("columnar", columnar_path)):
+            size = os.path.getsize(path) if kind == "pickle" else sum(
+                os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+            out = subprocess.run(
+                [sys.executable, __file__, "--load", kind, "--path", path, "--chunks", str(args.chunks)],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            load_time, anon, mapped, lookup = (float(v) for v in out)
+            print(f"{kind:>9} | {size / 2**20:>11.1f} | {load_time:>14.3f} | "
+                  f"{anon:>13.1f} | {mapped:>13.1f} | {lookup:>12.1f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
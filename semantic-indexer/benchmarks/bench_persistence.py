@@ -0,0 +1,87 @@
+"""Benchmark du coût de persistance par message.
+
+Compare, à mesure que le corpus grossit, l'ancienne persistance
+(`faiss.write_index` + pickle complet des métadonnées après chaque
+document) et l'ajout d'un enregistrement au journal append-only.
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/bench_persistence.py --corpus-sizes 10000 100000 500000
+"""
+import argparse
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+from wal import SegmentedWAL
+
+DIMENSION = 384
+CHUNKS_PER_MESSAGE = 10
+
+
+def fake_metadatas(n, start):
+    return [{
+        "doc_id": "BENCH",
+        "text_content": f"Chunk patient {start + i} " + "x" * 450,
+        "source": "Dossier Patient BENCH",
+        "type": "patient_file"
+    } for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[10000, 100000, 300000])
+    parser.add_argument("--messages", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    workdir = tempfile.mkdtemp(prefix="bench_persist_")
+    print(f"\n{'corpus':>8} | {'save_state (ms/msg)':>20} | {'journal (ms/msg)':>17}")
+    try:
+        for size in args.corpus_sizes:
+            index = faiss.IndexFlatL2(DIMENSION)
+            index.add(rng.random((size, DIMENSION), dtype='float32'))
+            metadata_store = fake_metadatas(size, 0)
+            wal = SegmentedWAL(os.path.join(workdir, f"wal_{size}"))
+
+            messages = [
+                (rng.random((CHUNKS_PER_MESSAGE, DIMENSION), dtype='float32'),
+                 fake_metadatas(CHUNKS_PER_MESSAGE, size + i * CHUNKS_PER_MESSAGE))
+                for i in range(args.messages)
+            ]
+
+            # Deux passes séparées : l'écriture de l'index complet laisse beaucoup de
+            # pages sales qui fausseraient le fsync du journal
+            wal_times = []
+            for i, (vectors, metadatas) in enumerate(messages):
+                start = time.perf_counter()
+                wal.append(size + i * CHUNKS_PER_MESSAGE, vectors, metadatas)
+                wal_times.append(time.perf_counter() - start)
+
+            full_times = []
+            for vectors, metadatas in messages:
+                index.add(vectors)
+                metadata_store.extend(metadatas)
+
+                start = time.perf_counter()
+                faiss.write_index(index, os.path.join(workdir, "vector_store.faiss"))
+                with open(os.path.join(workdir, "metadata_store.pkl"), 'wb') as f:
+                    pickle.dump(metadata_store, f)
+                full_times.append(time.perf_counter() - start)
+
+            wal.close()
+            print(f"{size:>8} | {1000 * np.median(full_times):>20.1f} | {1000 * np.median(wal_times):>17.2f}")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
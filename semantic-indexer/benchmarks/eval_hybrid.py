@@ -0,0 +1,120 @@
+"""Évaluation de la recherche : dense seule, lexicale seule (BM25) et hybride (RRF).
+
+Corpus : les chunks de la base de connaissances MTC du store publié
+(metadata_store/ par défaut). Questions générées à partir de ces chunks, avec
+leurs chunks pertinents (même syndrome, et même plante si elle est citée) :
+
+  - score   "Quel est le score de pertinence de <nom latin> pour <syndrome> ?"
+  - rôle    "Quel rôle joue <nom latin> dans le traitement de <syndrome> ?"
+  - plantes "Quelles plantes recommander en cas de <syndrome> ?"
+
+recall@k : part des questions dont un chunk pertinent figure dans les k premiers
+résultats. Latence : recherche seule (encodage de la question mesuré à part).
+--distractors ajoute des comptes-rendus synthétiques découpés (ceux de
+bench_chunking) pour mesurer la latence sur un corpus plus grand.
+
+Embeddings : all-MiniLM-L6-v2 si sentence-transformers est installé, sinon
+(ou avec --embedder hashing) le sac de mots haché de bench_chunking, lexical :
+les écarts dense / hybride ne sont alors pas représentatifs.
+
+Usage (depuis semantic-indexer/) :
+    python benchmarks/eval_hybrid.py --questions 300 --k 1 3 5
+    python benchmarks/eval_hybrid.py --distractors 5000 --embedder hashing
+    python benchmarks/eval_hybrid.py --store /chemin/vers/metadata_store --embedder minilm
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from collections import defaultdict
+
+import faiss
+import numpy as np
+
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, SERVICE_DIR)
+
+from bench_chunking import load_embedder, make_document
+from chunking import make_chunker
+from columnar_store import ColumnarMetadataStore
+from hybrid_search import SEARCH_MODES, hybrid_search
+from lexical_index import LexicalIndex
+
+SYNDROME = re.compile(r"Syndrome '([^']+)'")
+PLANT = re.compile(r"Plante(?: recommandée)? : ([A-Z][a-z]+ [a-z-]+)")
+
+
+def make_questions(texts, rng, n):
+    """[(question, {ids pertinents})] tirées des chunks de la base de connaissances"""
+    by_syndrome, by_pair = defaultdict(set), defaultdict(set)
+    for i, text in enumerate(texts):
+        syndrome, plant = SYNDROME.search(text), PLANT.search(text)
+        if syndrome:
+            by_syndrome[syndrome.group(1)].add(i)
+            if plant:
+                by_pair[(syndrome.group(1), plant.group(1))].add(i)
+
+    questions = []
+    for (syndrome, plant), ids in by_pair.items():
+        questions.append((f"Quel est le score de pertinence de {plant} pour {syndrome} ?", ids))
+        questions.append((f"Quel rôle joue {plant} dans le traitement de {syndrome} ?", ids))
+    for syndrome, ids in by_syndrome.items():
+        questions.append((f"Quelles plantes recommander en cas de {syndrome} ?", ids))
+    rng.shuffle(questions)
+    return questions[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default=os.path.join(SERVICE_DIR, "metadata_store"))
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--embedder", choices=["auto", "minilm", "hashing"], default="auto")
+    parser.add_argument("--distractors", type=int, default=0, help="comptes-rendus synthétiques ajoutés")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    store = ColumnarMetadataStore(args.store, readonly=True)
+    texts = [store.text(i) for i in range(store.count)]
+    rng = random.Random(args.seed)
+    questions = make_questions(texts, rng, args.questions)
+    if not questions:
+        sys.exit(f"Aucun chunk de base de connaissances dans {args.store}")
+    chunker = make_chunker("structured")
+    for _ in range(args.distractors):
+        texts.extend(chunk.text for chunk in chunker.split(make_document(rng)[0]))
+
+    embedder_name, embedder = load_embedder(args.embedder)
+    start = time.perf_counter()
+    vectors = np.asarray(embedder.encode(texts), dtype='float32')
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    lexical = LexicalIndex()
+    lexical.extend(texts)
+    print(f"{len(texts)} chunks, {len(questions)} questions, embeddings {embedder_name} "
+          f"(index construits en {time.perf_counter() - start:.1f} s, {lexical.stats()['terms']} termes)\n")
+
+    start = time.perf_counter()
+    query_vectors = np.asarray(embedder.encode([q for q, _ in questions]), dtype='float32')
+    encode_ms = 1000 * (time.perf_counter() - start) / len(questions)
+
+    depth = max(args.k)
+    recall_header = " | ".join(f"{f'recall@{k}':>9}" for k in args.k)
+    print(f"{'mode':>8} | {recall_header} | {'ms/requête':>10}")
+    for mode in SEARCH_MODES:
+        hits = {k: 0 for k in args.k}
+        start = time.perf_counter()
+        for (question, relevant), query_vector in zip(questions, query_vectors):
+            _, ids = hybrid_search(index, lexical, question, query_vector, depth, mode=mode)
+            for k in args.k:
+                hits[k] += any(int(i) in relevant for i in ids[:k])
+        latency_ms = 1000 * (time.perf_counter() - start) / len(questions)
+        recalls = " | ".join(f"{hits[k] / len(questions):>9.3f}" for k in args.k)
+        print(f"{mode:>8} | {recalls} | {latency_ms:>10.3f}")
+    print(f"\nEncodage des questions : {encode_ms:.2f} ms/question (modes dense et hybride)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Découpage des textes patients en chunks avant vectorisation.
+
+Deux stratégies (variable CHUNKER) :
+
+    fixed       tranches de N caractères (comportement historique)
+    structured  phrases regroupées dans la limite de `max_tokens`, sans
+                jamais franchir une section (titre "ANTÉCÉDENTS :", "# ...",
+                ligne en majuscules), avec un recouvrement de `overlap_tokens`
+                entre chunks consécutifs d'une même section
+
+Chaque chunk est une tranche contiguë du texte d'origine : `text[start:end]`.
+La limite se compte en tokens du tokenizer du modèle d'embedding
+(all-MiniLM-L6-v2 tronque silencieusement au-delà de 256 wordpieces).
+"""
+import os
+import re
+from collections import namedtuple
+
+CHUNKER = os.getenv("CHUNKER", "structured")
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+FIXED_CHUNK_CHARS = int(os.getenv("FIXED_CHUNK_CHARS", "500"))
+
+Chunk = namedtuple("Chunk", "text start end")
+
+# Fin de phrase : ponctuation forte suivie d'un blanc, ou saut de ligne
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+|\n+")
+# Titre de section : "# Titre", "TITRE EN MAJUSCULES", "Antécédents :" seul sur sa ligne
+_HEADING = re.compile(r"^\s*(?:#{1,6}\s+\S.*|[A-ZÀ-Ý0-9][A-ZÀ-Ý0-9 '’/&-]{2,}:?|[^\n.:]{2,60}:)\s*$")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Approximation sans tokenizer : mots et signes de ponctuation"""
+    return len(_TOKEN.findall(text))
+
+
+def model_token_counter(embedding_model):
+    """Compte en tokens du modèle (SentenceTransformer) ; estimation si pas de tokenizer"""
+    tokenizer = getattr(embedding_model, "tokenizer", None)
+    if tokenizer is None:
+        return estimate_tokens
+    return lambda text: len(tokenizer.tokenize(text))
+
+
+def _strip_span(text, start, end):
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def sections(text):
+    """(start, end) des sections : une section commence à chaque titre ou paragraphe"""
+    bounds = {0}
+    for match in _PARAGRAPH_BREAK.finditer(text):
+        bounds.add(match.end())
+    position = 0
+    for line in text.splitlines(keepends=True):
+        if _HEADING.match(line):
+            bounds.add(position)
+        position += len(line)
+    bounds = sorted(bounds) + [len(text)]
+    heading_start = None
+    for start, end in zip(bounds, bounds[1:]):
+        start, end = _strip_span(text, start, end)
+        if start >= end:
+            continue
+        # Un titre isolé (suivi d'un saut de paragraphe) est rattaché à la section suivante
+        if "\n" not in text[start:end] and _HEADING.match(text[start:end]):
+            heading_start = start if heading_start is None else heading_start
+            continue
+        yield (start if heading_start is None else heading_start), end
+        heading_start = None
+    if heading_start is not None:
+        yield heading_start, _strip_span(text, heading_start, len(text))[1]
+
+
+def sentences(text, start, end):
+    """(start, end) des phrases de text[start:end]"""
+    position = start
+    for match in _SENTENCE_END.finditer(text, start, end):
+        span = _strip_span(text, position, match.start())
+        if span[0] < span[1]:
+            yield span
+        position = match.end()
+    span = _strip_span(text, position, end)
+    if span[0] < span[1]:
+        yield span
+
+
+class FixedSizeChunker:
+    """Tranches de `chunk_chars` caractères (découpage historique, gardé pour comparaison)"""
+
+    def __init__(self, chunk_chars=FIXED_CHUNK_CHARS, **_):
+        self.chunk_chars = chunk_chars
+
+    def split(self, text):
+        return [
+            Chunk(text[i:i + self.chunk_chars], i, min(i + self.chunk_chars, len(text)))
+            for i in range(0, len(text), self.chunk_chars)
+        ]
+
+
+class StructuredChunker:
+    """Phrases regroupées par section, dans la limite de `max_tokens`, avec recouvrement"""
+
+    def __init__(self, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                 count_tokens=estimate_tokens, **_):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens doit être inférieur à max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens
+
+    def _units(self, text, start, end):
+        """Phrases de la section, une phrase trop longue étant recoupée sur les blancs"""
+        for sentence_start, sentence_end in sentences(text, start, end):
+            if self.count_tokens(text[sentence_start:sentence_end]) <= self.max_tokens:
+                yield sentence_start, sentence_end
+                continue
+            piece_start = sentence_start
+            for word in re.finditer(r"\S+", text[sentence_start:sentence_end]):
+                word_end = sentence_start + word.end()
+                if self.count_tokens(text[piece_start:word_end]) > self.max_tokens and piece_start < sentence_start + word.start():
+                    yield _strip_span(text, piece_start, sentence_start + word.start())
+                    piece_start = sentence_start + word.start()
+            yield piece_start, sentence_end
+
+    def split(self, text):
+        chunks = []
+        for section_start, section_end in sections(text):
+            window = []  # (start, end, tokens) des phrases du chunk en cours
+            tokens = 0
+            for start, end in self._units(text, section_start, section_end):
+                unit_tokens = self.count_tokens(text[start:end])
+                if window and tokens + unit_tokens > self.max_tokens:
+                    chunks.append(Chunk(text[window[0][0]:window[-1][1]], window[0][0], window[-1][1]))
+                    # Recouvrement : dernières phrases du chunk précédent, dans la limite du budget
+                    carried = []
+                    carried_tokens = 0
+                    for previous in reversed(window):
+                        if carried_tokens + previous[2] > self.overlap_tokens or \
+                                carried_tokens + previous[2] + unit_tokens > self.max_tokens:
+                            break
+                        carried.insert(0, previous)
+                        carried_tokens += previous[2]
+                    window, tokens = carried, carried_tokens
+                window.append((start, end, unit_tokens))
+                tokens += unit_tokens
+            if window:
+                chunks.append(Chunk(text[window[0][0]:window[-1][1]], window[0][0], window[-1][1]))
+        return chunks
+
+
+CHUNKERS = {"fixed": FixedSizeChunker, "structured": StructuredChunker}
+
+
+def make_chunker(name=CHUNKER, **options):
+    if name not in CHUNKERS:
+        raise ValueError(f"Chunker inconnu : {name} (choix : {', '.join(CHUNKERS)})")
+    return CHUNKERS[name](**options)
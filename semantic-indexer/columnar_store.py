@@ -0,0 +1,267 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+# Format sur disque (un dossier) :
+#   store.json   : {"version", "count", "columns"} -> `count` est le point de commit
+#   offsets.u64  : count + 1 offsets (uint64 little-endian) dans text.bin
+#   text.bin     : textes des chunks concaténés (utf-8)
+#   <col>.col    : une colonne à largeur fixe par champ (bytes, complétés par des \0)
+# Les fichiers ne font que grandir : un lecteur qui s'arrête à `count` voit
+# toujours un état cohérent, même pendant un ajout.
+STORE_VERSION = 1
+MANIFEST_FILE = "store.json"
+OFFSETS_FILE = "offsets.u64"
+TEXT_FILE = "text.bin"
+TEXT_FIELD = "text_content"
+COLUMN_WIDTHS = {
+    "doc_id": 32, "source": 64, "type": 16,
+    "chunk_index": 10, "char_start": 12, "char_end": 12,
+    "patient_id": 64, "doc_type": 32, "date": 10,
+}
+# Colonnes absentes des records qui n'en ont pas (lignes CSV de la base de
+# connaissances, stores créés avant ces colonnes) :
+# position du chunk dans son document (entiers)...
+POSITION_COLUMNS = ("chunk_index", "char_start", "char_end")
+# ... et filtres de la recherche par patient (patient, type de document, date ISO)
+FILTER_COLUMNS = ("patient_id", "doc_type", "date")
+# Clés de filtre et d'identification : tronquées, elles désigneraient un autre
+# document ou patient. Les autres colonnes (source, type) sont descriptives.
+KEY_COLUMNS = ("doc_id",) + FILTER_COLUMNS
+
+
+def _encode(value):
+    return str(value if value is not None else "").encode("utf-8")
+
+
+def oversized_fields(record):
+    """Colonnes du record dont la valeur dépasse la largeur (en octets utf-8)"""
+    return [name for name, width in COLUMN_WIDTHS.items() if len(_encode(record.get(name))) > width]
+
+
+def check_record(record):
+    """ValueError si une clé (doc_id, patient_id...) ne tient pas dans sa colonne"""
+    too_long = [name for name in oversized_fields(record) if name in KEY_COLUMNS]
+    if too_long:
+        raise ValueError("Valeur trop longue pour le store colonnaire : " + ", ".join(
+            f"{name} ({len(_encode(record.get(name)))} octets > {COLUMN_WIDTHS[name]})" for name in too_long
+        ))
+
+
+def _fit(value, width, name=None):
+    """Encode une valeur en utf-8 tronqué à `width` octets sans couper un caractère"""
+    raw = _encode(value)
+    if len(raw) > width:
+        print(f"⚠️ Colonne {name} : valeur de {len(raw)} octets tronquée à {width}")
+    return raw[:width].decode("utf-8", "ignore").encode("utf-8")
+
+
+class ColumnarMetadataStore:
+    """Métadonnées des chunks en colonnes, ouvertes en mmap.
+
+    Se comporte comme la liste de dicts historique (`len`, `[i]`, itération,
+    `append`/`extend`, `del store[n:]`) mais le texte d'un chunk n'est lu sur
+    disque qu'au moment où on y accède. Les ajouts restent en mémoire jusqu'à
+    `flush()`, qui les écrit en fin de fichiers.
+    """
+
+    def __init__(self, directory, readonly=False):
+        self.directory = directory
+        self.readonly = readonly
+        self.columns = dict(COLUMN_WIDTHS)
+        self.count = 0
+        self._pending = []
+        self._text_file = None
+        self._text = None
+        self.reload()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    # ---------- LECTURE ----------
+
+    def reload(self):
+        """Relit le manifeste et re-mappe les fichiers (nouveaux chunks visibles)"""
+        manifest_path = self._path(MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("version") != STORE_VERSION:
+                raise ValueError(f"Version de store non supportée : {manifest.get('version')}")
+            self.count = manifest["count"]
+            self.columns = manifest["columns"]
+            if not self.readonly and set(COLUMN_WIDTHS) - set(self.columns):
+                self._add_columns()
+        self._map()
+
+    def _add_columns(self):
+        """Migration : colonnes apparues depuis la création du store, vides pour les chunks existants"""
+        for name, width in COLUMN_WIDTHS.items():
+            if name not in self.columns:
+                with open(self._path(f"{name}.col"), "wb") as f:
+                    f.truncate(self.count * width)
+                self.columns[name] = width
+        self._write_manifest(self.count)
+
+    def _map(self):
+        self._unmap()
+        if self.count == 0:
+            self._offsets = np.zeros(1, dtype='<u8')
+            self._columns = {name: np.zeros(0, dtype=f'S{w}') for name, w in self.columns.items()}
+            return
+
+        self._offsets = np.memmap(self._path(OFFSETS_FILE), dtype='<u8', mode='r', shape=(self.count + 1,))
+        self._columns = {
+            name: np.memmap(self._path(f"{name}.col"), dtype=f'S{width}', mode='r', shape=(self.count,))
+            for name, width in self.columns.items()
+        }
+        if self._offsets[self.count] > 0:
+            self._text_file = open(self._path(TEXT_FILE), "rb")
+            self._text = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self):
+        if self._text is not None:
+            self._text.close()
+            self._text = None
+        if self._text_file is not None:
+            self._text_file.close()
+            self._text_file = None
+        self._offsets = None
+        self._columns = {}
+
+    def __len__(self):
+        return self.count + len(self._pending)
+
+    def text(self, i):
+        """Texte du chunk i (seul accès au blob de texte)"""
+        if i >= self.count:
+            return self._pending[i - self.count][TEXT_FIELD]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._text[start:end].decode("utf-8") if end > start else ""
+
+    def field(self, name, i):
+        if i >= self.count:
+            value = self._pending[i - self.count].get(name)
+            return "" if value is None else str(value)
+        if name not in self._columns:
+            return ""  # store ouvert en lecture seule, antérieur à la colonne
+        return self._columns[name][i].decode("utf-8")
+
+    def column(self, name, start=0):
+        """Valeurs d'une colonne pour les chunks commités [start, count), en une lecture"""
+        if name not in self._columns:
+            return [""] * max(self.count - start, 0)
+        return [value.decode("utf-8") for value in self._columns[name][start:self.count]]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        record = {}
+        for name in self.columns:
+            value = self.field(name, i)
+            if name in POSITION_COLUMNS:
+                if value:
+                    record[name] = int(value)
+            elif name not in FILTER_COLUMNS or value:
+                record[name] = value
+        record[TEXT_FIELD] = self.text(i)
+        return record
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    # ---------- ÉCRITURE ----------
+
+    def append(self, record):
+        self._pending.append(record)
+
+    def extend(self, records):
+        self._pending.extend(records)
+
+    def __delitem__(self, key):
+        # Seule forme supportée : del store[n:] (troncature)
+        if not isinstance(key, slice) or key.stop is not None or key.step is not None:
+            raise TypeError("Seule la troncature `del store[n:]` est supportée")
+        self.truncate(key.start or 0)
+
+    def flush(self):
+        """Écrit les chunks en attente en fin de fichiers puis commite le nouveau `count`"""
+        if self.readonly:
+            raise PermissionError("Store ouvert en lecture seule")
+        if not self._pending:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = int(self._offsets[self.count])
+        # Supprime une éventuelle fin non commitée (crash pendant un flush précédent)
+        self._truncate_files(self.count)
+
+        blobs = [str(r.get(TEXT_FIELD, "")).encode("utf-8") for r in self._pending]
+        offsets = base + np.cumsum([len(b) for b in blobs], dtype='<u8')
+        if self.count == 0:
+            offsets = np.concatenate([np.zeros(1, dtype='<u8'), offsets])
+
+        self._append_file(TEXT_FILE, b"".join(blobs))
+        self._append_file(OFFSETS_FILE, offsets.astype('<u8').tobytes())
+        for name, width in self.columns.items():
+            column = np.array([_fit(r.get(name), width, name) for r in self._pending], dtype=f'S{width}')
+            self._append_file(f"{name}.col", column.tobytes())
+
+        self._write_manifest(self.count + len(self._pending))
+        self._pending = []
+        self._map()
+
+    def truncate(self, n):
+        """Ramène le store à ses n premiers chunks"""
+        if n >= len(self):
+            return
+        if n >= self.count:
+            del self._pending[n - self.count:]
+            return
+        self._pending = []
+        self._write_manifest(n)
+        self._truncate_files(n)
+        self._map()
+
+    def _append_file(self, name, data):
+        with open(self._path(name), "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _truncate_files(self, n):
+        text_size = int(self._offsets[n]) if n <= self.count else 0
+        sizes = {TEXT_FILE: text_size, OFFSETS_FILE: (n + 1) * 8 if n > 0 else 0}
+        sizes.update({f"{name}.col": n * width for name, width in self.columns.items()})
+        self._unmap()
+        for name, size in sizes.items():
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _write_manifest(self, count):
+        tmp_path = self._path(MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": STORE_VERSION, "count": count, "columns": self.columns}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(MANIFEST_FILE))
+        self.count = count
+
+    def close(self):
+        self._unmap()
+
+    @classmethod
+    def from_records(cls, directory, records):
+        """Construit un store à partir d'une liste de dicts (migration du pickle)"""
+        store = cls(directory)
+        store.truncate(0)
+        store.extend(records)
+        store.flush()
+        return store
@@ -0,0 +1,151 @@
+"""Recherche k-NN restreinte par métadonnées (patient, type de document, date).
+
+Les filtres sont résolus d'abord, sur des listes inversées d'ids FAISS ; la
+recherche ne porte ensuite que sur les ids retenus :
+
+  - peu de candidats (cas d'un patient) et vecteurs relisibles (flat, HNSW) :
+    seuls les vecteurs des candidats sont relus (`reconstruct_batch`, pages du
+    mmap correspondantes) et comparés exactement à la requête ;
+  - sinon : recherche FAISS avec un `IDSelectorBatch` (paramètres IVF / HNSW
+    conservés, listes IVF élargies si le filtre laisse moins de k résultats).
+"""
+import bisect
+import os
+from collections import defaultdict
+
+import faiss
+import numpy as np
+
+from columnar_store import FILTER_COLUMNS
+from index_factory import index_mode
+
+EXACT_SEARCH_MAX_CANDIDATES = int(os.getenv("EXACT_SEARCH_MAX_CANDIDATES", "4096"))
+
+_EMPTY_IDS = np.zeros(0, dtype='int64')
+
+
+def _ids(values):
+    return np.asarray(values, dtype='int64') if values else _EMPTY_IDS
+
+
+class MetadataFilterIndex:
+    """Listes inversées d'ids FAISS par patient, par type de document et par date.
+
+    Le store de métadonnées ne fait que grandir : `sync` n'indexe que les
+    chunks ajoutés depuis l'appel précédent. Les listes sont triées par
+    construction (ids ajoutés dans l'ordre).
+    """
+
+    def __init__(self):
+        self.by_patient = defaultdict(list)
+        self.by_doc_type = defaultdict(list)
+        self.by_date = defaultdict(list)
+        self._dates = []  # clés de by_date, triées (dates ISO : ordre lexicographique)
+        self.size = 0
+
+    def extend(self, patient_ids, doc_types, dates):
+        """Indexe les chunks [size, size + n) à partir de leurs colonnes de filtre"""
+        for i, (patient_id, doc_type, date) in enumerate(zip(patient_ids, doc_types, dates), start=self.size):
+            if patient_id:
+                self.by_patient[patient_id].append(i)
+            if doc_type:
+                self.by_doc_type[doc_type].append(i)
+            if date:
+                if date not in self.by_date:
+                    bisect.insort(self._dates, date)
+                self.by_date[date].append(i)
+        self.size += len(patient_ids)
+
+    def sync(self, store, limit=None):
+        """Indexe les chunks commités du store (au plus `limit`, le ntotal de l'index FAISS)"""
+        end = store.count if limit is None else min(store.count, limit)
+        if end <= self.size:
+            return 0
+        added = end - self.size
+        self.extend(*(store.column(name, self.size)[:added] for name in FILTER_COLUMNS))
+        return added
+
+    def candidates(self, patient_id=None, doc_types=None, from_date=None, to_date=None):
+        """Ids satisfaisant tous les filtres (int64 triés) ; None si aucun filtre"""
+        selections = []
+        if patient_id is not None:
+            selections.append(_ids(self.by_patient.get(patient_id)))
+        if doc_types:
+            lists = [self.by_doc_type[t] for t in doc_types if t in self.by_doc_type]
+            selections.append(np.unique(np.concatenate([_ids(l) for l in lists])) if lists else _EMPTY_IDS)
+        if from_date or to_date:
+            lo = bisect.bisect_left(self._dates, from_date[:10]) if from_date else 0
+            hi = bisect.bisect_right(self._dates, to_date[:10]) if to_date else len(self._dates)
+            keys = self._dates[lo:hi]
+            selections.append(np.unique(np.concatenate([_ids(self.by_date[d]) for d in keys])) if keys else _EMPTY_IDS)
+        if not selections:
+            return None
+
+        # Intersection en partant de la liste la plus courte
+        selections.sort(key=len)
+        result = selections[0]
+        for selection in selections[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, selection, assume_unique=True)
+        return result
+
+    def stats(self):
+        return {
+            "chunks": self.size,
+            "patients": len(self.by_patient),
+            "doc_types": len(self.by_doc_type),
+            "dates": len(self._dates)
+        }
+
+
+def _exact_search(index, query, ids, k):
+    vectors = index.reconstruct_batch(ids)
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        distances = -(vectors @ query[0])
+    else:
+        distances = ((vectors - query) ** 2).sum(axis=1)
+    k = min(k, len(ids))
+    order = np.argpartition(distances, k - 1)[:k]
+    order = order[np.argsort(distances[order])]
+    if index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        return -distances[order], ids[order]
+    return distances[order], ids[order]
+
+
+def _selector_search(index, query, ids, k):
+    selector = faiss.IDSelectorBatch(ids)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        nprobe = ivf.nprobe
+        while True:
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+            distances, labels = index.search(query, k, params=params)
+            found = int((labels[0] >= 0).sum())
+            # Filtre très sélectif : les candidats peuvent être hors des listes sondées
+            if found >= min(k, len(ids)) or nprobe >= ivf.nlist:
+                break
+            nprobe = min(ivf.nlist, nprobe * 4)
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=max(index.hnsw.efSearch, k))
+        distances, labels = index.search(query, k, params=params)
+    else:
+        distances, labels = index.search(query, k, params=faiss.SearchParameters(sel=selector))
+    keep = labels[0] >= 0
+    return distances[0][keep], labels[0][keep]
+
+
+def filtered_search(index, query, ids, k, exact_max_candidates=None):
+    """(distances, ids) des k plus proches voisins de `query` parmi `ids` (None : tout l'index)"""
+    query = np.ascontiguousarray(np.asarray(query, dtype='float32').reshape(1, -1))
+    if ids is None:
+        distances, labels = index.search(query, k)
+        keep = labels[0] >= 0
+        return distances[0][keep], labels[0][keep]
+    if len(ids) == 0 or k <= 0:
+        return np.zeros(0, dtype='float32'), _EMPTY_IDS
+
+    exact_max_candidates = EXACT_SEARCH_MAX_CANDIDATES if exact_max_candidates is None else exact_max_candidates
+    if len(ids) <= exact_max_candidates and index_mode(index) in ("flat", "hnsw"):
+        return _exact_search(index, query, ids, k)
+    return _selector_search(index, query, ids, k)
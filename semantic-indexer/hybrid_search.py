@@ -0,0 +1,81 @@
+"""Recherche hybride : classements dense (FAISS) et lexical (BM25) fusionnés.
+
+Fusion par rang réciproque (RRF) : score(d) = Σ poids / (RRF_K + rang(d)),
+sur les `HYBRID_DEPTH` premiers résultats de chaque classement. Seuls les
+rangs comptent, les échelles des distances L2 et des scores BM25 n'ont pas à
+être calibrées l'une sur l'autre.
+"""
+import os
+
+import numpy as np
+
+from filtered_search import filtered_search
+
+SEARCH_MODES = ("hybrid", "dense", "lexical")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_DEPTH = int(os.getenv("HYBRID_DEPTH", "50"))
+LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "1.0"))
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=RRF_K):
+    """(scores, ids) fusionnés, décroissants ; `rankings` : listes d'ids du meilleur au moins bon"""
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, i in enumerate(ranking, start=1):
+            fused[int(i)] = fused.get(int(i), 0.0) + weight / (k + rank)
+    # Ex-aequo : ordre du premier classement où l'id apparaît (tri stable)
+    ordered = sorted(fused.items(), key=lambda item: -item[1])
+    ids = np.array([i for i, _ in ordered], dtype='int64')
+    scores = np.array([score for _, score in ordered], dtype='float32')
+    return scores, ids
+
+
+def check_mode(mode):
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Mode de recherche inconnu : {mode} (choix : {', '.join(SEARCH_MODES)})")
+
+
+def hybrid_search(index, lexical, query_text, query_vector, k, ids=None, mode=SEARCH_MODE, depth=HYBRID_DEPTH):
+    """(scores, ids) des k meilleurs chunks parmi `ids` (None : tout l'index).
+
+    mode "dense" : distances FAISS (croissantes) ; "lexical" : scores BM25 ;
+    "hybrid" : scores RRF des deux classements.
+    """
+    check_mode(mode)
+    if mode == "dense":
+        return filtered_search(index, query_vector, ids, k)
+    if mode == "lexical":
+        return lexical.search(query_text, k, ids, limit=index.ntotal)
+
+    depth = max(depth, k)
+    _, dense_ids = filtered_search(index, query_vector, ids, depth)
+    _, lexical_ids = lexical.search(query_text, depth, ids, limit=index.ntotal)
+    scores, fused_ids = reciprocal_rank_fusion([dense_ids, lexical_ids], weights=[1.0, LEXICAL_WEIGHT])
+    return scores[:k], fused_ids[:k]
+
+
+def hybrid_search_batch(index, lexical, query_texts, query_vectors, k, mode=SEARCH_MODE, depth=HYBRID_DEPTH):
+    """[(scores, ids)] par requête, sur tout l'index.
+
+    Les vecteurs des requêtes sont empilés : un seul `index.search` pour le
+    lot (parallélisé par FAISS sur les requêtes) au lieu d'un par requête.
+    """
+    check_mode(mode)
+    if mode == "lexical":
+        return [lexical.search(text, k, limit=index.ntotal) for text in query_texts]
+
+    dense_k = k if mode == "dense" else max(depth, k)
+    query_vectors = np.ascontiguousarray(np.asarray(query_vectors, dtype='float32').reshape(len(query_texts), -1))
+    distances, labels = index.search(query_vectors, dense_k)
+    results = []
+    for text, row_distances, row_labels in zip(query_texts, distances, labels):
+        keep = row_labels >= 0
+        if mode == "dense":
+            results.append((row_distances[keep], row_labels[keep]))
+            continue
+        _, lexical_ids = lexical.search(text, dense_k, limit=index.ntotal)
+        scores, fused_ids = reciprocal_rank_fusion([row_labels[keep], lexical_ids], weights=[1.0, LEXICAL_WEIGHT])
+        results.append((scores[:k], fused_ids[:k]))
+    return results
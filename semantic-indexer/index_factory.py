@@ -0,0 +1,155 @@
+"""Fabrique d'index FAISS (flat, IVF-Flat, IVF-PQ, HNSW) et migration des index existants.
+
+Usage (depuis semantic-indexer/, indexeur arrêté) :
+    python index_factory.py rebuild --mode ivf_flat
+    python index_factory.py rebuild --mode hnsw --input vector_store.faiss --output hnsw.faiss
+"""
+import argparse
+import math
+import os
+
+import faiss
+import numpy as np
+
+INDEX_MODES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Paramètres (surchargés par variables d'environnement)
+INDEX_MODE = os.getenv("INDEX_MODE", "flat")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))        # 0 = choisi selon la taille du corpus
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+PQ_M = int(os.getenv("PQ_M", "48"))                  # sous-quantifieurs (doit diviser la dimension)
+PQ_NBITS = 8
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+TRAIN_SAMPLE_SIZE = int(os.getenv("TRAIN_SAMPLE_SIZE", "100000"))
+
+
+def default_nlist(n_vectors):
+    """~4*sqrt(n) listes, en gardant au moins 39 points d'entraînement par liste"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def min_training_size(mode, nlist):
+    if mode == "ivf_flat":
+        return nlist
+    if mode == "ivf_pq":
+        # Les codebooks PQ (2^nbits centroïdes par sous-espace) veulent ~39 points par centroïde
+        return max(nlist, 39 * 2 ** PQ_NBITS)
+    return 0
+
+
+def build_index(mode, dimension, n_vectors=0, nlist=None):
+    """Crée un index vide ; les modes IVF doivent ensuite être entraînés (`train_index`)"""
+    if mode == "flat":
+        return faiss.IndexFlatL2(dimension)
+    if mode == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+
+    nlist = nlist or IVF_NLIST or default_nlist(n_vectors)
+    quantizer = faiss.IndexFlatL2(dimension)
+    if mode == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    elif mode == "ivf_pq":
+        if dimension % PQ_M != 0:
+            raise ValueError(f"PQ_M={PQ_M} doit diviser la dimension {dimension}")
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, PQ_M, PQ_NBITS)
+    else:
+        raise ValueError(f"Mode d'index inconnu '{mode}' (attendu : {', '.join(INDEX_MODES)})")
+    index.nprobe = min(IVF_NPROBE, nlist)
+    return index
+
+
+def train_index(index, vectors, sample_size=None):
+    """Entraîne l'index sur un échantillon aléatoire des vecteurs"""
+    if index.is_trained:
+        return
+    sample_size = sample_size or TRAIN_SAMPLE_SIZE
+    if len(vectors) > sample_size:
+        rows = np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)
+        vectors = vectors[np.sort(rows)]
+    index.train(np.ascontiguousarray(vectors, dtype='float32'))
+
+
+def extract_vectors(index):
+    """Récupère les vecteurs d'un index existant, dans l'ordre des positions FAISS.
+
+    Exact pour flat, IVF-Flat et HNSW ; approché (décodage PQ) pour IVF-PQ.
+    """
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype='float32')
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def migrate_index(index, mode, nlist=None):
+    """Reconstruit `index` dans le mode demandé en conservant l'ordre des vecteurs.
+
+    Les positions FAISS ne changent pas : le store de métadonnées et le journal
+    restent valides. Si le corpus est trop petit pour entraîner le mode
+    demandé, l'index d'origine est conservé.
+    """
+    vectors = extract_vectors(index)
+    nlist = nlist or IVF_NLIST or default_nlist(len(vectors))
+    if len(vectors) == 0 or len(vectors) < min_training_size(mode, nlist):
+        print(f"⚠️ {len(vectors)} vecteurs : trop peu pour entraîner '{mode}', index conservé.")
+        return index
+
+    new_index = build_index(mode, index.d, len(vectors), nlist)
+    train_index(new_index, vectors)
+    new_index.add(vectors)
+    return new_index
+
+
+def index_mode(index):
+    """Nom du mode d'un index chargé depuis le disque"""
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    return "flat"
+
+
+def configure_search(index, nprobe=None, ef_search=None):
+    """Applique les paramètres de recherche (nprobe / efSearch) à un index chargé"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe or IVF_NPROBE, ivf.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search or HNSW_EF_SEARCH
+    return index
+
+
+def rebuild(input_path, output_path, mode, nlist=None):
+    """Migre un fichier d'index existant vers un autre mode (écriture atomique)"""
+    index = faiss.read_index(input_path)
+    print(f"Index '{input_path}' : {index.ntotal} vecteurs, mode {index_mode(index)}")
+    new_index = migrate_index(index, mode, nlist)
+    faiss.write_index(new_index, output_path + ".tmp")
+    os.replace(output_path + ".tmp", output_path)
+    print(f" -> '{output_path}' écrit en mode {index_mode(new_index)} ({new_index.ntotal} vecteurs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gestion des index FAISS du semantic-indexer")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_parser = sub.add_parser("rebuild", help="Reconstruit un index existant dans un autre mode")
+    rebuild_parser.add_argument("--mode", choices=INDEX_MODES, required=True)
+    rebuild_parser.add_argument("--input", default="vector_store.faiss")
+    rebuild_parser.add_argument("--output", help="par défaut : remplace --input")
+    rebuild_parser.add_argument("--nlist", type=int, help="nombre de listes IVF")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        rebuild(args.input, args.output or args.input, args.mode, args.nlist)
+
+
+if __name__ == "__main__":
+    main()
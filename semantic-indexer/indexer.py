@@ -5,9 +5,19 @@ import glob
 import csv
 import numpy as np
 import pickle
+import threading
 from sentence_transformers import SentenceTransformer
 import faiss
 
+from docqa_common.segment_protocol import BlobStore, message_kind
+from docqa_common.startup import WARMUP, StartupState, start_health_server
+
+from chunking import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNKER, estimate_tokens, make_chunker, model_token_counter
+from columnar_store import ColumnarMetadataStore, check_record
+from index_factory import INDEX_MODE, build_index, configure_search, index_mode, migrate_index
+from manifest import MANIFEST_FILE, read_manifest, write_manifest
+from wal import SegmentedWAL
+
 # --- CONFIGURATION ---
 RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
 INPUT_QUEUE = 'clean_documents_queue'
@@ -15,39 +25,179 @@ DEFAULT_DATA_DIR = "default_data"
 
 # Fichiers de stockage
 INDEX_FILE = "vector_store.faiss"
-METADATA_FILE = "metadata_store.pkl"
+METADATA_DIR = "metadata_store"
+# Ancien format (liste de dicts picklée), migré automatiquement au démarrage
+LEGACY_METADATA_FILE = "metadata_store.pkl"
+
+# Taille des lots envoyés au modèle d'embedding (un seul index.add par lot)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# Journal append-only : chaque message y est écrit, l'index principal n'est
+# réécrit que lors de la compaction périodique (en arrière-plan)
+WAL_DIR = "wal"
+COMPACTION_INTERVAL = int(os.getenv("COMPACTION_INTERVAL", "300"))
+
+# Sondes /health et /ready, servies avant le chargement du modèle et de l'index
+# (le port 8003 est celui de l'API de recherche, search_service.py)
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "8013"))
+
+# Texte anonymisé des segments (la queue ne transporte que des références)
+blob_store = BlobStore()
 
-print("Chargement du modèle d'embedding...")
-model = SentenceTransformer('all-MiniLM-L6-v2') 
+# Chargés au démarrage du service (load_model / load_index), pas à l'import
+model = None
+# Découpage des textes patients (CHUNKER) ; limite en tokens du modèle une fois chargé
+def build_chunker(embedding_model=None):
+    count_tokens = model_token_counter(embedding_model) if embedding_model is not None else estimate_tokens
+    return make_chunker(CHUNKER, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                        count_tokens=count_tokens)
+
+chunker = build_chunker()
+# Prochain numéro de chunk par document (les segments d'un document arrivent dans l'ordre)
+chunk_counters = {}
 dimension = 384
 index = None
 metadata_store = []
+wal = SegmentedWAL(WAL_DIR)
+# Numéro de génération publié dans le manifeste à chaque sauvegarde complète
+index_generation = read_manifest(MANIFEST_FILE).get("generation", 0)
+# Protège index/metadata_store entre le consommateur RabbitMQ et la compaction
+state_lock = threading.RLock()
 
 def save_state():
-    faiss.write_index(index, INDEX_FILE)
-    with open(METADATA_FILE, 'wb') as f:
-        pickle.dump(metadata_store, f)
-    print(" -> Index sauvegardé.")
+    """Écrit l'index complet (métadonnées puis index, chacun de façon atomique)"""
+    # Seuls les chunks ajoutés depuis le dernier flush sont écrits (fin de fichiers)
+    metadata_store.flush()
+    faiss.write_index(index, INDEX_FILE + ".tmp")
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
+    publish_generation()
+    print(f" -> Index sauvegardé (génération {index_generation}).")
+
+def publish_generation():
+    """Annonce une nouvelle génération d'index aux lecteurs (llm-qa)"""
+    global index_generation
+    index_generation += 1
+    write_manifest(
+        MANIFEST_FILE,
+        generation=index_generation,
+        index_file=INDEX_FILE,
+        metadata_dir=METADATA_DIR,
+        ntotal=int(index.ntotal),
+        index_mode=index_mode(index)
+    )
+
+def replay_wal():
+    """Rejoue dans l'index les enregistrements du journal non encore compactés"""
+    # Crash entre l'écriture des métadonnées et celle de l'index : on se cale sur
+    # l'index, avec ou sans journal à rejouer
+    del metadata_store[index.ntotal:]
+    if not wal.segments(): return 0
+
+    replayed = 0
+    for start_id, vectors, metadatas in wal.replay():
+        if start_id + len(metadatas) <= index.ntotal:
+            continue  # déjà présent dans l'index compacté
+        if start_id != index.ntotal:
+            print(f"⚠️ Trou dans le journal (attendu {index.ntotal}, lu {start_id}), rejeu interrompu")
+            break
+        index.add(vectors)
+        metadata_store.extend(metadatas)
+        replayed += len(metadatas)
+    print(f" -> {replayed} vecteurs rejoués depuis le journal.")
+    return replayed
+
+def compact():
+    """Réécrit l'index principal et supprime les segments de journal absorbés"""
+    with state_lock:
+        if not wal.segments(): return
+        sealed = wal.rotate()
+        save_state()
+    wal.drop_until(sealed)
+
+def start_compactor(interval=None):
+    """Lance la compaction périodique dans un thread d'arrière-plan"""
+    stop_event = threading.Event()
+    interval = interval or COMPACTION_INTERVAL
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                compact()
+            except Exception as e:
+                print(f"⚠️ Erreur compaction: {e}")
+
+    threading.Thread(target=run, name="wal-compactor", daemon=True).start()
+    return stop_event
 
 def add_to_index(text, source_name, doc_type="knowledge_base"):
-    """Ajoute un texte vectorisé à l'index"""
-    global index
-    if not text.strip(): return
+    """Ajoute un texte vectorisé à l'index (journalisé, comme les chunks patients)"""
+    with BatchIngestor(wal=wal) as ingestor:
+        ingestor.add(text, source_name, doc_type)
 
-    embeddings = model.encode([text])
-    if index is None:
-        index = faiss.IndexFlatL2(dimension)
-    
-    index.add(np.array(embeddings).astype('float32'))
-    
-    metadata_store.append({
-        "doc_id": "KB_MTC",
-        "text_content": text,
-        "source": source_name,
-        "type": doc_type
-    })
-
-def ingest_csv_data():
+class BatchIngestor:
+    """Accumule des textes et les vectorise par lots.
+
+    Chaque lot de `batch_size` textes donne un seul appel à `model.encode`
+    et un seul `index.add`, au lieu d'une passe du modèle par ligne/chunk.
+    Utilisable comme context manager : le dernier lot partiel est vidé à la sortie.
+    """
+
+    def __init__(self, batch_size=None, wal=None):
+        self.batch_size = max(1, batch_size or EMBED_BATCH_SIZE)
+        self.wal = wal
+        self.texts = []
+        self.metadatas = []
+        self.count = 0
+
+    def add(self, text, source_name, doc_type="knowledge_base", doc_id="KB_MTC", fields=None):
+        """`fields` : position et filtres des chunks de documents patients (chunk_index, patient_id...)
+
+        ValueError si doc_id ou un filtre ne tient pas dans sa colonne : refusé
+        avant journal et index, plutôt que tronqué (autre patient / document).
+        """
+        if not text or not text.strip(): return
+
+        record = {
+            "doc_id": doc_id,
+            "text_content": text,
+            "source": source_name,
+            "type": doc_type,
+            **(fields or {})
+        }
+        check_record(record)
+        self.texts.append(text)
+        self.metadatas.append(record)
+        if len(self.texts) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Vectorise et indexe le lot en attente"""
+        global index
+        if not self.texts: return
+
+        embeddings = np.asarray(model.encode(self.texts, batch_size=self.batch_size), dtype='float32')
+        with state_lock:
+            if index is None:
+                index = build_index("flat", dimension)
+
+            # Journalisé avant l'ajout : un message acquitté survit à un crash
+            if self.wal is not None:
+                self.wal.append(index.ntotal, embeddings, self.metadatas)
+            index.add(embeddings)
+            metadata_store.extend(self.metadatas)
+
+        self.count += len(self.texts)
+        self.texts = []
+        self.metadatas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+def ingest_csv_data(batch_size=None):
     """Traite intelligemment vos CSV MTC"""
     if not os.path.exists(DEFAULT_DATA_DIR): return
 
@@ -58,7 +208,7 @@ def ingest_csv_data():
         print(f"🚀 Traitement structuré de : {filename}")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with open(file_path, 'r', encoding='utf-8') as f, BatchIngestor(batch_size) as ingestor:
                 reader = csv.DictReader(f)
                 count = 0
                 
@@ -72,7 +222,7 @@ def ingest_csv_data():
                             f"Plante recommandée : {row.get('nom_latin', '')} ({row.get('nom_chinois', '')}). "
                             f"Score de pertinence : {row.get('score_role', '0')}."
                         )
-                        add_to_index(text, filename)
+                        ingestor.add(text, filename)
                         count += 1
 
                     # CAS 2 : Base de Connaissance (Détails)
@@ -85,7 +235,7 @@ def ingest_csv_data():
                             f"Rôle : {row.get('role_formule', 'Inconnu')} (Score {row.get('score_role', '')}). "
                             f"Description : {row.get('description', '')}"
                         )
-                        add_to_index(text, filename)
+                        ingestor.add(text, filename)
                         count += 1
                         
                 print(f"   -> {count} entrées indexées pour {filename}")
@@ -93,36 +243,110 @@ def ingest_csv_data():
         except Exception as e:
             print(f"⚠️ Erreur lecture CSV {filename}: {e}")
 
+def open_metadata_store():
+    """Ouvre le store colonnaire (mmap), en migrant l'ancien pickle si besoin"""
+    if not os.path.exists(METADATA_DIR) and os.path.exists(LEGACY_METADATA_FILE):
+        print(f"Migration de {LEGACY_METADATA_FILE} vers le store colonnaire...")
+        with open(LEGACY_METADATA_FILE, 'rb') as f:
+            ColumnarMetadataStore.from_records(METADATA_DIR, pickle.load(f)).close()
+    return ColumnarMetadataStore(METADATA_DIR)
+
 # --- DÉMARRAGE ---
-if os.path.exists(INDEX_FILE) and os.path.exists(METADATA_FILE):
-    print("Chargement de l'index existant...")
-    index = faiss.read_index(INDEX_FILE)
-    with open(METADATA_FILE, 'rb') as f:
-        metadata_store = pickle.load(f)
-else:
-    print("Création d'un nouvel index MTC...")
-    index = faiss.IndexFlatL2(dimension)
-    metadata_store = []
-    ingest_csv_data() # Scan et ingestion des CSV
-    save_state()
-
-print(f"Index prêt ({index.ntotal} vecteurs). En attente RabbitMQ...")
+def load_model():
+    global model, chunker
+    print("Chargement du modèle d'embedding...")
+    model = SentenceTransformer('all-MiniLM-L6-v2')
+    chunker = build_chunker(model)
+
+def load_index(startup):
+    """Ouvre (ou crée) l'index et son store, puis rejoue le journal"""
+    global index, metadata_store
+    with startup.phase("metadata_store"):
+        metadata_store = open_metadata_store()
+
+    if os.path.exists(INDEX_FILE) and len(metadata_store) > 0:
+        print("Chargement de l'index existant...")
+        with startup.phase("faiss_index"):
+            index = configure_search(faiss.read_index(INDEX_FILE))
+        if index_mode(index) != INDEX_MODE:
+            print(f"⚠️ Index en mode '{index_mode(index)}' (INDEX_MODE={INDEX_MODE}). "
+                  f"Pour migrer : python index_factory.py rebuild --mode {INDEX_MODE}")
+        with startup.phase("wal_replay"):
+            replay_wal()
+    else:
+        print("Création d'un nouvel index MTC...")
+        with startup.phase("bootstrap_csv"):
+            index = build_index("flat", dimension)
+            del metadata_store[0:]
+            ingest_csv_data() # Scan et ingestion des CSV
+            # Les modes IVF s'entraînent sur le corpus initial, ingéré d'abord en flat
+            if INDEX_MODE != "flat":
+                index = migrate_index(index, INDEX_MODE)
+            save_state()
+            # Un journal orphelin ne correspond à aucun index sauvegardé
+            wal.drop_until(wal.rotate())
+
+    print(f"Index prêt ({index.ntotal} vecteurs). En attente RabbitMQ...")
+
+def load_service(startup):
+    with startup.phase("embedding_model"):
+        load_model()
+    load_index(startup)
+    if WARMUP:
+        with startup.phase("warmup"):
+            model.encode(["échauffement du modèle"])
 
 # --- PARTIE RABBITMQ (Ne change pas) ---
+def index_patient_text(doc_id, text, char_offset=0, first_chunk=0, metadata=None):
+    """Découpe et indexe un texte patient ; retourne le nombre de chunks.
+
+    `char_offset` : position du texte dans le document (segments), pour des
+    char_start / char_end relatifs au document complet. `metadata` (message
+    de l'ingestor) : patient_id, type et date, filtres de la recherche par patient.
+    """
+    chunks = chunker.split(text or "")
+    metadata = metadata or {}
+    filters = {
+        "patient_id": metadata.get("patient_id"),
+        "doc_type": metadata.get("type"),
+        "date": metadata.get("date")
+    }
+    
+    # Persistance incrémentale : seul le journal est écrit ici
+    with BatchIngestor(wal=wal) as ingestor:
+        for ordinal, chunk in enumerate(chunks, start=first_chunk):
+            ingestor.add(chunk.text, f"Dossier Patient {doc_id}", "patient_file", doc_id=str(doc_id), fields={
+                "chunk_index": ordinal,
+                "char_start": char_offset + chunk.start,
+                "char_end": char_offset + chunk.end,
+                **filters
+            })
+    return len(chunks)
+
 def callback(ch, method, properties, body):
     try:
         message = json.loads(body)
         doc_id = message.get("doc_id")
-        text = message.get("original_text_masked")
-        print(f" [->] Reçu Doc Patient {doc_id}")
-        
-        # Découpage simple pour le texte patient
-        chunks = [text[i:i+500] for i in range(0, len(text), 500)]
-        
-        for chunk in chunks:
-            add_to_index(chunk, f"Dossier Patient {doc_id}", "patient_file")
+        kind = message_kind(message)
+
+        if kind == "segment":
+            # Segment indexé dès réception, sans attendre la fin du document
+            print(f" [->] Reçu Doc Patient {doc_id} segment {message['seq']}")
+            if message["seq"] == 0:
+                chunk_counters[doc_id] = 0
+            chunk_counters[doc_id] = chunk_counters.get(doc_id, 0) + index_patient_text(
+                doc_id, blob_store.get(message["blob"]),
+                char_offset=message.get("char_offset", 0), first_chunk=chunk_counters.get(doc_id, 0),
+                metadata=message.get("metadata")
+            )
+            blob_store.delete(message["blob"])
+        elif kind == "legacy":
+            print(f" [->] Reçu Doc Patient {doc_id}")
+            index_patient_text(doc_id, message.get("original_text_masked"), metadata=message.get("metadata"))
+        elif kind == "end":
+            chunk_count = chunk_counters.pop(doc_id, 0)
+            print(f" [ok] Doc Patient {doc_id} indexé ({message.get('segments')} segments, {chunk_count} chunks)")
             
-        save_state()
         ch.basic_ack(delivery_tag=method.delivery_tag)
     except Exception as e:
         print(f"Erreur: {e}")
@@ -137,7 +361,17 @@ def start_consuming():
     channel.start_consuming()
 
 if __name__ == "__main__":
+    # BLOB_STORE_DIR obligatoire : arrêt immédiat plutôt qu'une erreur au premier segment
+    print(f"Blob store : {blob_store.directory}")
+    startup = StartupState("semantic-indexer")
+    start_health_server(startup, HEALTH_PORT)
+    print(f"Sondes /health et /ready sur le port {HEALTH_PORT}")
+    startup.run(lambda: load_service(startup))
+
+    start_compactor()
     try:
         start_consuming()
     except KeyboardInterrupt:
-        print("Arrêt.")
\ No newline at end of file
+        print("Arrêt.")
+    finally:
+        compact()
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""Index lexical BM25 des chunks, à côté de l'index FAISS.
+
+Les embeddings all-MiniLM-L6-v2 distinguent mal les termes exacts (noms
+latins de plantes, noms de syndromes, médicaments) : l'index inversé retrouve
+les chunks qui contiennent ces termes, quel que soit leur voisinage sémantique.
+
+Comme les filtres de `filtered_search`, l'index suit le store de métadonnées,
+qui ne fait que grandir : `sync` n'indexe que les chunks ajoutés depuis
+l'appel précédent (pas de fichier à part, reconstruit au démarrage).
+"""
+import math
+import os
+import re
+import unicodedata
+from array import array
+from collections import Counter
+
+import numpy as np
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_WORD = re.compile(r"\w+")
+# Mots vides français courants (articles, prépositions, pronoms) : présents
+# dans presque tous les chunks, ils ne font que diluer les scores
+STOPWORDS = frozenset("""
+a au aux avec ce ces cette dans de des du elle en est et il ils je la le les leur lui
+mais me ne on ou par pas pour qu que qui sa se ses son sont sur ta te tu un une vous
+d l s n c j y quel quelle quels quelles
+""".split())
+
+_EMPTY = (np.zeros(0, dtype='int64'), np.zeros(0, dtype='float32'))
+
+
+def tokenize(text):
+    """Mots en minuscules, sans accents ni mots vides ("Vide de Qi du Rein" -> vide, qi, rein)"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [word for word in _WORD.findall(text) if word not in STOPWORDS]
+
+
+class LexicalIndex:
+    """Index inversé terme -> (ids FAISS, fréquences), scoré en BM25.
+
+    Les listes de postings sont des `array` (int32 / uint16) qui grandissent
+    par ajout ; leur copie numpy est mise en cache jusqu'au prochain ajout sur
+    le terme. Un `sync` concurrent d'une recherche ne fait qu'ajouter des ids,
+    que `limit` écarte tant que l'index FAISS ne les contient pas.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self._arrays = {}
+        self._lengths = array('f')
+        self._length_stats = None  # (copie numpy des longueurs, longueur moyenne)
+        self._total_length = 0
+        self.size = 0
+
+    def extend(self, texts):
+        """Indexe les chunks [size, size + n)"""
+        for i, text in enumerate(texts, start=self.size):
+            terms = Counter(tokenize(text))
+            for term, frequency in terms.items():
+                postings = self.postings.get(term)
+                if postings is None:
+                    postings = self.postings[term] = (array('i'), array('H'))
+                postings[0].append(i)
+                postings[1].append(min(frequency, 65535))
+                self._arrays.pop(term, None)
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._total_length += length
+            self.size = i + 1
+        self._length_stats = None
+
+    def sync(self, store, limit=None):
+        """Indexe les chunks commités du store (au plus `limit`, le ntotal de l'index FAISS)"""
+        end = store.count if limit is None else min(store.count, limit)
+        if end <= self.size:
+            return 0
+        added = end - self.size
+        self.extend(store.text(i) for i in range(self.size, end))
+        return added
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self.postings.get(term)
+            if postings is None:
+                return _EMPTY
+            arrays = self._arrays[term] = (
+                np.array(postings[0], dtype='int64'), np.array(postings[1], dtype='float32')
+            )
+        return arrays
+
+    def search(self, query, k, ids=None, limit=None):
+        """(scores, ids) des k chunks les mieux notés en BM25, décroissants.
+
+        `ids` restreint aux candidats (ids triés, comme `filtered_search`),
+        `limit` aux chunks déjà présents dans l'index FAISS.
+        """
+        terms = set(tokenize(query))
+        if not terms or self.size == 0 or k <= 0:
+            return _EMPTY[1], _EMPTY[0]
+        length_stats = self._length_stats
+        if length_stats is None:
+            # Copie (pas de vue sur l'array : il doit pouvoir grandir pendant une recherche)
+            lengths = np.array(self._lengths, dtype='float32')
+            length_stats = self._length_stats = (lengths, float(lengths.mean()) or 1.0)
+        lengths, average_length = length_stats
+        size = len(lengths)
+
+        matched, contributions = [], []
+        for term in terms:
+            doc_ids, frequencies = self._term_arrays(term)
+            if len(doc_ids) and doc_ids[-1] >= size:
+                # Chunks ajoutés après la copie des longueurs : ignorés pour cette recherche
+                end = np.searchsorted(doc_ids, size)
+                doc_ids, frequencies = doc_ids[:end], frequencies[:end]
+            if len(doc_ids) == 0:
+                continue
+            idf = math.log(1 + (size - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[doc_ids] / average_length)
+            matched.append(doc_ids)
+            contributions.append(idf * frequencies * (self.k1 + 1) / (frequencies + norm))
+        if not matched:
+            return _EMPTY[1], _EMPTY[0]
+
+        doc_ids, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype('float32')
+        keep = np.ones(len(doc_ids), dtype=bool)
+        if limit is not None:
+            keep &= doc_ids < limit
+        if ids is not None:
+            keep &= np.isin(doc_ids, ids, assume_unique=True)
+        doc_ids, scores = doc_ids[keep], scores[keep]
+
+        k = min(k, len(doc_ids))
+        if k == 0:
+            return _EMPTY[1], _EMPTY[0]
+        order = np.argpartition(-scores, k - 1)[:k]
+        order = order[np.argsort(-scores[order], kind="stable")]
+        return scores[order], doc_ids[order]
+
+    def stats(self):
+        return {
+            "chunks": self.size,
+            "terms": len(self.postings),
+            "mean_length": self._total_length / self.size if self.size else 0.0
+        }
@@ -0,0 +1,29 @@
+import json
+import os
+import time
+
+# Manifeste publié par l'indexeur à chaque nouvelle génération d'index
+# (bootstrap, compaction) : les lecteurs (llm-qa) le surveillent pour recharger
+# l'index sans redémarrage.
+MANIFEST_FILE = "index_manifest.json"
+
+
+def read_manifest(path):
+    """Retourne le manifeste, ou un manifeste de génération 0 s'il n'existe pas encore"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"generation": 0}
+
+
+def write_manifest(path, **fields):
+    """Écrit le manifeste de façon atomique (fichier temporaire + os.replace)"""
+    manifest = dict(fields, updated_at=time.time())
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return manifest
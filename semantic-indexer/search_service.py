@@ -0,0 +1,355 @@
+"""API de recherche de l'indexeur (lecture seule de l'index publié).
+
+    GET  /api/search?q=&k=&mode=
+    POST /api/search/batch   {"queries": [{"q": ..., "vector": [...]?}, ...], "k", "mode"}
+    GET  /api/search/patient-snippets?patient_id=&from_date=&to_date=&focus=&doc_type=&k=&mode=
+    POST /api/embed          {"texts": [...]}
+
+Le modèle d'embedding et l'index ne sont chargés qu'ici : llm-qa et
+synthese-comparative passent par cette API au lieu d'en garder une copie.
+Un lot de requêtes est encodé en une passe du modèle (sauf les requêtes dont
+le vecteur est fourni) puis cherché en un seul `index.search` sur la matrice
+empilée des vecteurs.
+
+Les extraits d'un patient sont sélectionnés sur les listes inversées
+(patient, type de document, date) puis, si `focus` est fourni, classés par
+pertinence parmi ces seuls ids. Sans `focus`, ce sont les k extraits les plus
+récents, dans l'ordre chronologique.
+
+Classement (`mode`, SEARCH_MODE par défaut) : "hybrid" fusionne k-NN FAISS et
+BM25 (voir hybrid_search), "dense" et "lexical" n'en utilisent qu'un.
+
+L'index et le store sont ceux publiés par l'indexeur (manifeste, génération) ;
+les chunks encore dans le journal apparaissent après la compaction suivante.
+
+Usage (depuis semantic-indexer/) :
+    uvicorn search_service:app --port 8003
+"""
+import os
+import threading
+import time
+from typing import List, Optional
+
+import faiss
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from docqa_common.startup import WARMUP, StartupState
+
+from columnar_store import ColumnarMetadataStore
+from filtered_search import MetadataFilterIndex
+from hybrid_search import SEARCH_MODE, SEARCH_MODES, hybrid_search, hybrid_search_batch
+from index_factory import configure_search
+from lexical_index import LexicalIndex
+from manifest import read_manifest
+
+SERVICE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(SERVICE_DIR, "vector_store.faiss")
+METADATA_DIR = os.path.join(SERVICE_DIR, "metadata_store")
+MANIFEST_PATH = os.path.join(SERVICE_DIR, "index_manifest.json")
+
+# Lecture en mmap, lecture seule (comme llm-qa)
+MMAP_IO_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+INDEX_RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "10"))
+DEFAULT_SNIPPETS = int(os.getenv("PATIENT_SNIPPETS_K", "20"))
+MAX_SNIPPETS = int(os.getenv("PATIENT_SNIPPETS_MAX", "200"))
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "256"))
+
+
+class SearchSnapshot:
+    """Index FAISS, store, filtres et index lexical d'une génération, substitués ensemble au rechargement"""
+
+    def __init__(self, generation, index, store, filters, lexical):
+        self.generation = generation
+        self.index = index
+        self.store = store
+        self.filters = filters
+        self.lexical = lexical
+
+    def candidates(self, patient_id=None, doc_types=None, from_date=None, to_date=None):
+        ids = self.filters.candidates(patient_id, doc_types, from_date, to_date)
+        if ids is None:
+            return None
+        # Les filtres peuvent déjà connaître les chunks d'une génération plus récente
+        return ids[:np.searchsorted(ids, self.index.ntotal)]
+
+    def snippet(self, i, score=None):
+        record = self.store[int(i)]
+        snippet = {
+            "doc_id": record["doc_id"],
+            "text": record["text_content"],
+            "source": record["source"],
+            "doc_type": record.get("doc_type"),
+            "date": record.get("date"),
+            "chunk_index": record.get("chunk_index"),
+            "char_start": record.get("char_start"),
+            "char_end": record.get("char_end"),
+        }
+        if score is not None:
+            snippet["score"] = float(score)
+        return snippet
+
+    def search(self, ids, query_vector=None, k=20, query_text=None, mode=SEARCH_MODE):
+        """Extraits parmi les candidats `ids` (None : tous) : les k plus pertinents pour
+        `query_text` (et son vecteur, sauf en mode lexical), sinon les k plus récents"""
+        if ids is not None and len(ids) == 0:
+            return []
+        if query_text is None:
+            # Tri sur les colonnes seules : le texte n'est lu que pour les k extraits renvoyés
+            field = self.store.field
+            order = sorted(ids, key=lambda i: (field("date", i), field("doc_id", i), int(field("chunk_index", i) or 0)))
+            return [self.snippet(i) for i in order[-k:]]
+        scores, labels = hybrid_search(self.index, self.lexical, query_text, query_vector, k, ids, mode)
+        return [self.snippet(i, score) for score, i in zip(scores, labels)]
+
+    def search_batch(self, query_texts, query_vectors=None, k=20, mode=SEARCH_MODE):
+        """Extraits de chaque requête d'un lot, sur tout l'index (une seule recherche FAISS)"""
+        results = hybrid_search_batch(self.index, self.lexical, query_texts, query_vectors, k, mode)
+        return [[self.snippet(i, score) for score, i in zip(scores, labels)] for scores, labels in results]
+
+
+def load_snapshot(previous=None):
+    """Mappe l'index publié et son store ; filtres et index lexical existants sont complétés, pas reconstruits"""
+    generation = read_manifest(MANIFEST_PATH).get("generation", 0)
+    index = configure_search(faiss.read_index(INDEX_FILE, MMAP_IO_FLAGS))
+    store = ColumnarMetadataStore(METADATA_DIR, readonly=True)
+    filters, lexical = (previous.filters, previous.lexical) if previous else (None, None)
+    # Index republié plus petit (reconstruction) : les ids ne correspondent plus
+    if filters is None or filters.size > index.ntotal:
+        filters = MetadataFilterIndex()
+    if lexical is None or lexical.size > index.ntotal:
+        lexical = LexicalIndex()
+    filters.sync(store, limit=index.ntotal)
+    lexical.sync(store, limit=index.ntotal)
+    return SearchSnapshot(generation, index, store, filters, lexical)
+
+
+app = FastAPI(title="Semantic Indexer Search API")
+startup = StartupState("semantic-search")
+
+model = None
+snapshot = None
+search_stats = {
+    kind: {"searches": 0, "queries": 0, "candidates": 0, "total_ms": 0.0}
+    for kind in ("global", "batch", "patient")
+}
+stats_lock = threading.Lock()
+
+
+def reload_if_new_generation():
+    global snapshot
+    generation = read_manifest(MANIFEST_PATH).get("generation", 0)
+    if snapshot is not None and generation <= snapshot.generation:
+        return False
+    new_snapshot = load_snapshot(snapshot)
+    snapshot = new_snapshot
+    print(f"🔄 Index de recherche : génération {new_snapshot.generation} ({new_snapshot.index.ntotal} vecteurs)")
+    return True
+
+
+def watch_index(interval=INDEX_RELOAD_INTERVAL):
+    while True:
+        time.sleep(interval)
+        try:
+            reload_if_new_generation()
+        except Exception as e:
+            print(f"⚠️ Rechargement de l'index impossible : {e}")
+
+
+def load_service():
+    global model
+    with startup.phase("index"):
+        try:
+            reload_if_new_generation()
+        except FileNotFoundError as e:
+            # Pas encore d'index publié : le watcher le chargera dès sa publication
+            print(f"⚠️ Index non disponible : {e}")
+    with startup.phase("embedding_model"):
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer('all-MiniLM-L6-v2')
+    if WARMUP:
+        with startup.phase("warmup"):
+            model.encode(["échauffement du modèle"])
+    threading.Thread(target=watch_index, name="index-watcher", daemon=True).start()
+
+
+@app.on_event("startup")
+def start_loading():
+    startup.load_in_background(load_service)
+
+
+def check_ready():
+    if not startup.ready:
+        detail = startup.error or f"Service en cours de démarrage ({startup.current_phase or 'initialisation'})."
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+
+
+def current_snapshot():
+    # Référence locale : un rechargement concurrent ne change pas l'index de cette requête
+    current = snapshot
+    check_ready()
+    if current is None:
+        raise HTTPException(status_code=503, detail="Index non chargé.", headers={"Retry-After": "5"})
+    return current
+
+
+def check_mode(mode):
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=422, detail=f"mode doit valoir {', '.join(SEARCH_MODES)}")
+
+
+async def encode_query(text, mode):
+    """Vecteur de la requête (inutile en mode lexical : le modèle n'est pas appelé)"""
+    if mode == "lexical":
+        return None
+    return (await run_in_threadpool(model.encode, [text]))[0]
+
+
+def check_batch_size(size):
+    if size > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=422, detail=f"Au plus {MAX_BATCH_QUERIES} requêtes par lot")
+
+
+def query_matrix(texts, vectors, dimension):
+    """Matrice (n, d) des requêtes : vecteurs fournis, les autres encodés en un seul lot"""
+    matrix = np.zeros((len(texts), dimension), dtype='float32')
+    missing = []
+    for row, vector in enumerate(vectors):
+        if vector is None:
+            missing.append(row)
+        else:
+            matrix[row] = vector
+    if missing:
+        matrix[missing] = model.encode([texts[row] for row in missing])
+    return matrix
+
+
+def record_search(kind, candidates, start, queries=1):
+    with stats_lock:
+        stats = search_stats[kind]
+        stats["searches"] += 1
+        stats["queries"] += queries
+        stats["candidates"] += candidates
+        stats["total_ms"] += 1000 * (time.perf_counter() - start)
+
+
+@app.get("/api/search")
+async def search(
+    q: str,
+    k: int = Query(DEFAULT_SNIPPETS, ge=1, le=MAX_SNIPPETS),
+    mode: str = SEARCH_MODE
+):
+    check_mode(mode)
+    current = current_snapshot()
+    start = time.perf_counter()
+    query_vector = await encode_query(q, mode)
+    results = await run_in_threadpool(current.search, None, query_vector, k, q, mode)
+    record_search("global", int(current.index.ntotal), start)
+    return results
+
+
+class BatchQuery(BaseModel):
+    q: str
+    # Vecteur déjà calculé par l'appelant (ex. cache de llm-qa) : pas de ré-encodage
+    vector: Optional[List[float]] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[BatchQuery]
+    k: int = DEFAULT_SNIPPETS
+    mode: str = SEARCH_MODE
+
+
+@app.post("/api/search/batch")
+async def search_batch(request: BatchSearchRequest):
+    check_mode(request.mode)
+    check_batch_size(len(request.queries))
+    if not 1 <= request.k <= MAX_SNIPPETS:
+        raise HTTPException(status_code=422, detail=f"k doit être compris entre 1 et {MAX_SNIPPETS}")
+    current = current_snapshot()
+    start = time.perf_counter()
+    texts = [query.q for query in request.queries]
+    query_vectors = None
+    if request.mode != "lexical" and texts:
+        vectors = [query.vector for query in request.queries]
+        if any(vector is not None and len(vector) != current.index.d for vector in vectors):
+            raise HTTPException(status_code=422, detail=f"Les vecteurs doivent être de dimension {current.index.d}")
+        query_vectors = await run_in_threadpool(query_matrix, texts, vectors, current.index.d)
+    results = await run_in_threadpool(current.search_batch, texts, query_vectors, request.k, request.mode) if texts else []
+    record_search("batch", int(current.index.ntotal), start, queries=len(texts))
+    return {"generation": current.generation, "results": results}
+
+
+class EmbedRequest(BaseModel):
+    texts: List[str]
+
+
+@app.post("/api/embed")
+async def embed(request: EmbedRequest):
+    """Vecteurs des textes (même modèle que l'index), encodés en une passe"""
+    check_batch_size(len(request.texts))
+    # Le modèle suffit : pas besoin qu'un index soit déjà publié
+    check_ready()
+    vectors = await run_in_threadpool(model.encode, request.texts) if request.texts else []
+    return {
+        "generation": snapshot.generation if snapshot else None,
+        "vectors": [[float(x) for x in vector] for vector in vectors]
+    }
+
+
+@app.get("/api/search/patient-snippets")
+async def patient_snippets(
+    patient_id: str,
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    focus: Optional[str] = None,
+    doc_type: Optional[List[str]] = Query(None),
+    k: int = Query(DEFAULT_SNIPPETS, ge=1, le=MAX_SNIPPETS),
+    mode: str = SEARCH_MODE
+):
+    check_mode(mode)
+    current = current_snapshot()
+    start = time.perf_counter()
+    # Pré-filtre : seuls ces ids seront classés par rapport au focus
+    ids = current.candidates(patient_id, doc_type, from_date, to_date)
+    query_vector = None
+    if focus and len(ids):
+        query_vector = await encode_query(focus, mode)
+    snippets = await run_in_threadpool(current.search, ids, query_vector, k, focus or None, mode)
+    record_search("patient", len(ids), start)
+    return snippets
+
+
+@app.get("/metrics")
+def metrics():
+    with stats_lock:
+        stats = {kind: dict(values) for kind, values in search_stats.items()}
+    return {
+        "generation": snapshot.generation if snapshot else None,
+        "vectors": int(snapshot.index.ntotal) if snapshot else 0,
+        "filters": snapshot.filters.stats() if snapshot else None,
+        "lexical": snapshot.lexical.stats() if snapshot else None,
+        "searches": {
+            kind: {
+                "count": values["searches"],
+                "mean_queries": values["queries"] / (values["searches"] or 1),
+                "mean_candidates": values["candidates"] / (values["searches"] or 1),
+                "mean_latency_ms": values["total_ms"] / (values["searches"] or 1)
+            }
+            for kind, values in stats.items()
+        },
+        "startup": startup.readiness()
+    }
+
+
+@app.get("/health")
+def health():
+    return {**startup.liveness(), "generation": snapshot.generation if snapshot else None}
+
+
+@app.get("/ready")
+def ready():
+    return JSONResponse(status_code=200 if startup.ready else 503, content=startup.readiness())
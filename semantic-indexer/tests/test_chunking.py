@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from chunking import estimate_tokens, make_chunker, model_token_counter, sections
+
+REPORT = """COMPTE RENDU DE CONSULTATION
+
+Motif : douleurs thoraciques depuis trois jours. Pas de fièvre.
+
+ANTÉCÉDENTS :
+Diabète de type 2 traité par metformine 850 mg. HTA sous amlodipine 5 mg.
+Tabagisme sevré en 2015.
+
+Conclusion :
+Syndrome coronarien à éliminer. ECG et troponine demandés."""
+
+class TestStructuredChunker(unittest.TestCase):
+
+    def test_chunks_are_exact_slices(self):
+        for chunk in make_chunker("structured", max_tokens=20, overlap_tokens=8).split(REPORT):
+            self.assertEqual(REPORT[chunk.start:chunk.end], chunk.text)
+
+    def test_respects_token_limit(self):
+        chunks = make_chunker("structured", max_tokens=20, overlap_tokens=8).split(REPORT)
+        self.assertTrue(all(estimate_tokens(chunk.text) <= 20 for chunk in chunks))
+
+    def test_does_not_cut_sentences(self):
+        chunks = make_chunker("structured", max_tokens=20, overlap_tokens=0).split(REPORT)
+        self.assertTrue(any("Diabète de type 2 traité par metformine 850 mg." in c.text for c in chunks))
+        # Chaque chunk se termine sur une fin de phrase
+        self.assertTrue(all(chunk.text.endswith(".") for chunk in chunks))
+
+    def test_sections_are_not_mixed(self):
+        chunks = make_chunker("structured", max_tokens=200, overlap_tokens=20).split(REPORT)
+        self.assertEqual(len(chunks), 3)
+        # Titre isolé rattaché à la section qui suit
+        self.assertTrue(chunks[0].text.startswith("COMPTE RENDU DE CONSULTATION\n\nMotif"))
+        self.assertTrue(chunks[1].text.startswith("ANTÉCÉDENTS :"))
+        self.assertTrue(chunks[2].text.startswith("Conclusion :"))
+
+    def test_overlap_between_consecutive_chunks(self):
+        chunks = make_chunker("structured", max_tokens=20, overlap_tokens=8).split(REPORT)
+        overlapping = [(a, b) for a, b in zip(chunks, chunks[1:]) if b.start < a.end]
+        self.assertTrue(overlapping)
+        for previous, current in overlapping:
+            # Recouvrement de phrases entières, dans le budget
+            self.assertTrue(previous.text.endswith(REPORT[current.start:previous.end]))
+            self.assertLessEqual(estimate_tokens(REPORT[current.start:previous.end]), 8)
+
+    def test_long_sentence_split_on_whitespace(self):
+        text = " ".join(f"mot{i}" for i in range(100))
+        chunks = make_chunker("structured", max_tokens=30, overlap_tokens=0).split(text)
+        self.assertGreater(len(chunks), 3)
+        self.assertEqual(" ".join(c.text for c in chunks), text)
+
+    def test_empty_text(self):
+        self.assertEqual(make_chunker("structured").split("  \n\n "), [])
+
+    def test_invalid_overlap(self):
+        with self.assertRaises(ValueError):
+            make_chunker("structured", max_tokens=10, overlap_tokens=10)
+
+class TestChunkingHelpers(unittest.TestCase):
+
+    def test_fixed_chunker_matches_legacy_slicing(self):
+        text = "x" * 1234
+        chunks = make_chunker("fixed", chunk_chars=500).split(text)
+        self.assertEqual([c.text for c in chunks], [text[i:i + 500] for i in range(0, len(text), 500)])
+        self.assertEqual(chunks[-1].end, 1234)
+
+    def test_unknown_chunker(self):
+        with self.assertRaises(ValueError):
+            make_chunker("semantic")
+
+    def test_sections_split_on_headings(self):
+        text = "# Examen\nNormal.\nTRAITEMENT\nParacétamol."
+        self.assertEqual([text[s:e] for s, e in sections(text)], ["# Examen\nNormal.", "TRAITEMENT\nParacétamol."])
+
+    def test_model_token_counter(self):
+        class Tokenizer:
+            def tokenize(self, text):
+                return list(text)
+
+        class Model:
+            tokenizer = Tokenizer()
+
+        self.assertEqual(model_token_counter(Model())("abc"), 3)
+        self.assertIs(model_token_counter(object()), estimate_tokens)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import json
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from columnar_store import ColumnarMetadataStore, check_record, oversized_fields
+
+def make_record(i):
+    return {"doc_id": f"DOC{i}", "text_content": f"Texte du chunk {i} — Qì", "source": "src.csv", "type": "knowledge_base"}
+
+class TestColumnarMetadataStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "store")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_roundtrip(self):
+        records = [make_record(i) for i in range(3)]
+        ColumnarMetadataStore.from_records(self.path, records).close()
+
+        store = ColumnarMetadataStore(self.path, readonly=True)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(list(store), records)
+        self.assertEqual(store.text(2), records[2]["text_content"])
+        self.assertEqual(store[-1]["doc_id"], "DOC2")
+        store.close()
+
+    def test_pending_visible_after_flush_and_reload(self):
+        writer = ColumnarMetadataStore(self.path)
+        writer.extend([make_record(0), make_record(1)])
+        writer.flush()
+        reader = ColumnarMetadataStore(self.path, readonly=True)
+
+        writer.append(make_record(2))
+        self.assertEqual(len(writer), 3)
+        self.assertEqual(writer[2]["text_content"], make_record(2)["text_content"])
+        self.assertEqual(len(reader), 2)
+
+        writer.flush()
+        reader.reload()
+        self.assertEqual(reader[2], make_record(2))
+        writer.close()
+        reader.close()
+
+    def test_truncate(self):
+        store = ColumnarMetadataStore.from_records(self.path, [make_record(i) for i in range(4)])
+        del store[2:]
+        store.append(make_record(9))
+        store.flush()
+
+        self.assertEqual([r["doc_id"] for r in ColumnarMetadataStore(self.path)], ["DOC0", "DOC1", "DOC9"])
+        store.close()
+
+    def test_long_values_truncated_to_column_width(self):
+        record = dict(make_record(0), source="é" * 100)
+        store = ColumnarMetadataStore.from_records(self.path, [record])
+        self.assertEqual(store[0]["source"], "é" * 32)
+        store.close()
+
+    def test_long_keys_rejected(self):
+        record = dict(make_record(0), patient_id="P" * 65, source="s" * 100)
+        self.assertEqual(oversized_fields(record), ["source", "patient_id"])
+        # source est tronquée (descriptive) ; patient_id tronqué désignerait un autre patient
+        with self.assertRaisesRegex(ValueError, "patient_id"):
+            check_record(record)
+        check_record(dict(record, patient_id="P" * 64))
+
+    def test_readonly_flush_rejected(self):
+        store = ColumnarMetadataStore(self.path, readonly=True)
+        store.append(make_record(0))
+        with self.assertRaises(PermissionError):
+            store.flush()
+
+    def test_position_columns(self):
+        positioned = dict(make_record(1), chunk_index=2, char_start=480, char_end=910)
+        ColumnarMetadataStore.from_records(self.path, [make_record(0), positioned]).close()
+
+        store = ColumnarMetadataStore(self.path, readonly=True)
+        # Absentes des records sans position, entières sinon
+        self.assertEqual(list(store), [make_record(0), positioned])
+        store.close()
+
+    def test_existing_store_gains_new_columns(self):
+        ColumnarMetadataStore.from_records(self.path, [make_record(0)]).close()
+        # Store créé avant les colonnes de position
+        manifest_path = os.path.join(self.path, "store.json")
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for name in ("chunk_index", "char_start", "char_end"):
+            del manifest["columns"][name]
+            os.remove(os.path.join(self.path, f"{name}.col"))
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+
+        reader = ColumnarMetadataStore(self.path, readonly=True)
+        self.assertEqual(reader[0], make_record(0))
+        reader.close()
+
+        writer = ColumnarMetadataStore(self.path)
+        writer.append(dict(make_record(1), chunk_index=0, char_start=0, char_end=12))
+        writer.flush()
+        writer.close()
+
+        store = ColumnarMetadataStore(self.path, readonly=True)
+        self.assertEqual(store[0], make_record(0))
+        self.assertEqual(store[1]["char_end"], 12)
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()
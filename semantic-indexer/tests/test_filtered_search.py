@@ -0,0 +1,234 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+
+import faiss
+import numpy as np
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from columnar_store import ColumnarMetadataStore
+from filtered_search import MetadataFilterIndex, filtered_search
+from index_factory import build_index, train_index
+from manifest import write_manifest
+import search_service
+
+def make_records():
+    """P1 : 3 chunks (2 CR, 1 ordonnance), P2 : 2 chunks, 1 chunk de base de connaissances"""
+    return [
+        {"doc_id": "1", "text_content": "cr p1", "source": "s", "type": "patient_file",
+         "patient_id": "P1", "doc_type": "CR", "date": "2024-01-10"},
+        {"doc_id": "KB_MTC", "text_content": "kb", "source": "kb.csv", "type": "knowledge_base"},
+        {"doc_id": "2", "text_content": "cr p2", "source": "s", "type": "patient_file",
+         "patient_id": "P2", "doc_type": "CR", "date": "2024-02-01"},
+        {"doc_id": "3", "text_content": "ordo p1", "source": "s", "type": "patient_file",
+         "patient_id": "P1", "doc_type": "ORDONNANCE", "date": "2024-03-05"},
+        {"doc_id": "4", "text_content": "cr p1 bis", "source": "s", "type": "patient_file",
+         "patient_id": "P1", "doc_type": "CR", "date": "2024-06-20"},
+        {"doc_id": "5", "text_content": "cr p2 bis", "source": "s", "type": "patient_file",
+         "patient_id": "P2", "doc_type": "CR", "date": "2024-06-21"},
+    ]
+
+class TestMetadataFilterIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.store = ColumnarMetadataStore.from_records(os.path.join(self.tmp_dir, "store"), make_records())
+        self.filters = MetadataFilterIndex()
+        self.filters.sync(self.store)
+
+    def test_patient(self):
+        self.assertEqual(self.filters.candidates(patient_id="P1").tolist(), [0, 3, 4])
+        self.assertEqual(self.filters.candidates(patient_id="inconnu").tolist(), [])
+
+    def test_no_filter(self):
+        self.assertIsNone(self.filters.candidates())
+
+    def test_combined_filters(self):
+        self.assertEqual(self.filters.candidates("P1", doc_types=["CR"]).tolist(), [0, 4])
+        self.assertEqual(self.filters.candidates("P1", from_date="2024-02-01", to_date="2024-06-20").tolist(), [3, 4])
+        self.assertEqual(self.filters.candidates(doc_types=["CR", "ORDONNANCE"], to_date="2024-03-31").tolist(), [0, 2, 3])
+        # Horodatage complet accepté, comparé sur la date
+        self.assertEqual(self.filters.candidates("P2", from_date="2024-06-21T08:00:00").tolist(), [5])
+
+    def test_incremental_sync(self):
+        self.store.close()
+        writer = ColumnarMetadataStore(os.path.join(self.tmp_dir, "store"))
+        writer.append(dict(make_records()[0], doc_id="6", date="2025-01-01"))
+        writer.flush()
+
+        self.assertEqual(self.filters.sync(writer), 1)
+        self.assertEqual(self.filters.sync(writer), 0)
+        self.assertEqual(self.filters.candidates(patient_id="P1").tolist(), [0, 3, 4, 6])
+        self.assertEqual(self.filters.stats()["dates"], 6)
+        writer.close()
+
+    def test_sync_limited_to_index_size(self):
+        filters = MetadataFilterIndex()
+        filters.sync(self.store, limit=3)
+        self.assertEqual(filters.candidates(patient_id="P1").tolist(), [0])
+
+class TestFilteredSearch(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(2000, 16)).astype('float32')
+        self.ids = np.sort(rng.choice(2000, 60, replace=False)).astype('int64')
+        self.query = self.vectors[self.ids[7]] + 0.01
+
+    def expected(self, k):
+        distances = ((self.vectors[self.ids] - self.query) ** 2).sum(axis=1)
+        return self.ids[np.argsort(distances)[:k]].tolist()
+
+    def index(self, mode):
+        index = build_index(mode, 16, len(self.vectors), nlist=32)
+        train_index(index, self.vectors)
+        index.add(self.vectors)
+        return index
+
+    def test_exact_path_on_flat(self):
+        distances, labels = filtered_search(self.index("flat"), self.query, self.ids, 5)
+        self.assertEqual(labels.tolist(), self.expected(5))
+        self.assertTrue(np.all(np.diff(distances) >= 0))
+
+    def test_selector_path_matches_exact(self):
+        index = self.index("flat")
+        _, exact = filtered_search(index, self.query, self.ids, 5)
+        _, selected = filtered_search(index, self.query, self.ids, 5, exact_max_candidates=0)
+        self.assertEqual(selected.tolist(), exact.tolist())
+
+    def test_ivf_widens_probes_for_selective_filter(self):
+        index = self.index("ivf_flat")
+        index.nprobe = 1
+        _, labels = filtered_search(index, self.query, self.ids, 10)
+        self.assertEqual(len(labels), 10)
+        self.assertTrue(set(labels.tolist()) <= set(self.ids.tolist()))
+        self.assertEqual(labels[0], self.ids[7])
+
+    def test_hnsw(self):
+        _, labels = filtered_search(self.index("hnsw"), self.query, self.ids, 3)
+        self.assertEqual(labels.tolist(), self.expected(3))
+
+    def test_fewer_candidates_than_k(self):
+        _, labels = filtered_search(self.index("flat"), self.query, self.ids[:2], 10)
+        self.assertEqual(sorted(labels.tolist()), self.ids[:2].tolist())
+
+    def test_empty_candidates(self):
+        _, labels = filtered_search(self.index("flat"), self.query, np.zeros(0, dtype='int64'), 5)
+        self.assertEqual(len(labels), 0)
+
+    def test_unfiltered(self):
+        _, labels = filtered_search(self.index("flat"), self.vectors[3], None, 1)
+        self.assertEqual(labels.tolist(), [3])
+
+class TestSearchService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        paths = {
+            "INDEX_FILE": os.path.join(self.tmp_dir, "vector_store.faiss"),
+            "METADATA_DIR": os.path.join(self.tmp_dir, "metadata_store"),
+            "MANIFEST_PATH": os.path.join(self.tmp_dir, "index_manifest.json"),
+        }
+        for name, value in paths.items():
+            patcher = patch.object(search_service, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        records = make_records()
+        self.vectors = np.eye(len(records), 8, dtype='float32')
+        ColumnarMetadataStore.from_records(paths["METADATA_DIR"], records).close()
+        index = faiss.IndexFlatL2(8)
+        index.add(self.vectors)
+        faiss.write_index(index, paths["INDEX_FILE"])
+        write_manifest(paths["MANIFEST_PATH"], generation=1, vectors=len(records))
+
+    def test_snapshot_focus_search(self):
+        snapshot = search_service.load_snapshot()
+        ids = snapshot.candidates(patient_id="P1")
+        snippets = snapshot.search(ids, self.vectors[3], k=2, query_text="ordo", mode="dense")
+        self.assertEqual([s["doc_id"] for s in snippets], ["3", "1"])
+        self.assertEqual(snippets[0]["doc_type"], "ORDONNANCE")
+        self.assertEqual(snippets[0]["score"], 0.0)
+
+    def test_snapshot_hybrid_search(self):
+        snapshot = search_service.load_snapshot()
+        # Le vecteur désigne le chunk 0, le texte "ordo" le chunk 3 : les deux ressortent
+        snippets = snapshot.search(snapshot.candidates(patient_id="P1"), self.vectors[0], k=2, query_text="ordo")
+        self.assertEqual({s["doc_id"] for s in snippets}, {"1", "3"})
+        self.assertEqual(snapshot.lexical.size, 6)
+
+    def test_reload_extends_previous_indexes(self):
+        previous = search_service.load_snapshot()
+        snapshot = search_service.load_snapshot(previous)
+        self.assertIs(snapshot.filters, previous.filters)
+        self.assertIs(snapshot.lexical, previous.lexical)
+
+    def test_snapshot_latest_without_focus(self):
+        snapshot = search_service.load_snapshot()
+        snippets = snapshot.search(snapshot.candidates(patient_id="P1"), None, k=2)
+        self.assertEqual([s["date"] for s in snippets], ["2024-03-05", "2024-06-20"])
+        self.assertNotIn("score", snippets[0])
+
+    def test_candidates_clipped_to_index(self):
+        snapshot = search_service.load_snapshot()
+        snapshot.filters.extend(["P1"], ["CR"], ["2025-01-01"])
+        self.assertEqual(snapshot.candidates(patient_id="P1").tolist(), [0, 3, 4])
+
+    def test_endpoint(self):
+        from fastapi.testclient import TestClient
+
+        model = MagicMock()
+        model.encode.return_value = self.vectors[[4]]
+        startup = MagicMock(ready=True)
+        with patch.object(search_service, "snapshot", search_service.load_snapshot()), \
+                patch.object(search_service, "model", model), \
+                patch.object(search_service, "startup", startup):
+            client = TestClient(search_service.app)
+            response = client.get("/api/search/patient-snippets", params={
+                "patient_id": "P1", "focus": "bilan", "doc_type": ["CR"], "k": 1
+            })
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([s["doc_id"] for s in response.json()], ["4"])
+
+            response = client.get("/api/search/patient-snippets", params={"patient_id": "P9", "focus": "bilan"})
+            self.assertEqual(response.json(), [])
+
+            response = client.get("/api/search", params={"q": "ordo p1", "mode": "lexical", "k": 1})
+            self.assertEqual([s["doc_id"] for s in response.json()], ["3"])
+            self.assertEqual(model.encode.call_count, 1)
+
+            response = client.get("/api/search", params={"q": "ordo", "mode": "bm25"})
+            self.assertEqual(response.status_code, 422)
+
+            response = client.post("/api/search/batch", json={
+                "queries": [{"q": "ordo"}, {"q": "cr p2 bis", "vector": self.vectors[5].tolist()}],
+                "k": 1, "mode": "dense"
+            })
+            body = response.json()
+            self.assertEqual(body["generation"], 1)
+            # Seule la requête sans vecteur est encodée
+            self.assertEqual(model.encode.call_args[0][0], ["ordo"])
+            self.assertEqual([r[0]["doc_id"] for r in body["results"]], ["4", "5"])
+
+            response = client.post("/api/search/batch", json={"queries": [{"q": "x", "vector": [1.0]}]})
+            self.assertEqual(response.status_code, 422)
+
+            model.encode.return_value = self.vectors[[0, 1]]
+            response = client.post("/api/embed", json={"texts": ["a", "b"]})
+            self.assertEqual(response.json()["vectors"][1], self.vectors[1].tolist())
+
+            startup.ready = False
+            startup.error = None
+            startup.current_phase = "index"
+            response = client.get("/api/search/patient-snippets", params={"patient_id": "P1"})
+            self.assertEqual(response.status_code, 503)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+
+import faiss
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from hybrid_search import hybrid_search, hybrid_search_batch, reciprocal_rank_fusion
+from lexical_index import LexicalIndex, tokenize
+
+TEXTS = [
+    "ANALYSE SCORE MTC : Syndrome 'Vide de Qi'. Plante recommandée : Astragalus membranaceus (黄芪).",
+    "ANALYSE SCORE MTC : Syndrome 'Vide de Yang'. Plante recommandée : Cordyceps sinensis.",
+    "DÉTAIL CLINIQUE : Syndrome 'Stase de Sang'. Plante : Angelica sinensis. Rôle : Empereur.",
+    "Le patient prend de la metformine 850 mg matin et soir.",
+]
+
+class TestLexicalIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.lexical = LexicalIndex()
+        self.lexical.extend(TEXTS)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Détail de l'Anémie du Foie"), ["detail", "anemie", "foie"])
+
+    def test_exact_terms(self):
+        _, ids = self.lexical.search("Quelle est la posologie de metformine ?", 3)
+        self.assertEqual(ids.tolist(), [3])
+        _, ids = self.lexical.search("astragalus", 3)
+        self.assertEqual(ids.tolist(), [0])
+
+    def test_rarer_term_ranks_first(self):
+        # "sinensis" apparaît dans deux chunks, "angelica" dans un seul
+        scores, ids = self.lexical.search("angelica sinensis", 3)
+        self.assertEqual(ids.tolist()[0], 2)
+        self.assertEqual(sorted(ids.tolist()), [1, 2])
+        self.assertGreater(scores[0], scores[1])
+
+    def test_candidates_and_limit(self):
+        _, ids = self.lexical.search("sinensis", 3, ids=np.array([1, 3]))
+        self.assertEqual(ids.tolist(), [1])
+        _, ids = self.lexical.search("sinensis", 3, limit=2)
+        self.assertEqual(ids.tolist(), [1])
+
+    def test_incremental(self):
+        self.lexical.search("ginseng", 1)
+        self.lexical.extend(["Panax ginseng, Empereur"])
+        _, ids = self.lexical.search("ginseng", 1)
+        self.assertEqual(ids.tolist(), [4])
+        self.assertEqual(self.lexical.stats()["chunks"], 5)
+
+    def test_no_match(self):
+        _, ids = self.lexical.search("de la", 3)
+        self.assertEqual(len(ids), 0)
+
+class TestHybridSearch(unittest.TestCase):
+
+    def test_rrf(self):
+        scores, ids = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+        self.assertEqual(ids.tolist(), [1, 3, 2])
+        self.assertAlmostEqual(scores[0], 1 / 61 + 1 / 62, places=6)
+
+    def test_modes(self):
+        index = faiss.IndexFlatL2(4)
+        index.add(np.eye(4, dtype='float32'))
+        lexical = LexicalIndex()
+        lexical.extend(TEXTS)
+        query_vector = np.eye(4, dtype='float32')[1]
+
+        _, dense = hybrid_search(index, lexical, "metformine", query_vector, 1, mode="dense")
+        _, lexical_ids = hybrid_search(index, lexical, "metformine", query_vector, 1, mode="lexical")
+        _, hybrid = hybrid_search(index, lexical, "metformine", query_vector, 2, mode="hybrid")
+        self.assertEqual(dense.tolist(), [1])
+        self.assertEqual(lexical_ids.tolist(), [3])
+        self.assertEqual(sorted(hybrid.tolist()), [1, 3])
+
+        _, restricted = hybrid_search(index, lexical, "metformine", query_vector, 2, ids=np.array([0, 1]))
+        self.assertEqual(restricted.tolist()[0], 1)
+
+        with self.assertRaises(ValueError):
+            hybrid_search(index, lexical, "metformine", query_vector, 1, mode="bm25")
+
+    def test_batch_matches_single_queries_with_one_search(self):
+        index = faiss.IndexFlatL2(4)
+        index.add(np.eye(4, dtype='float32'))
+        lexical = LexicalIndex()
+        lexical.extend(TEXTS)
+        texts = ["metformine", "astragalus", "angelica sinensis"]
+        vectors = np.eye(4, dtype='float32')[[1, 0, 2]]
+
+        search_calls = []
+        search = index.search
+        index.search = lambda x, k, **kw: search_calls.append(len(x)) or search(x, k, **kw)
+        for mode in ("dense", "lexical", "hybrid"):
+            search_calls.clear()
+            batch = hybrid_search_batch(index, lexical, texts, vectors, 2, mode=mode)
+            self.assertEqual(search_calls, [] if mode == "lexical" else [3])
+            for text, vector, (_, ids) in zip(texts, vectors, batch):
+                _, expected = hybrid_search(index, lexical, text, vector, 2, mode=mode)
+                self.assertEqual(ids.tolist(), expected.tolist())
+
+if __name__ == '__main__':
+    unittest.main()
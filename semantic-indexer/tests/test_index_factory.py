@@ -0,0 +1,53 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import index_factory
+
+class TestIndexFactory(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.random((2000, 48), dtype='float32')
+        self.flat = index_factory.build_index("flat", 48)
+        self.flat.add(self.vectors)
+
+    def test_build_index_modes(self):
+        for mode in index_factory.INDEX_MODES:
+            index = index_factory.build_index(mode, 48, n_vectors=2000)
+            self.assertEqual(index_factory.index_mode(index), mode)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            index_factory.build_index("lsh", 48, n_vectors=2000)
+
+    def test_migrate_keeps_vector_order(self):
+        for mode in ("ivf_flat", "hnsw"):
+            migrated = index_factory.migrate_index(self.flat, mode)
+            self.assertEqual(index_factory.index_mode(migrated), mode)
+            self.assertEqual(migrated.ntotal, 2000)
+            # Les positions FAISS restent celles du store de métadonnées
+            np.testing.assert_allclose(index_factory.extract_vectors(migrated), self.vectors)
+            _, ids = migrated.search(self.vectors[:5], 1)
+            self.assertEqual(ids[:, 0].tolist(), [0, 1, 2, 3, 4])
+
+    def test_migrate_too_small_keeps_index(self):
+        small = index_factory.build_index("flat", 48)
+        small.add(self.vectors[:100])
+        # IVF-PQ a besoin de bien plus de points pour entraîner ses codebooks
+        self.assertIs(index_factory.migrate_index(small, "ivf_pq"), small)
+
+    def test_configure_search(self):
+        ivf = index_factory.migrate_index(self.flat, "ivf_flat", nlist=8)
+        index_factory.configure_search(ivf, nprobe=4)
+        self.assertEqual(ivf.nprobe, 4)
+        hnsw = index_factory.migrate_index(self.flat, "hnsw")
+        index_factory.configure_search(hnsw, ef_search=128)
+        self.assertEqual(hnsw.hnsw.efSearch, 128)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import json
+import tempfile
 import numpy as np
 
 # Add parent directory to path
@@ -16,11 +18,27 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 # To test `add_to_index`, we need to import it. Importing it will trigger the model load.
 # We can mock `sentence_transformers.SentenceTransformer` in `sys.modules` before importing `indexer`.
 
+_real_modules = {name: sys.modules.get(name) for name in ('sentence_transformers', 'faiss')}
 sys.modules['sentence_transformers'] = MagicMock()
 sys.modules['faiss'] = MagicMock()
+# index_factory relies on isinstance() checks: give it real types, and no IVF in the mocked index
+for index_class in ("IndexHNSW", "IndexHNSWFlat", "IndexIVFPQ", "IndexIVFFlat"):
+    setattr(sys.modules['faiss'], index_class, type(index_class, (), {}))
+sys.modules['faiss'].try_extract_index_ivf.return_value = None
+# Make sure index_factory is (re)imported against the mocked faiss
+sys.modules.pop('index_factory', None)
 
 # Now import the module under test
 import indexer
+from docqa_common.segment_protocol import BlobStore
+
+# Other test modules use the real libraries
+sys.modules.pop('index_factory', None)
+for name, module in _real_modules.items():
+    if module is None:
+        sys.modules.pop(name, None)
+    else:
+        sys.modules[name] = module
 
 class TestIndexer(unittest.TestCase):
 
@@ -35,19 +53,22 @@ class TestIndexer(unittest.TestCase):
         # Setup
         text = "Test sentence"
         source = "test_source.txt"
-        fake_embedding = [0.1, 0.2, 0.3]
-        indexer.model.encode.return_value = fake_embedding
+        indexer.model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 3))
         
         mock_faiss_index = MagicMock()
+        mock_faiss_index.ntotal = 0
         indexer.faiss.IndexFlatL2.return_value = mock_faiss_index
         
         # Execute
-        indexer.add_to_index(text, source)
+        with patch.object(indexer, 'wal') as mock_wal:
+            indexer.add_to_index(text, source)
         
         # Verify
-        indexer.model.encode.assert_called_with([text])
-        indexer.faiss.IndexFlatL2.assert_called_once() # Should be called to create index
+        indexer.model.encode.assert_called_once()
+        indexer.faiss.IndexFlatL2.assert_called() # Should be called to create index
         mock_faiss_index.add.assert_called_once()
+        # Journalisé avant l'ajout, comme les chunks patients
+        mock_wal.append.assert_called_once()
         
         # Verify metadata
         self.assertEqual(len(indexer.metadata_store), 1)
@@ -58,5 +79,109 @@ class TestIndexer(unittest.TestCase):
         indexer.add_to_index("   ", "source")
         self.assertEqual(len(indexer.metadata_store), 0)
 
+    def test_batch_ingestor_encodes_per_batch(self):
+        indexer.model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 3))
+        mock_faiss_index = MagicMock()
+        indexer.faiss.IndexFlatL2.return_value = mock_faiss_index
+
+        with indexer.BatchIngestor(batch_size=2) as ingestor:
+            for i in range(5):
+                ingestor.add(f"text {i}", "source.csv")
+            ingestor.add("   ", "source.csv")
+
+        # 5 textes en lots de 2 -> 3 appels (2 + 2 + 1 vidé à la sortie)
+        self.assertEqual(indexer.model.encode.call_count, 3)
+        self.assertEqual(mock_faiss_index.add.call_count, 3)
+        self.assertEqual(ingestor.count, 5)
+        self.assertEqual([m['text_content'] for m in indexer.metadata_store],
+                         [f"text {i}" for i in range(5)])
+
+    @patch('indexer.index_patient_text')
+    def test_callback_indexes_segment_from_blob_store(self, mock_index):
+        with tempfile.TemporaryDirectory() as blob_dir:
+            store = BlobStore(blob_dir)
+            ref = store.put("masked/9/000000.txt", "Patient <PERSON>, HTA.")
+            channel, method = MagicMock(), MagicMock()
+            body = json.dumps({"kind": "segment", "doc_id": 9, "seq": 0, "blob": ref,
+                               "char_offset": 0, "length": 21, "metadata": {}})
+
+            with patch.object(indexer, 'blob_store', store):
+                indexer.callback(channel, method, None, body)
+
+            mock_index.assert_called_once_with(9, "Patient <PERSON>, HTA.", char_offset=0, first_chunk=0, metadata={})
+            channel.basic_ack.assert_called_once()
+            # Segment consommé : blob supprimé
+            self.assertFalse(os.path.exists(os.path.join(blob_dir, "masked", "9", "000000.txt")))
+
+    @patch('indexer.index_patient_text')
+    def test_callback_acks_header_and_end(self, mock_index):
+        channel = MagicMock()
+        for message in ({"kind": "header", "doc_id": 9, "metadata": {}, "total_chars": 0},
+                        {"kind": "end", "doc_id": 9, "segments": 0}):
+            indexer.callback(channel, MagicMock(), None, json.dumps(message))
+
+        mock_index.assert_not_called()
+        self.assertEqual(channel.basic_ack.call_count, 2)
+
+    @patch('indexer.wal', MagicMock())
+    def test_index_patient_text_stores_positions(self):
+        indexer.model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 3))
+        text = "ANTÉCÉDENTS :\nDiabète de type 2.\n\nTRAITEMENT :\nMetformine 850 mg."
+
+        with patch.object(indexer, 'chunker', indexer.make_chunker("structured", max_tokens=20, overlap_tokens=5)):
+            count = indexer.index_patient_text(42, text, char_offset=1000, first_chunk=3)
+
+        self.assertEqual(count, 2)
+        records = list(indexer.metadata_store)
+        # doc_id du document (et non plus "KB_MTC"), positions relatives au document complet
+        self.assertEqual([r['doc_id'] for r in records], ["42", "42"])
+        self.assertEqual([r['chunk_index'] for r in records], [3, 4])
+        for record in records:
+            start, end = record['char_start'] - 1000, record['char_end'] - 1000
+            self.assertEqual(text[start:end], record['text_content'])
+
+    @patch('indexer.wal', MagicMock())
+    def test_chunk_ordinals_continue_across_segments(self):
+        indexer.model.encode.side_effect = lambda texts, batch_size: np.zeros((len(texts), 3))
+        segments = ["Motif : toux.\n\n", "Examen : normal."]
+        with tempfile.TemporaryDirectory() as blob_dir:
+            store = BlobStore(blob_dir)
+            offset = 0
+            with patch.object(indexer, 'blob_store', store):
+                for seq, segment in enumerate(segments):
+                    ref = store.put(f"masked/7/{seq:06d}.txt", segment)
+                    indexer.callback(MagicMock(), MagicMock(), None, json.dumps({
+                        "kind": "segment", "doc_id": 7, "seq": seq, "blob": ref,
+                        "char_offset": offset, "length": len(segment), "metadata": {}
+                    }))
+                    offset += len(segment)
+                indexer.callback(MagicMock(), MagicMock(), None, json.dumps({"kind": "end", "doc_id": 7, "segments": 2}))
+
+        records = list(indexer.metadata_store)
+        self.assertEqual([r['chunk_index'] for r in records], [0, 1])
+        self.assertEqual([(r['char_start'], r['char_end']) for r in records], [(0, 13), (15, 31)])
+        self.assertNotIn(7, indexer.chunk_counters)
+
+    def test_oversized_patient_id_rejected_before_wal(self):
+        with patch.object(indexer, 'wal') as mock_wal:
+            with self.assertRaises(ValueError):
+                with indexer.BatchIngestor(wal=mock_wal) as ingestor:
+                    ingestor.add("texte", "Dossier Patient 1", "patient_file", doc_id="1", fields={"patient_id": "P" * 65})
+
+        indexer.model.encode.assert_not_called()
+        mock_wal.append.assert_not_called()
+        self.assertEqual(len(indexer.metadata_store), 0)
+
+    def test_replay_wal_trims_metadata_without_segments(self):
+        # Crash après le flush des métadonnées, avant l'écriture de l'index, journal déjà compacté
+        indexer.index = MagicMock(ntotal=2)
+        indexer.metadata_store = [{"text_content": t} for t in ("a", "b", "orphelin")]
+
+        with patch.object(indexer, 'wal') as mock_wal:
+            mock_wal.segments.return_value = []
+            self.assertEqual(indexer.replay_wal(), 0)
+
+        self.assertEqual([m["text_content"] for m in indexer.metadata_store], ["a", "b"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from manifest import read_manifest, write_manifest
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "index_manifest.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_missing_manifest_is_generation_zero(self):
+        self.assertEqual(read_manifest(self.path), {"generation": 0})
+
+    def test_write_then_read(self):
+        write_manifest(self.path, generation=3, ntotal=649)
+        manifest = read_manifest(self.path)
+        self.assertEqual(manifest["generation"], 3)
+        self.assertEqual(manifest["ntotal"], 649)
+        self.assertIn("updated_at", manifest)
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+
+if __name__ == '__main__':
+    unittest.main()
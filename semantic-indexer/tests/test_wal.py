@@ -0,0 +1,60 @@
+import unittest
+import sys
+import os
+import tempfile
+import shutil
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from wal import SegmentedWAL
+
+class TestSegmentedWAL(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.wal = SegmentedWAL(os.path.join(self.tmp_dir, "wal"))
+
+    def tearDown(self):
+        self.wal.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_append_and_replay(self):
+        vectors = np.arange(6, dtype='float32').reshape(2, 3)
+        self.wal.append(0, vectors, [{"text_content": "a"}, {"text_content": "b"}])
+        self.wal.append(2, vectors[:1], [{"text_content": "c"}])
+
+        records = list(SegmentedWAL(self.wal.directory).replay())
+
+        self.assertEqual([r[0] for r in records], [0, 2])
+        np.testing.assert_array_equal(records[0][1], vectors)
+        self.assertEqual(records[1][2], [{"text_content": "c"}])
+
+    def test_replay_ignores_torn_record(self):
+        vectors = np.ones((1, 3), dtype='float32')
+        self.wal.append(0, vectors, [{"text_content": "a"}])
+        self.wal.append(1, vectors, [{"text_content": "b"}])
+        self.wal.close()
+
+        # Simule un crash au milieu de l'écriture du second enregistrement
+        segment = os.path.join(self.wal.directory, "segment_000001.log")
+        with open(segment, "r+b") as f:
+            f.truncate(os.path.getsize(segment) - 5)
+
+        records = list(SegmentedWAL(self.wal.directory).replay())
+        self.assertEqual(len(records), 1)
+
+    def test_rotate_and_drop(self):
+        vectors = np.ones((1, 3), dtype='float32')
+        self.wal.append(0, vectors, [{}])
+        sealed = self.wal.rotate()
+        self.wal.append(1, vectors, [{}])
+
+        self.wal.drop_until(sealed)
+
+        self.assertEqual(self.wal.segments(), [2])
+        self.assertEqual([r[0] for r in self.wal.replay()], [1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import glob
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+# Format d'un enregistrement du journal :
+#   en-tête  : magic (4s) | start_id (Q) | n vecteurs (I) | dimension (I) | taille meta (I) | crc32 (I)
+#   payload  : n * dimension float32, puis les métadonnées en JSON (utf-8)
+# `start_id` est la position FAISS du premier vecteur : le rejeu est idempotent
+# (un enregistrement déjà présent dans l'index compacté est simplement ignoré).
+RECORD_MAGIC = b"WAL1"
+RECORD_HEADER = struct.Struct("<4sQIIII")
+SEGMENT_PATTERN = "segment_*.log"
+
+
+class SegmentedWAL:
+    """Journal append-only des vecteurs et métadonnées, découpé en segments.
+
+    Chaque message ajoute un enregistrement au segment actif (coût constant,
+    indépendant de la taille du corpus). La compaction scelle le segment actif
+    via `rotate()`, réécrit l'index principal, puis supprime les segments
+    scellés avec `drop_until()`.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        existing = self.segments()
+        # On n'écrit jamais à la suite d'un segment existant (queue potentiellement tronquée)
+        self.active_seq = (existing[-1] + 1) if existing else 1
+        self._active = None
+
+    def _segment_path(self, seq):
+        return os.path.join(self.directory, f"segment_{seq:06d}.log")
+
+    def segments(self):
+        """Numéros des segments présents sur disque, triés"""
+        paths = glob.glob(os.path.join(self.directory, SEGMENT_PATTERN))
+        return sorted(int(os.path.basename(p)[len("segment_"):-len(".log")]) for p in paths)
+
+    def append(self, start_id, vectors, metadatas):
+        """Ajoute un enregistrement et le force sur disque (fsync)"""
+        vectors = np.ascontiguousarray(vectors, dtype='float32')
+        if vectors.ndim != 2 or vectors.shape[0] != len(metadatas):
+            raise ValueError("vecteurs et métadonnées incohérents")
+
+        meta_bytes = json.dumps(metadatas, ensure_ascii=False).encode("utf-8")
+        payload = vectors.tobytes() + meta_bytes
+        header = RECORD_HEADER.pack(
+            RECORD_MAGIC, start_id, vectors.shape[0], vectors.shape[1],
+            len(meta_bytes), zlib.crc32(payload)
+        )
+
+        if self._active is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._active = open(self._segment_path(self.active_seq), "ab")
+        self._active.write(header + payload)
+        self._active.flush()
+        os.fsync(self._active.fileno())
+
+    def rotate(self):
+        """Scelle le segment actif et retourne son numéro"""
+        sealed = self.active_seq
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+        self.active_seq += 1
+        return sealed
+
+    def replay(self):
+        """Itère sur (start_id, vecteurs, métadonnées) de tous les segments, dans l'ordre.
+
+        Un enregistrement incomplet ou corrompu (crash pendant l'écriture)
+        termine la lecture du segment concerné.
+        """
+        for seq in self.segments():
+            with open(self._segment_path(seq), "rb") as f:
+                while True:
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    magic, start_id, n, dim, meta_len, crc = RECORD_HEADER.unpack(header)
+                    payload = f.read(n * dim * 4 + meta_len)
+                    if magic != RECORD_MAGIC or len(payload) != n * dim * 4 + meta_len \
+                            or zlib.crc32(payload) != crc:
+                        print(f"⚠️ Enregistrement WAL tronqué ignoré (segment {seq})")
+                        break
+                    vectors = np.frombuffer(payload[:n * dim * 4], dtype='float32').reshape(n, dim)
+                    metadatas = json.loads(payload[n * dim * 4:].decode("utf-8"))
+                    yield start_id, vectors, metadatas
+
+    def drop_until(self, seq):
+        """Supprime les segments scellés dont le numéro est <= seq"""
+        for existing in self.segments():
+            if existing <= seq and existing != self.active_seq:
+                os.remove(self._segment_path(existing))
+
+    def close(self):
+        if self._active is not None:
+            self._active.close()
+            self._active = None
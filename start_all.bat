@@ -7,31 +7,38 @@ echo   DEMARRAGE DE L'ARCHITECTURE MICROSERVICES (HYBRIDE)
 echo ========================================================
 echo.
 
+:: Répertoire des segments de texte, partagé par Doc Ingestor, DeID et Semantic Indexer (obligatoire)
+if not defined BLOB_STORE_DIR set "BLOB_STORE_DIR=%~dp0blob_store"
+
 :: 1. Lancement de l'Infrastructure (Docker)
-echo [1/6] Lancement de l'Infrastructure Docker (RabbitMQ, Postgres, Tika)...
+echo [1/7] Lancement de l'Infrastructure Docker (RabbitMQ, Postgres, Tika)...
 docker-compose up -d postgres rabbitmq tika
 echo    -> Attente de 10 secondes pour l'initialisation des bases...
 timeout /t 10 /nobreak >nul
 
 :: 2. Lancement Service 1 : Doc Ingestor
-echo [2/6] Démarrage Doc Ingestor (API)...
+echo [2/7] Démarrage Doc Ingestor (API)...
 start "Service 1: Doc Ingestor" cmd /k "cd doc-ingestor && venv\Scripts\activate &&  uvicorn main:app --reload"
 
 :: 3. Lancement Service 2 : DeID (Anonymisation)
-echo [3/6] Démarrage DeID Service...
+echo [3/7] Démarrage DeID Service...
 start "Service 2: DeID Anonymizer" cmd /k "cd deid-service && venv\Scripts\activate && python anonymizer.py"
 
 :: 4. Lancement Service 3 : Semantic Indexer
-echo [4/6] Démarrage Semantic Indexer...
+echo [4/7] Démarrage Semantic Indexer...
 start "Service 3: Semantic Indexer" cmd /k "cd semantic-indexer && .venv\Scripts\activate && python indexer.py"
 
-:: 5. Lancement Service 4 : LLM QA
-echo [5/6] Démarrage LLM QA (RAG)...
+:: 5. Lancement Service 3 bis : API de recherche (modèle et index chargés une seule fois)
+echo [5/7] Démarrage API de recherche (Semantic Indexer)...
+start "Service 3b: Search API" cmd /k "cd semantic-indexer && .venv\Scripts\activate && uvicorn search_service:app --port 8003"
+
+:: 6. Lancement Service 4 : LLM QA
+echo [6/7] Démarrage LLM QA (RAG)...
 :: Note: On pointe vers localhost pour Ollama
 start "Service 4: LLM QA" cmd /k "cd llm-qa && venv\Scripts\activate && uvicorn main:app --reload --port 8001"
 
-:: 6. Lancement Interface UI
-echo [6/6] Démarrage Interface Clinique...
+:: 7. Lancement Interface UI
+echo [7/7] Démarrage Interface Clinique...
 start "Service UI: Clinical App" cmd /k "cd clinical-ui && venv\Scripts\activate && streamlit run app.py"
 
 echo.
@@ -39,6 +46,7 @@ echo ========================================================
 echo   TOUT EST LANCE !
 echo   - Swagger Ingestion : http://localhost:8000/docs
 echo   - Swagger LLM       : http://localhost:8001/docs
+echo   - Swagger Recherche : http://localhost:8003/docs
 echo   - Interface UI      : http://localhost:8501
 echo   - RabbitMQ Admin    : http://localhost:15672
 echo ========================================================
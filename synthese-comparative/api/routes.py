@@ -55,8 +55,8 @@ async def generate_patient_summary(req: PatientSummaryRequest):
         documents=documents_str,
     )
 
-    # 4. Call the (fake) LLM client
-    summary_text = llm_client.summarize(prompt)
+    # 4. Call the (fake) LLM client (async: other requests keep being served meanwhile)
+    summary_text = await llm_client.summarize(prompt)
 
     # 5. Build the response object
     response = SinglePatientSummaryResponse(
@@ -87,15 +87,14 @@ async def generate_patient_comparison(req: PatientComparisonRequest):
     documents_by_patient_str = ""
     all_sources = []
 
-    # 1. Retrieve docs for each patient and build a big string
-    for pid in req.patient_ids:
-        docs = await retrieval_client.get_patient_documents(
-            patient_id=pid,
-            from_date=req.from_date,
-            to_date=req.to_date,
-            focus=req.focus,
-        )
-
+    # 1. Retrieve docs for all patients concurrently, then build a big string
+    docs_by_patient = await retrieval_client.get_documents_for_patients(
+        patient_ids=req.patient_ids,
+        from_date=req.from_date,
+        to_date=req.to_date,
+        focus=req.focus,
+    )
+    for pid, docs in zip(req.patient_ids, docs_by_patient):
         documents_by_patient_str += f"\n\n=== PATIENT_{pid} ===\n"
         for d in docs:
             documents_by_patient_str += f"[{d.get('doc_id', 'UNKNOWN')}]\n{d.get('text', '')}\n"
@@ -118,7 +117,7 @@ async def generate_patient_comparison(req: PatientComparisonRequest):
     )
 
     # 3. Call the LLM client
-    summary_text = llm_client.summarize(prompt)
+    summary_text = await llm_client.summarize(prompt)
 
     # 4. For the moment, create a simple placeholder comparison table
     comparison_table = [
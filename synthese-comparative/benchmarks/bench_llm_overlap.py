@@ -0,0 +1,74 @@
+"""Benchmark des synthèses simultanées : appels LLM sérialisés vs. asynchrones.
+
+Un faux llm-qa (uvicorn local) répond à /api/llm/summarize après un délai fixe
+(--latency-ms, le temps d'une génération). N synthèses sont lancées en même
+temps ; on mesure le temps total :
+
+  - sérialisé : un appel à la fois (max_concurrency=1), comme l'ancien
+    httpx.Client bloquant qui arrêtait la boucle d'événements
+  - async     : LLMClient asynchrone, --concurrency générations simultanées
+
+Usage (depuis synthese-comparative/) :
+    python benchmarks/bench_llm_overlap.py --requests 1 4 16 --latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Mode réel : les appels partent vers le faux llm-qa
+os.environ["USE_FAKE_LLM"] = "false"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+
+from bench_retrieval_fanout import start_stub
+from core.http_client import create_async_client
+from core.llm_client import LLMClient
+
+
+def make_stub(latency):
+    stub = FastAPI()
+
+    @stub.post("/api/llm/summarize")
+    async def summarize():
+        await asyncio.sleep(latency)
+        return {"summary": "Synthèse clinique. " * 50}
+
+    return stub
+
+
+async def run(url, args):
+    print(f"Faux llm-qa : {url}, génération {args.latency_ms:.0f} ms, concurrence {args.concurrency}\n")
+    print(f"{'synthèses':>9} | {'sérialisé (ms)':>14} | {'async (ms)':>10}")
+    async with create_async_client() as http_client:
+        clients = [
+            LLMClient(url, http_client=http_client, max_concurrency=1),
+            LLMClient(url, http_client=http_client, max_concurrency=args.concurrency),
+        ]
+        for n in args.requests:
+            timings = []
+            for client in clients:
+                start = time.perf_counter()
+                await asyncio.gather(*(client.summarize(f"Prompt {i}") for i in range(n)))
+                timings.append(1000 * (time.perf_counter() - start))
+            print(f"{n:>9} | {timings[0]:>14.0f} | {timings[1]:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    server, url = start_stub(make_stub(args.latency_ms / 1000))
+    try:
+        asyncio.run(run(url, args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark de la récupération multi-patients de /synthese/comparaison.
+
+Un faux semantic-indexer (uvicorn local) répond à /api/search/patient-snippets
+après un délai fixe (--latency-ms). Pour 2, 10 et 50 patients, on mesure le
+temps de récupération des documents :
+
+  - historique : un appel après l'autre, un httpx.AsyncClient créé par appel
+  - séquentiel : un appel après l'autre, pool de connexions partagé
+  - concurrent : appels simultanés (sémaphore --concurrency), pool partagé
+
+Usage (depuis synthese-comparative/) :
+    python benchmarks/bench_retrieval_fanout.py --patients 2 10 50 --latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+# Mode réel : les appels partent vers le faux indexer
+os.environ["USE_FAKE_RETRIEVAL"] = "false"
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+
+from core.http_client import create_async_client
+from core.retrieval_client import RetrievalClient
+
+
+def make_stub(latency):
+    stub = FastAPI()
+
+    @stub.get("/api/search/patient-snippets")
+    async def patient_snippets(patient_id: str):
+        await asyncio.sleep(latency)
+        return [{"doc_id": f"DOC-{patient_id}-{i}", "text": "Compte-rendu de suivi. " * 40} for i in range(5)]
+
+    return stub
+
+
+def start_stub(stub):
+    """Sert l'app `stub` sur un port libre (thread uvicorn) ; renvoie (serveur, url)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def sequential(client, patient_ids):
+    for pid in patient_ids:
+        await client.get_patient_documents(pid)
+
+
+async def concurrent(client, patient_ids):
+    await client.get_documents_for_patients(patient_ids)
+
+
+async def run(url, args):
+    print(f"Faux indexer : {url}, latence {args.latency_ms:.0f} ms, concurrence {args.concurrency}\n")
+    print(f"{'patients':>8} | {'historique (ms)':>15} | {'séquentiel (ms)':>15} | {'concurrent (ms)':>15}")
+    async with create_async_client() as http_client:
+        strategies = [
+            (sequential, RetrievalClient(url, http_client=None, max_concurrency=args.concurrency)),
+            (sequential, RetrievalClient(url, http_client=http_client, max_concurrency=args.concurrency)),
+            (concurrent, RetrievalClient(url, http_client=http_client, max_concurrency=args.concurrency)),
+        ]
+        await concurrent(strategies[2][1], ["warmup"] * args.concurrency)
+        for n in args.patients:
+            patient_ids = [f"P{i}" for i in range(n)]
+            timings = []
+            for strategy, client in strategies:
+                samples = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    await strategy(client, patient_ids)
+                    samples.append(1000 * (time.perf_counter() - start))
+                timings.append(np.median(samples))
+            print(f"{n:>8} | {timings[0]:>15.1f} | {timings[1]:>15.1f} | {timings[2]:>15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--patients", type=int, nargs="+", default=[2, 10, 50])
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    server, url = start_stub(make_stub(args.latency_ms / 1000))
+    try:
+        asyncio.run(run(url, args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -21,3 +21,25 @@ LLM_QA_URL: str = os.getenv(
 # Flags pour activer/désactiver les FAKE
 USE_FAKE_RETRIEVAL: bool = _env_bool("USE_FAKE_RETRIEVAL", "true")
 USE_FAKE_LLM: bool = _env_bool("USE_FAKE_LLM", "true")
+
+# Appels HTTP sortants : un pool de connexions partagé, ouvert au démarrage de
+# l'app et fermé à l'arrêt (keep-alive ; HTTP/2 négocié par ALPN en HTTPS)
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP2: bool = _env_bool("HTTP2", "true")
+
+# Récupération des documents : délai par appel et nombre d'appels simultanés
+# vers le semantic-indexer (tous patients et toutes requêtes confondus)
+RETRIEVAL_TIMEOUT: float = float(os.getenv("RETRIEVAL_TIMEOUT", "30"))
+RETRIEVAL_CONCURRENCY: int = int(os.getenv("RETRIEVAL_CONCURRENCY", "8"))
+
+# Appels au LLM (llm-qa) : délai par tentative, échéance globale d'une synthèse
+# (attente d'un créneau et nouvelles tentatives comprises), tentatives
+# supplémentaires avec backoff exponentiel aléatoire, générations simultanées
+LLM_TIMEOUT: float = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_DEADLINE: float = float(os.getenv("LLM_DEADLINE", "120"))
+LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF: float = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+LLM_RETRY_BACKOFF_MAX: float = float(os.getenv("LLM_RETRY_BACKOFF_MAX", "8"))
+LLM_CONCURRENCY: int = int(os.getenv("LLM_CONCURRENCY", "4"))
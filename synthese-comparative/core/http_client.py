@@ -0,0 +1,32 @@
+# core/http_client.py
+import importlib.util
+from typing import Optional
+
+import httpx
+
+from core.config import (
+    HTTP2,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+)
+
+# HTTP/2 nécessite le paquet h2 (httpx[http2]) ; sans lui, HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def client_options(timeout: Optional[float] = 30.0) -> dict:
+    """Pool shared by every outgoing call of the service (keep-alive, HTTP/2 when available)."""
+    return {
+        "http2": HTTP2 and HTTP2_AVAILABLE,
+        "timeout": timeout,
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+def create_async_client(timeout: Optional[float] = 30.0, **kwargs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(**client_options(timeout), **kwargs)
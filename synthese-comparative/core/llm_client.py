@@ -1,8 +1,28 @@
 # core/llm_client.py
+import asyncio
+import random
+import time
 from typing import Optional
 import httpx
 
-from core.config import LLM_QA_URL, USE_FAKE_LLM
+from core.config import (
+    LLM_CONCURRENCY,
+    LLM_DEADLINE,
+    LLM_MAX_RETRIES,
+    LLM_QA_URL,
+    LLM_RETRY_BACKOFF,
+    LLM_RETRY_BACKOFF_MAX,
+    LLM_TIMEOUT,
+    USE_FAKE_LLM,
+)
+from core.http_client import create_async_client
+
+# Réponses qui valent une nouvelle tentative (surcharge / indisponibilité passagère)
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+class LLMDeadlineExceeded(Exception):
+    """No summary obtained before the request deadline."""
 
 
 class LLMClient:
@@ -10,15 +30,39 @@ class LLMClient:
     LLM client with two modes:
     - FAKE mode: just truncates the prompt (for local dev).
     - REAL mode: calls the llm-qa microservice to get a proper summary.
+
+    Calls are async: the route handlers no longer block the event loop, so
+    concurrent summaries overlap. `http_client` is the app-wide pooled
+    AsyncClient (set at startup, closed at shutdown). At most
+    `max_concurrency` generations are in flight; each summary has a
+    deadline covering the wait for a slot, every attempt and the backoff
+    between attempts.
     """
 
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_concurrency: int = LLM_CONCURRENCY,
+        timeout: float = LLM_TIMEOUT,
+        deadline: float = LLM_DEADLINE,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff: float = LLM_RETRY_BACKOFF,
+        backoff_max: float = LLM_RETRY_BACKOFF_MAX,
+    ):
         self.base_url = base_url or LLM_QA_URL
+        self.http_client = http_client
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._slots = asyncio.Semaphore(max_concurrency)
 
-    def summarize(self, prompt: str, max_chars: int = 1200) -> str:
+    async def summarize(self, prompt: str, max_chars: int = 1200) -> str:
         if USE_FAKE_LLM:
             return self._summarize_fake(prompt, max_chars)
-        return self._summarize_remote(prompt)
+        return await self._summarize_remote(prompt)
 
     # ---------- FAKE MODE ----------
 
@@ -31,9 +75,9 @@ class LLMClient:
 
     # ---------- REAL MODE ----------
 
-    def _call_llm_qa_sync(self, prompt: str) -> str:
+    async def _call_llm_qa(self, prompt: str, timeout: float) -> str:
         """
-        Synchronous call to llm-qa microservice.
+        One call to the llm-qa microservice.
 
         ⚠️ IMPORTANT:
         - Adapte l'endpoint "/api/llm/summarize" au vrai endpoint de ton MS llm-qa.
@@ -45,17 +89,63 @@ class LLMClient:
             response: {"summary": "<résumé>"}
         """
         payload = {"prompt": prompt}
+        url = f"{self.base_url}/api/llm/summarize"
+
+        if self.http_client is not None:
+            resp = await self.http_client.post(url, json=payload, timeout=timeout)
+        else:
+            # Hors de l'app (scripts) : client jetable
+            async with create_async_client(timeout) as client:
+                resp = await client.post(url, json=payload)
+        resp.raise_for_status()
+        data = resp.json()
+        return data.get("summary", "")
 
-        # httpx en mode sync car la route FastAPI est async et on veut simplifier.
-        with httpx.Client(timeout=60.0) as client:
-            resp = client.post(f"{self.base_url}/api/llm/summarize", json=payload)
-            resp.raise_for_status()
-            data = resp.json()
-            return data.get("summary", "")
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max, base * 2^attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt))
+
+    @staticmethod
+    def _is_retryable(exc: Exception) -> bool:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(exc, httpx.TransportError)
+
+    async def _call_with_retries(self, prompt: str) -> str:
+        """Call llm-qa within the deadline, retrying transient failures with jittered backoff."""
+        deadline = time.monotonic() + self.deadline
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            raise LLMDeadlineExceeded(f"No LLM slot free within {self.deadline:.0f}s")
+        try:
+            attempt = 0
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMDeadlineExceeded(f"LLM deadline of {self.deadline:.0f}s exceeded")
+                try:
+                    # Les timeouts httpx portent sur chaque lecture : l'échéance, elle, borne l'appel entier
+                    return await asyncio.wait_for(
+                        self._call_llm_qa(prompt, timeout=min(self.timeout, remaining)),
+                        timeout=remaining,
+                    )
+                except asyncio.TimeoutError:
+                    raise LLMDeadlineExceeded(f"LLM deadline of {self.deadline:.0f}s exceeded")
+                except Exception as exc:
+                    if attempt >= self.max_retries or not self._is_retryable(exc):
+                        raise
+                    delay = self._backoff_delay(attempt)
+                    if delay >= deadline - time.monotonic():
+                        raise
+                    attempt += 1
+                    await asyncio.sleep(delay)
+        finally:
+            self._slots.release()
 
-    def _summarize_remote(self, prompt: str) -> str:
+    async def _summarize_remote(self, prompt: str) -> str:
         try:
-            summary = self._call_llm_qa_sync(prompt)
+            summary = await self._call_with_retries(prompt)
             if not summary:
                 # fallback si la réponse est vide
                 return self._summarize_fake(prompt, 1200)
@@ -1,8 +1,15 @@
 # core/retrieval_client.py
+import asyncio
 from typing import List, Dict, Optional
 import httpx
 
-from core.config import SEMANTIC_INDEXER_URL, USE_FAKE_RETRIEVAL
+from core.config import (
+    RETRIEVAL_CONCURRENCY,
+    RETRIEVAL_TIMEOUT,
+    SEMANTIC_INDEXER_URL,
+    USE_FAKE_RETRIEVAL,
+)
+from core.http_client import create_async_client
 
 
 class RetrievalClient:
@@ -10,10 +17,21 @@ class RetrievalClient:
     Client for retrieving clinical snippets.
     - If USE_FAKE_RETRIEVAL = true  -> returns hard-coded fake data.
     - If USE_FAKE_RETRIEVAL = false -> calls the real semantic-indexer microservice.
+
+    `http_client` is the app-wide pooled AsyncClient (set at startup, closed at
+    shutdown). At most `max_concurrency` calls to the indexer are in flight at
+    once, across all requests.
     """
 
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        max_concurrency: int = RETRIEVAL_CONCURRENCY,
+    ):
         self.base_url = base_url or SEMANTIC_INDEXER_URL
+        self.http_client = http_client
+        self._slots = asyncio.Semaphore(max_concurrency)
 
     async def get_patient_documents(
         self,
@@ -26,6 +44,18 @@ class RetrievalClient:
             return self._get_fake_documents(patient_id, from_date, to_date, focus)
         return await self._get_real_documents(patient_id, from_date, to_date, focus)
 
+    async def get_documents_for_patients(
+        self,
+        patient_ids: List[str],
+        from_date: Optional[str] = None,
+        to_date: Optional[str] = None,
+        focus: Optional[str] = None,
+    ) -> List[List[Dict]]:
+        """Documents of each patient, in the order of `patient_ids`, fetched concurrently."""
+        return await asyncio.gather(*(
+            self.get_patient_documents(pid, from_date, to_date, focus) for pid in patient_ids
+        ))
+
     # ---------- FAKE MODE ----------
 
     def _get_fake_documents(
@@ -78,14 +108,28 @@ class RetrievalClient:
               {"doc_id": "DOC-456", "text": "..."}
             ]
         """
+        # Paramètres absents non envoyés (sinon "from_date=" vide côté indexer)
         params = {
-            "patient_id": patient_id,
-            "from_date": from_date,
-            "to_date": to_date,
-            "focus": focus,
+            key: value
+            for key, value in {
+                "patient_id": patient_id,
+                "from_date": from_date,
+                "to_date": to_date,
+                "focus": focus,
+            }.items()
+            if value is not None
         }
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            resp = await client.get(f"{self.base_url}/api/search/patient-snippets", params=params)
+        async with self._slots:
+            if self.http_client is None:
+                # Hors de l'app (scripts) : client jetable, sans réutilisation des connexions
+                async with create_async_client(RETRIEVAL_TIMEOUT) as client:
+                    resp = await client.get(f"{self.base_url}/api/search/patient-snippets", params=params)
+            else:
+                resp = await self.http_client.get(
+                    f"{self.base_url}/api/search/patient-snippets",
+                    params=params,
+                    timeout=RETRIEVAL_TIMEOUT,
+                )
             resp.raise_for_status()
             return resp.json()
@@ -1,5 +1,7 @@
 from fastapi import FastAPI
-from api.routes import router as synthese_router
+from api.routes import llm_client, retrieval_client, router as synthese_router
+from core.config import RETRIEVAL_TIMEOUT
+from core.http_client import create_async_client
 
 app = FastAPI(
     title="SyntheseComparative Microservice",
@@ -7,3 +9,20 @@ app = FastAPI(
 )
 
 app.include_router(synthese_router, prefix="/api", tags=["synthese"])
+
+
+@app.on_event("startup")
+async def open_http_client():
+    # Un seul pool de connexions pour l'indexer et llm-qa, gardé ouvert
+    # pendant toute la vie de l'app (keep-alive, HTTP/2)
+    http_client = create_async_client(RETRIEVAL_TIMEOUT)
+    app.state.http_client = http_client
+    retrieval_client.http_client = http_client
+    llm_client.http_client = http_client
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    retrieval_client.http_client = None
+    llm_client.http_client = None
+    await app.state.http_client.aclose()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import sys
+import os
+
+import httpx
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.retrieval_client import RetrievalClient
+
+
+class SlowIndexer:
+    """Fake semantic-indexer: records concurrent calls, answers after a delay."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.params = []
+
+    async def __call__(self, request):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.params.append(dict(request.url.params))
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        pid = request.url.params["patient_id"]
+        return httpx.Response(200, json=[{"doc_id": f"DOC-{pid}", "text": f"texte {pid}"}])
+
+
+@patch('core.retrieval_client.USE_FAKE_RETRIEVAL', False)
+class TestRetrievalClient(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.indexer = SlowIndexer()
+        self.http_client = httpx.AsyncClient(transport=httpx.MockTransport(self.indexer))
+
+    async def asyncTearDown(self):
+        await self.http_client.aclose()
+
+    async def test_patients_fetched_concurrently_in_order(self):
+        client = RetrievalClient(base_url="http://indexer", http_client=self.http_client, max_concurrency=10)
+        patient_ids = [f"P{i}" for i in range(6)]
+
+        start = asyncio.get_running_loop().time()
+        docs = await client.get_documents_for_patients(patient_ids, from_date="2024-01-01")
+        elapsed = asyncio.get_running_loop().time() - start
+
+        self.assertEqual([d[0]["doc_id"] for d in docs], [f"DOC-{p}" for p in patient_ids])
+        self.assertEqual(self.indexer.max_in_flight, 6)
+        self.assertLess(elapsed, 6 * self.indexer.delay)
+
+    async def test_concurrency_is_bounded(self):
+        client = RetrievalClient(base_url="http://indexer", http_client=self.http_client, max_concurrency=2)
+        await client.get_documents_for_patients([f"P{i}" for i in range(5)])
+        self.assertEqual(self.indexer.max_in_flight, 2)
+
+    async def test_unset_params_are_not_sent(self):
+        client = RetrievalClient(base_url="http://indexer", http_client=self.http_client)
+        await client.get_patient_documents("P1", focus="anticoagulant")
+        self.assertEqual(self.indexer.params, [{"patient_id": "P1", "focus": "anticoagulant"}])
+
+    async def test_error_propagates(self):
+        async def failing(request):
+            return httpx.Response(503)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(failing)) as http_client:
+            client = RetrievalClient(base_url="http://indexer", http_client=http_client)
+            with self.assertRaises(httpx.HTTPStatusError):
+                await client.get_documents_for_patients(["P1", "P2"])
+
+
+
+class TestAppHttpClients(unittest.TestCase):
+
+    def test_pooled_clients_live_with_the_app(self):
+        from fastapi.testclient import TestClient
+        from main import app
+        from api.routes import llm_client, retrieval_client
+
+        with TestClient(app):
+            self.assertIsInstance(retrieval_client.http_client, httpx.AsyncClient)
+            self.assertIs(llm_client.http_client, retrieval_client.http_client)
+        self.assertIsNone(retrieval_client.http_client)
+        self.assertIsNone(llm_client.http_client)
+
+if __name__ == '__main__':
+    unittest.main()